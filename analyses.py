@@ -0,0 +1,244 @@
+from functools import cached_property
+
+import pandas as pd
+
+
+class DonneesCommandes:
+    """Commandes chargées et vues dérivées partagées entre les sections d'analyse"""
+
+    def __init__(self, commandes, lignes=None):
+        self.commandes = commandes
+        if lignes is not None:
+            # Chargement normalisé : table des lignes déjà construite par le loader
+            self.lignes = lignes
+
+    @cached_property
+    def valides(self):
+        """Commandes non annulées (base du chiffre d'affaires)"""
+        return self.commandes[self.commandes['statut'] != 'annulée']
+
+    @cached_property
+    def lignes(self):
+        """Table des lignes de commande : une ligne par produit, construite une seule fois"""
+        return exploser_produits(self.commandes)
+
+    @cached_property
+    def lignes_valides(self):
+        """Lignes de commande des commandes non annulées"""
+        return self.lignes[self.lignes['statut'] != 'annulée']
+
+
+def exploser_produits(commandes):
+    """Construire la table des lignes de commande sans itérer ligne par ligne
+
+    explode() duplique chaque commande par produit, puis les dictionnaires
+    produits sont transformés en colonnes d'un seul bloc.
+    """
+    colonnes = ['id_commande', 'canal', 'statut', 'produit', 'quantite', 'ca']
+    lignes = commandes[['id_commande', 'canal', 'statut', 'produits']].explode('produits', ignore_index=True)
+    lignes = lignes[lignes['produits'].map(lambda p: isinstance(p, dict))]
+    if lignes.empty:
+        return pd.DataFrame(columns=colonnes)
+
+    details = pd.DataFrame(lignes['produits'].tolist(), index=lignes.index)
+    for champ in ('nom_produit', 'quantite', 'prix_total'):
+        if champ not in details.columns:
+            details[champ] = None
+
+    lignes = lignes.drop(columns='produits')
+    lignes['produit'] = details['nom_produit'].fillna('N/A')
+    lignes['quantite'] = details['quantite'].fillna(0)
+    lignes['ca'] = details['prix_total'].fillna(0)
+    return lignes[colonnes]
+
+
+def champ_imbrique(serie, champ, defaut='N/A'):
+    """Extraire un champ des objets imbriqués d'une colonne (client, adresse_livraison...)
+
+    Une compréhension sur les valeurs évite l'appel de lambda par ligne de
+    Series.apply ; les valeurs qui ne sont pas des objets donnent defaut.
+    """
+    return pd.Series([valeur.get(champ, defaut) if valeur.__class__ is dict else defaut for valeur in serie],
+                     index=serie.index, dtype=object)
+
+
+def champ_objet(commandes, objet, champ, defaut='N/A'):
+    """Champ d'un objet imbriqué : colonne <objet>_<champ> du chargement normalisé, sinon extrait de l'objet"""
+    colonne = f'{objet}_{champ}'
+    if colonne in commandes.columns:
+        # Objet ou champ absent : valeur manquante, ignorée par les groupby comme un champ nul
+        return commandes[colonne]
+    if objet not in commandes.columns:
+        # Aucune commande chargée n'a cet objet (vue filtrée sur la boutique physique...)
+        return pd.Series(defaut, index=commandes.index, dtype=object)
+    return champ_imbrique(commandes[objet], champ, defaut)
+
+
+# ===================== MÉTRIQUES GLOBALES =====================
+def metriques_globales(donnees):
+    df = donnees.commandes
+    total_commandes = len(df)
+    commandes_annulees = int((df['statut'] == 'annulée').sum())
+    return {
+        'total_commandes': total_commandes,
+        'ca_total': df['montant_total'].sum(),
+        'ca_moyen': df['montant_total'].mean(),
+        'commandes_annulees': commandes_annulees,
+        'taux_annulation': (commandes_annulees / total_commandes * 100) if total_commandes > 0 else 0
+    }
+
+
+# ===================== ANALYSE 1: CA PAR MOIS ET CANAL =====================
+def ca_par_mois_canal(donnees):
+    return donnees.valides.groupby(['mois', 'canal'], observed=True)['montant_total'].sum().reset_index()
+
+
+# ===================== ANALYSE 2: TOP 10 PRODUITS =====================
+def top_produits(donnees):
+    return donnees.lignes_valides.groupby('produit', observed=True).agg({
+        'quantite': 'sum',
+        'ca': 'sum'
+    }).reset_index().rename(columns={'produit': 'nom', 'ca': 'prix_total'}).nlargest(10, 'quantite')
+
+
+# ===================== ANALYSE 3: TAUX D'ANNULATION =====================
+def pivot_annulation(annulation_data):
+    """Passer des comptes (canal, statut, count) au tableau des taux par canal"""
+    annulation_pivot = annulation_data.pivot(index='canal', columns='statut', values='count').fillna(0)
+    if 'annulée' not in annulation_pivot.columns:
+        annulation_pivot['annulée'] = 0
+    if 'confirmée' not in annulation_pivot.columns:
+        annulation_pivot['confirmée'] = 0
+
+    annulation_pivot['total'] = annulation_pivot.sum(axis=1)
+    annulation_pivot['taux'] = (annulation_pivot['annulée'] / annulation_pivot['total'] * 100)
+    return annulation_pivot.reset_index()
+
+
+def taux_annulation(donnees):
+    annulation_data = donnees.commandes.groupby(['canal', 'statut'], observed=True).size().reset_index(name='count')
+    return pivot_annulation(annulation_data)
+
+
+# ===================== ANALYSE 4: CA MOYEN PAR COMMANDE =====================
+def ca_moyen_par_canal(donnees):
+    ca_moyen_canal = donnees.valides.groupby('canal', observed=True)['montant_total'].agg(
+        ['mean', 'min', 'max', 'count']).reset_index()
+    ca_moyen_canal.columns = ['Canal', 'CA Moyen', 'CA Min', 'CA Max', 'Nb Commandes']
+    return ca_moyen_canal
+
+
+# ===================== ANALYSE 5: SAISONNALITÉ =====================
+def saisonnalite(donnees):
+    saison_data = donnees.valides.groupby(['heure', 'canal'], observed=True).agg({
+        'id_commande': 'count',
+        'montant_total': 'sum'
+    }).reset_index()
+    saison_data.columns = ['Heure', 'Canal', 'Nb Commandes', 'CA Total']
+    return saison_data
+
+
+# ===================== ANALYSE 6: PANIER MOYEN =====================
+def panier_moyen(donnees):
+    valides = donnees.valides
+    if 'nb_produits' in valides.columns:
+        # Chargement normalisé : nombre de produits déjà calculé
+        df_panier = valides[['canal', 'nb_produits', 'montant_total']].copy()
+    else:
+        df_panier = valides[['canal', 'produits', 'montant_total']].copy()
+        df_panier['nb_produits'] = df_panier['produits'].str.len().fillna(0).astype(int)
+
+    panier_stats = df_panier.groupby('canal', observed=True).agg({
+        'nb_produits': ['mean', 'min', 'max'],
+        'montant_total': ['mean', 'min', 'max']
+    }).reset_index()
+    panier_stats.columns = ['Canal', 'Panier Moyen', 'Panier Min', 'Panier Max', 'Montant Moyen', 'Montant Min',
+                            'Montant Max']
+
+    dist_panier = df_panier.groupby(['canal', 'nb_produits'], observed=True).size().reset_index(name='count')
+    return {'stats': panier_stats, 'distribution': dist_panier}
+
+
+# ===================== ANALYSE 7: FIDÉLISATION =====================
+def fidelisation(donnees):
+    # Extraire les emails clients
+    df_fidelite = donnees.commandes[['id_commande', 'canal', 'montant_total']].copy()
+    df_fidelite['client_email'] = champ_objet(donnees.commandes, 'client', 'email')
+
+    fidelite_data = df_fidelite.groupby(['client_email', 'canal'], observed=True).agg({
+        'id_commande': 'count',
+        'montant_total': 'sum'
+    }).reset_index()
+    fidelite_data.columns = ['Email', 'Canal', 'Nb Commandes', 'CA Total']
+    fidelite_data = fidelite_data[fidelite_data['Nb Commandes'] >= 2]
+
+    top_clients = fidelite_data.nlargest(10, 'CA Total')
+
+    # Taux de rétention
+    clients_total = df_fidelite.groupby('canal', observed=True)['client_email'].nunique().reset_index()
+    clients_total.columns = ['Canal', 'Total Clients']
+
+    clients_recurrents = fidelite_data.groupby('Canal', observed=True)['Email'].nunique().reset_index()
+    clients_recurrents.columns = ['Canal', 'Clients Récurrents']
+
+    return {'top_clients': top_clients, 'retention': calcul_retention(clients_total, clients_recurrents)}
+
+
+def calcul_retention(clients_total, clients_recurrents):
+    """Taux de rétention par canal à partir des clients totaux et récurrents"""
+    retention = clients_total.merge(clients_recurrents, on='Canal', how='left').fillna(0)
+    retention['Taux Rétention'] = (retention['Clients Récurrents'] / retention['Total Clients'] * 100)
+    return retention
+
+
+# ===================== ANALYSE 8: GÉOGRAPHIQUE =====================
+def geographique(donnees):
+    df_ca = donnees.valides
+    df_geo = df_ca[df_ca['canal'].isin(['site_web', 'application_mobile'])]
+    df_geo = df_geo[['id_commande', 'montant_total']].assign(ville=champ_objet(df_geo, 'adresse_livraison', 'ville'))
+    df_geo = df_geo[df_geo['ville'] != 'N/A']
+
+    if df_geo.empty:
+        return pd.DataFrame(columns=['Ville', 'CA Total', 'Nb Commandes'])
+
+    ville_stats = df_geo.groupby('ville', observed=True).agg({
+        'montant_total': 'sum',
+        'id_commande': 'count'
+    }).reset_index().nlargest(15, 'montant_total')
+    ville_stats.columns = ['Ville', 'CA Total', 'Nb Commandes']
+    return ville_stats
+
+
+# ===================== ANALYSE 9: CROSS-CANAL =====================
+def top_produits_cross(cross_stats):
+    """Garder les 10 produits les plus vendus (tous canaux confondus)"""
+    top = cross_stats.groupby('produit', observed=True)['quantite'].sum().nlargest(10).index
+    return cross_stats[cross_stats['produit'].isin(top)]
+
+
+def cross_canal(donnees):
+    cross_stats = donnees.lignes_valides.groupby(['produit', 'canal'], observed=True).agg({
+        'quantite': 'sum',
+        'ca': 'sum'
+    }).reset_index()
+    return top_produits_cross(cross_stats)
+
+
+# Sections calculées pour le dashboard, dans l'ordre d'affichage
+SECTIONS = {
+    'metriques': metriques_globales,
+    'ca_mois_canal': ca_par_mois_canal,
+    'top_produits': top_produits,
+    'annulation': taux_annulation,
+    'ca_moyen': ca_moyen_par_canal,
+    'saisonnalite': saisonnalite,
+    'panier': panier_moyen,
+    'fidelisation': fidelisation,
+    'geographique': geographique,
+    'cross_canal': cross_canal,
+}
+
+
+def compute_all(donnees):
+    """Calculer toutes les sections à partir des commandes chargées"""
+    return {nom: section(donnees) for nom, section in SECTIONS.items()}
@@ -0,0 +1,133 @@
+import os
+import time
+import uuid
+import shutil
+import tarfile
+from datetime import datetime, timedelta
+
+# zstandard est optionnel : sans lui, seul le format tar.gz est disponible
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_DIR = "./data/archive"
+
+# Sous-répertoire des fichiers en erreur (JSON illisible, journaux de lignes rejetées)
+ERREURS = "erreurs"
+
+# Formats de regroupement des heures terminées
+FORMATS_BUNDLE = ("tar.gz", "tar.zst")
+
+# Regroupement et rétention vérifiés au plus toutes les N secondes
+MAINTENANCE_INTERVALLE = 300
+
+
+class ArchiveStore:
+    """Archive des fichiers traités, partitionnée par canal, date et heure
+
+    Un fichier archivé va dans <base>/<canal>/<YYYY-MM-DD>/<HH>/ (ou sous
+    <base>/erreurs/ pour les fichiers en erreur) : chaque répertoire reste
+    petit, quel que soit l'historique. Les heures terminées peuvent être
+    regroupées en une archive <HH>.tar.gz / <HH>.tar.zst, et les jours plus
+    anciens que la rétention supprimés.
+    """
+
+    def __init__(self, base_dir=ARCHIVE_DIR, bundle=None, retention_jours=None):
+        if bundle == "tar.zst" and zstandard is None:
+            raise RuntimeError("zstandard n'est pas installé (pip install zstandard)")
+        self.base_dir = base_dir
+        self.bundle = bundle
+        self.retention_jours = retention_jours
+        self.derniere_maintenance = None
+        os.makedirs(base_dir, exist_ok=True)
+
+    def shard_dir(self, canal, erreurs=False, moment=None):
+        """Répertoire de l'heure courante pour un canal (créé au besoin)"""
+        moment = moment or datetime.now()
+        racine = os.path.join(self.base_dir, ERREURS) if erreurs else self.base_dir
+        dossier = os.path.join(racine, canal or "inconnu", moment.strftime("%Y-%m-%d"), moment.strftime("%H"))
+        os.makedirs(dossier, exist_ok=True)
+        return dossier
+
+    def archiver(self, filepath, erreurs=False):
+        """Déplacer un fichier source dans sa partition ; retourne le chemin d'archive"""
+        archive_path = os.path.join(self.shard_dir(canal_du_chemin(filepath), erreurs), os.path.basename(filepath))
+        shutil.move(filepath, archive_path)
+        return archive_path
+
+    def journal_rejets(self, filepath):
+        """Chemin du journal des lignes rejetées d'un segment"""
+        return os.path.join(self.shard_dir(canal_du_chemin(filepath), erreurs=True),
+                            f"{os.path.basename(filepath)}.rejets.log")
+
+    def maintenance(self, force=False):
+        """Regrouper les heures terminées et appliquer la rétention (au plus toutes les MAINTENANCE_INTERVALLE s)
+
+        Retourne (heures regroupées, jours supprimés).
+        """
+        if self.bundle is None and self.retention_jours is None:
+            return 0, 0
+        maintenant = time.monotonic()
+        if not force and self.derniere_maintenance is not None \
+                and maintenant - self.derniere_maintenance < MAINTENANCE_INTERVALLE:
+            return 0, 0
+        self.derniere_maintenance = maintenant
+
+        heure_courante = datetime.now().strftime("%Y-%m-%d/%H")
+        limite = None
+        if self.retention_jours is not None:
+            limite = (datetime.now() - timedelta(days=self.retention_jours)).strftime("%Y-%m-%d")
+
+        regroupees = supprimes = 0
+        for date_dir in self.dates():
+            # Les noms de répertoires sont des dates ISO : comparaison de chaînes
+            if limite is not None and os.path.basename(date_dir) < limite:
+                shutil.rmtree(date_dir, ignore_errors=True)
+                supprimes += 1
+                continue
+            if self.bundle is None:
+                continue
+            for heure in os.scandir(date_dir):
+                if heure.is_dir() and f"{os.path.basename(date_dir)}/{heure.name}" != heure_courante:
+                    self.regrouper(heure.path)
+                    regroupees += 1
+        return regroupees, supprimes
+
+    def dates(self):
+        """Répertoires de date de tous les canaux, erreurs comprises"""
+        racines = [self.base_dir, os.path.join(self.base_dir, ERREURS)]
+        for racine in racines:
+            if not os.path.isdir(racine):
+                continue
+            for canal in os.scandir(racine):
+                if not canal.is_dir() or canal.path in racines:
+                    continue
+                for date in os.scandir(canal.path):
+                    if date.is_dir():
+                        yield date.path
+
+    def regrouper(self, heure_dir):
+        """Remplacer le répertoire d'une heure terminée par une archive tar compressée"""
+        date_dir, heure = os.path.split(heure_dir)
+        nom = f"{heure}.{self.bundle}"
+        if os.path.exists(os.path.join(date_dir, nom)):
+            # Fichiers archivés après un premier regroupement (horloge recalée)
+            nom = f"{heure}-{uuid.uuid4().hex[:8]}.{self.bundle}"
+
+        # Écriture atomique : fichier caché puis renommage
+        tmp = os.path.join(date_dir, f".{nom}.tmp")
+        if self.bundle == "tar.zst":
+            with open(tmp, "wb") as f, zstandard.ZstdCompressor().stream_writer(f) as flux, \
+                    tarfile.open(fileobj=flux, mode="w|") as tar:
+                tar.add(heure_dir, arcname=heure)
+        else:
+            with tarfile.open(tmp, "w:gz") as tar:
+                tar.add(heure_dir, arcname=heure)
+        os.replace(tmp, os.path.join(date_dir, nom))
+        shutil.rmtree(heure_dir)
+
+
+def canal_du_chemin(filepath):
+    """Canal d'un fichier source : nom de son répertoire (data/sources/<canal>/...)"""
+    return os.path.basename(os.path.dirname(os.path.abspath(filepath))) or "inconnu"
@@ -0,0 +1,296 @@
+import os
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+import site_web
+import application_mobile
+import boutique_physique
+from json_codec import dumps_indente
+from load_generator import PoolFaker, identifiant
+from segment_writer import SegmentWriter
+
+# Générateurs de commandes par canal (préfixe des fichiers, fonction de construction)
+CANAUX = {
+    "site_web": ("WEB", site_web.generer_commande),
+    "application_mobile": ("MOB", application_mobile.generer_commande),
+    "boutique_physique": ("BOU", boutique_physique.generer_commande),
+}
+
+RESULTS_DIR = "./bench_results"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark d'ingestion de bout en bout du collecteur")
+    parser.add_argument("--n", type=int, default=1000, help="Nombre de commandes générées par canal")
+    parser.add_argument("--format", choices=["json", "jsonl"], default="json",
+                        help="json : un fichier par commande ; jsonl : segments de --segment-commandes lignes")
+    parser.add_argument("--segment-commandes", type=int, default=500, help="Commandes par segment .jsonl")
+    parser.add_argument("--batch-size", type=int, default=0, help="Comme collector.py --batch-size")
+    parser.add_argument("--workers", type=int, default=0, help="Comme collector.py --workers")
+    parser.add_argument("--no-rollups", action="store_true", help="Comme collector.py --no-rollups")
+    parser.add_argument("--journal", action="store_true",
+                        help="Tenir le journal SQLite des écritures (comme collector.py sans --no-journal)")
+    parser.add_argument("--dedup", action="store_true",
+                        help="Pré-contrôler les doublons en mémoire (comme collector.py sans --no-dedup)")
+    parser.add_argument("--rejouer", action="store_true",
+                        help="Mesurer un rejeu : les commandes, déjà ingérées une première fois, sont redéposées")
+    parser.add_argument("--mongo-uri", default=None,
+                        help="MongoDB réelle (base bench_collector, vidée avant le run) ; défaut : mongomock")
+    parser.add_argument("--seed", type=int, default=42, help="Graine des commandes générées")
+    parser.add_argument("--output", default=None, help="Fichier de résultats JSON (défaut : bench_results/)")
+    parser.add_argument("--compare", default=None, help="Résultats JSON d'un run précédent à comparer")
+    return parser.parse_args()
+
+
+def generer_fichiers(n, format_sortie, segment_commandes, seed):
+    """Écrire n commandes synthétiques par canal dans ./data/sources/<canal>"""
+    rng = random.Random(seed)
+    pool = PoolFaker(seed=seed)
+    debut = datetime(2025, 1, 1)
+    numero = 0
+    for canal, (prefixe, generer_commande) in CANAUX.items():
+        output_dir = os.path.join("data", "sources", canal)
+        os.makedirs(output_dir, exist_ok=True)
+        # Rotation pilotée par le nombre de lignes : taille et âge illimités
+        segments = SegmentWriter(output_dir, prefixe, float("inf"), float("inf"))
+        for i in range(n):
+            date = debut + timedelta(seconds=numero)
+            commande = generer_commande(rng, pool, identifiant(prefixe, date, numero), date)
+            numero += 1
+            if format_sortie == "jsonl":
+                segments.ecrire(commande)
+                if segments.nb_lignes >= segment_commandes:
+                    segments.publier()
+            else:
+                with open(os.path.join(output_dir, f"commande_{commande['id_commande']}.json"), 'w',
+                          encoding='utf-8') as f:
+                    f.write(dumps_indente(commande))
+        segments.close()
+
+
+class Chronos:
+    """Temps cumulé et nombre d'appels par étape, et latences par fichier"""
+
+    def __init__(self):
+        self.etapes = {}
+        self.latences_fichier = []
+        self.latences_preparation = []
+
+    def ajouter(self, nom, duree):
+        etape = self.etapes.setdefault(nom, {"appels": 0, "secondes": 0.0})
+        etape["appels"] += 1
+        etape["secondes"] += duree
+
+    def envelopper(self, nom, fonction, latences=None):
+        def chronometree(*args, **kwargs):
+            debut = time.perf_counter()
+            try:
+                return fonction(*args, **kwargs)
+            finally:
+                duree = time.perf_counter() - debut
+                self.ajouter(nom, duree)
+                if latences is not None:
+                    latences.append(duree)
+        return chronometree
+
+
+class CollectionChronometree:
+    """Collection MongoDB dont les insertions sont chronométrées"""
+
+    def __init__(self, collection, chronos):
+        self._collection = collection
+        self.insert_one = chronos.envelopper("mongodb", collection.insert_one)
+        self.insert_many = chronos.envelopper("mongodb", collection.insert_many)
+
+    def __getattr__(self, nom):
+        return getattr(self._collection, nom)
+
+
+def instrumenter(collector, chronos):
+    """Chronométrer les étapes du collecteur en remplaçant ses fonctions de module
+
+    Les étapes de préparation ne sont visibles que dans ce processus : avec
+    --workers, elles s'exécutent dans le pool et seule leur durée totale
+    (stats["etapes"]) est disponible.
+    """
+    collector.validate_json = chronos.envelopper("validate_json", collector.validate_json)
+    collector.standardize_commande = chronos.envelopper("standardize_commande", collector.standardize_commande)
+    collector.prepare_file = chronos.envelopper("prepare_file", collector.prepare_file)
+    collector.update_rollups = chronos.envelopper("rollups", collector.update_rollups)
+    collector.archive_file = chronos.envelopper("archive", collector.archive_file)
+    collector.process_file = chronos.envelopper("process_file", collector.process_file, chronos.latences_fichier)
+
+    record_etape = collector.record_etape
+
+    def record_etape_latence(nom, fichiers, secondes):
+        if nom == "preparation" and fichiers == 1:
+            chronos.latences_preparation.append(secondes)
+        record_etape(nom, fichiers, secondes)
+    collector.record_etape = record_etape_latence
+
+
+def reinitialiser(stats, chronos):
+    """Remettre à zéro les compteurs du collecteur et les chronos après un passage non mesuré"""
+    for cle in ("total_traite", "succes", "erreurs", "doublons"):
+        stats[cle] = 0
+    for etape in stats["etapes"].values():
+        etape.update(fichiers=0, secondes=0.0)
+    chronos.etapes.clear()
+    chronos.latences_fichier.clear()
+    chronos.latences_preparation.clear()
+
+
+def percentiles(durees):
+    """p50/p95/p99/max en millisecondes"""
+    if not durees:
+        return None
+    triees = sorted(durees)
+
+    def rang(p):
+        return triees[min(len(triees) - 1, int(p / 100 * len(triees)))] * 1000
+    return {"p50": rang(50), "p95": rang(95), "p99": rang(99), "max": triees[-1] * 1000}
+
+
+def detail_etapes(chronos):
+    """Répartition du temps par étape ; le décodage JSON est déduit de prepare_file"""
+    etapes = {nom: dict(valeurs) for nom, valeurs in chronos.etapes.items()}
+    if "prepare_file" in etapes:
+        preparation = etapes.pop("prepare_file")
+        autres = sum(etapes.get(nom, {}).get("secondes", 0.0) for nom in ("validate_json", "standardize_commande"))
+        etapes["lecture_json"] = {"appels": preparation["appels"], "secondes": preparation["secondes"] - autres}
+    etapes.pop("process_file", None)
+    return etapes
+
+
+def ouvrir_collection(mongo_uri):
+    if mongo_uri is None:
+        import mongomock
+        client = mongomock.MongoClient()
+    else:
+        from pymongo import MongoClient
+        client = MongoClient(mongo_uri)
+        client.drop_database("bench_collector")
+    collection = client["bench_collector"]["commandes"]
+    collection.create_index("id_commande", unique=True)
+    return collection
+
+
+def run(args):
+    # Le collecteur travaille en chemins relatifs (./data/...) : l'importer dans le répertoire temporaire
+    import collector
+    collector.rollups_actifs = not args.no_rollups
+    if args.journal:
+        from journal import Journal
+        collector.journal = Journal()
+
+    chronos = Chronos()
+    instrumenter(collector, chronos)
+    collection = CollectionChronometree(ouvrir_collection(args.mongo_uri), chronos)
+
+    pool = None
+    if args.workers > 0:
+        pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    if args.dedup:
+        from dedup import Deduplicateur
+        collector.deduplicateur = Deduplicateur.depuis_collection(collection)
+
+    try:
+        if args.rejouer:
+            # Premier passage non mesuré, puis les mêmes commandes sont redéposées
+            with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                collector.process_files(collector.scan_directories(collection), collection, args.batch_size,
+                                        pool, args.workers)
+            generer_fichiers(args.n, args.format, args.segment_commandes, args.seed)
+            reinitialiser(collector.stats, chronos)
+
+        filepaths = collector.scan_directories(collection)
+        debut = time.perf_counter()
+        # Les messages par commande du collecteur ne sont pas mesurés
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            collector.process_files(filepaths, collection, args.batch_size, pool, args.workers)
+        duree = time.perf_counter() - debut
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    stats = collector.stats
+    return {
+        "fichiers": len(filepaths),
+        "commandes": stats["total_traite"],
+        "duree_s": duree,
+        "debit_commandes_s": stats["total_traite"] / duree if duree > 0 else 0,
+        "debit_fichiers_s": len(filepaths) / duree if duree > 0 else 0,
+        "latence_fichier_ms": percentiles(chronos.latences_fichier),
+        "latence_preparation_ms": percentiles(chronos.latences_preparation),
+        "etapes": detail_etapes(chronos),
+        "etapes_collecteur": stats["etapes"],
+        "stats": {cle: stats[cle] for cle in ("total_traite", "succes", "erreurs", "doublons")},
+    }
+
+
+def afficher(resultats, precedent=None):
+    print(f"\n📊 {resultats['commandes']} commandes / {resultats['fichiers']} fichiers en {resultats['duree_s']:.2f}s")
+    print(f"   Débit: {resultats['debit_commandes_s']:.0f} commandes/s ({resultats['debit_fichiers_s']:.0f} fichiers/s)")
+    if precedent:
+        ratio = resultats['debit_commandes_s'] / precedent['debit_commandes_s'] if precedent['debit_commandes_s'] else 0
+        print(f"   Comparé au run précédent: x{ratio:.2f}")
+
+    for nom in ("latence_fichier_ms", "latence_preparation_ms"):
+        latence = resultats[nom]
+        if latence:
+            print(f"   {nom}: p50={latence['p50']:.3f} p95={latence['p95']:.3f} "
+                  f"p99={latence['p99']:.3f} max={latence['max']:.3f}")
+
+    total = sum(etape["secondes"] for etape in resultats["etapes"].values())
+    print("   Répartition par étape:")
+    for nom, etape in sorted(resultats["etapes"].items(), key=lambda item: -item[1]["secondes"]):
+        part = etape["secondes"] / total * 100 if total > 0 else 0
+        print(f"      {nom:<22} {etape['secondes']:8.3f}s  {part:5.1f}%  ({etape['appels']} appels)")
+    print(f"   Stats collecteur: {resultats['stats']}")
+
+
+def main():
+    args = parse_args()
+    output = os.path.abspath(args.output or os.path.join(
+        RESULTS_DIR, f"collector-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"))
+    precedent = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            precedent = json.load(f)["resultats"]
+
+    repertoire_initial = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="bench_collector_") as workdir:
+        os.chdir(workdir)
+        try:
+            print(f"🧪 Génération de {args.n} commandes par canal ({args.format})...")
+            generer_fichiers(args.n, args.format, args.segment_commandes, args.seed)
+            print("🚀 Ingestion...")
+            resultats = run(args)
+        finally:
+            os.chdir(repertoire_initial)
+
+    afficher(resultats, precedent)
+
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            "date": datetime.now().isoformat(),
+            "machine": {"python": platform.python_version(), "plateforme": platform.platform(),
+                        "cpus": os.cpu_count()},
+            "config": vars(args),
+            "resultats": resultats,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"💾 Résultats: {output}")
+
+
+if __name__ == "__main__":
+    main()
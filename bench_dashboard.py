@@ -0,0 +1,172 @@
+import os
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+from analyses import SECTIONS, DonneesCommandes, exploser_produits
+from bench_collector import CANAUX, RESULTS_DIR
+from data_loader import IncrementalLoader, charger_normalise, enrichir_dates, memoire
+from load_generator import PoolFaker, identifiant
+from segment_writer import SegmentWriter
+
+# Vues partagées de DonneesCommandes, mesurées avant les sections qui les utilisent
+VUES = ['valides', 'lignes', 'lignes_valides']
+
+# Période couverte par les commandes synthétiques
+PERIODE_JOURS = 365
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark des sections d'analyse du dashboard (hors Streamlit)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000],
+                        help="Nombres de commandes à tester (ex. 10000 100000 1000000)")
+    parser.add_argument("--source", choices=["memoire", "fichiers"], default="memoire",
+                        help="memoire : DataFrame construit directement ; fichiers : segments .jsonl "
+                             "relus par IncrementalLoader (chargement mesuré de bout en bout)")
+    parser.add_argument("--normaliser", action="store_true",
+                        help="Chargement normalisé : objets aplatis, catégories, entiers réduits, chaînes Arrow")
+    parser.add_argument("--repeat", type=int, default=3, help="Répétitions par section (médiane retenue)")
+    parser.add_argument("--seed", type=int, default=42, help="Graine des commandes générées")
+    parser.add_argument("--output", default=None, help="Fichier de résultats JSON (défaut : bench_results/)")
+    return parser.parse_args()
+
+
+def generer_commandes(n, seed):
+    """n commandes brutes réparties entre les canaux, étalées sur PERIODE_JOURS"""
+    rng = random.Random(seed)
+    pool = PoolFaker(seed=seed)
+    canaux = list(CANAUX.values())
+    debut = datetime(2025, 1, 1)
+    espacement = PERIODE_JOURS * 86400 / max(n, 1)
+    commandes = []
+    for numero in range(n):
+        prefixe, generer_commande = canaux[numero % len(canaux)]
+        date = debut + timedelta(seconds=numero * espacement)
+        commandes.append(generer_commande(rng, pool, identifiant(prefixe, date, numero), date))
+    return commandes
+
+
+def charger_memoire(commandes, normaliser=False):
+    """(commandes, lignes) ; lignes vaut None hors chargement normalisé (construite par DonneesCommandes)"""
+    if normaliser:
+        return charger_normalise(commandes)
+    return enrichir_dates(pd.DataFrame(commandes)), None
+
+
+def rapport_memoire(commandes):
+    """Mémoire du DataFrame brut et du chargement normalisé, table des lignes comprise
+
+    Pour le brut, memory_usage(deep=True) ne compte que l'enveloppe des
+    dictionnaires imbriqués : le gain réel est plus grand que celui affiché.
+    """
+    brut, _ = charger_memoire(commandes)
+    normalise, lignes = charger_memoire(commandes, normaliser=True)
+    rapport = {
+        "brut_mo": (memoire(brut) + memoire(exploser_produits(brut))) / 1024 / 1024,
+        "normalise_mo": (memoire(normalise) + memoire(lignes)) / 1024 / 1024,
+    }
+    print(f"   🧠 Mémoire: brut {rapport['brut_mo']:.1f} Mo -> normalisé {rapport['normalise_mo']:.1f} Mo "
+          f"({(1 - rapport['normalise_mo'] / rapport['brut_mo']) * 100:.0f} % de moins)")
+    return rapport
+
+
+def charger_fichiers(commandes, workdir, normaliser=False):
+    """Écrire les commandes en segments puis les relire comme le dashboard"""
+    segments = {}
+    for canal, (prefixe, _) in CANAUX.items():
+        os.makedirs(os.path.join(workdir, canal), exist_ok=True)
+        segments[canal] = SegmentWriter(os.path.join(workdir, canal), prefixe, max_secondes=float("inf"))
+    for commande in commandes:
+        segments[commande['canal']].ecrire(commande)
+    for writer in segments.values():
+        writer.close()
+
+    def charger():
+        loader = IncrementalLoader(base_path=workdir, normaliser=normaliser)
+        return loader.refresh(), loader.lignes if normaliser else None
+    return charger
+
+
+def mesurer(fonction, repeat):
+    """Médiane du temps d'exécution puis pic mémoire (tracemalloc, run séparé)"""
+    durees = []
+    for _ in range(repeat):
+        debut = time.perf_counter()
+        resultat = fonction()
+        durees.append(time.perf_counter() - debut)
+
+    # tracemalloc ralentit l'exécution : la mémoire est mesurée à part
+    tracemalloc.start()
+    fonction()
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    durees.sort()
+    return resultat, {"secondes": durees[len(durees) // 2], "pic_memoire_mo": pic / 1024 / 1024}
+
+
+def bench_taille(n, args):
+    print(f"\n🧪 {n} commandes ({args.source})...")
+    commandes = generer_commandes(n, args.seed)
+    mesures = {}
+
+    with tempfile.TemporaryDirectory(prefix="bench_dashboard_") as workdir:
+        if args.source == "fichiers":
+            charger = charger_fichiers(commandes, workdir, args.normaliser)
+        else:
+            def charger():
+                return charger_memoire(commandes, args.normaliser)
+        (df, lignes), mesures['chargement'] = mesurer(charger, args.repeat)
+
+    # Vues partagées : chaque vue est recalculée (cache cached_property vidé),
+    # celles dont elle dépend restant en cache
+    donnees = DonneesCommandes(df, lignes)
+
+    def recalculer(vue):
+        donnees.__dict__.pop(vue, None)
+        return getattr(donnees, vue)
+    for vue in VUES:
+        if vue == 'lignes' and lignes is not None:
+            # Chargement normalisé : table des lignes construite au chargement
+            continue
+        _, mesures[f'vue:{vue}'] = mesurer(lambda: recalculer(vue), args.repeat)
+
+    # Sections : vues déjà calculées, comme dans compute_all
+    for nom, section in SECTIONS.items():
+        _, mesures[nom] = mesurer(lambda: section(donnees), args.repeat)
+
+    for nom, mesure in mesures.items():
+        print(f"   {nom:<22} {mesure['secondes'] * 1000:10.1f} ms  {mesure['pic_memoire_mo']:8.1f} Mo")
+    total = sum(mesure['secondes'] for mesure in mesures.values())
+    print(f"   {'total':<22} {total * 1000:10.1f} ms")
+    return {"commandes": n, "lignes_dataframe": len(df), "sections": mesures, "total_secondes": total,
+            "memoire": rapport_memoire(commandes)}
+
+
+def main():
+    args = parse_args()
+    output = args.output or os.path.join(RESULTS_DIR, f"dashboard-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+
+    resultats = [bench_taille(n, args) for n in args.sizes]
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            "date": datetime.now().isoformat(),
+            "machine": {"python": platform.python_version(), "plateforme": platform.platform(),
+                        "cpus": os.cpu_count()},
+            "config": vars(args),
+            "resultats": resultats,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Résultats: {output}")
+
+
+if __name__ == "__main__":
+    main()
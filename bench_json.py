@@ -0,0 +1,177 @@
+import os
+import json
+import time
+import argparse
+import platform
+from datetime import datetime
+from typing import Optional, Union
+
+import json_codec
+from bench_collector import RESULTS_DIR
+from data_loader import BASE_PATH, SOURCES
+
+
+# Formes typées des commandes de chaque canal, pour mesurer le décodage validant
+# de msgspec. Elles reflètent les dataclasses de order_model (champs requis par
+# canal en plus) : à tenir à jour avec elles
+msgspec = json_codec.msgspec
+if msgspec is not None:
+    class Produit(msgspec.Struct):
+        nom_produit: str
+        quantite: int
+        prix_unitaire: float
+        prix_total: float
+
+    class Client(msgspec.Struct):
+        nom: str
+        email: Optional[str] = None
+        telephone: Optional[str] = None
+        compte_client: Optional[str] = None
+
+    class Adresse(msgspec.Struct):
+        rue: str
+        ville: str
+        code_postal: str
+        pays: str
+
+    class Appareil(msgspec.Struct):
+        type: str
+        version_app: str
+        os_version: str
+
+    class CommandeBase(msgspec.Struct, tag_field="canal"):
+        id_commande: str
+        date_commande: str
+        client: Client
+        produits: list[Produit]
+        montant_total: float
+        statut: str
+        mode_paiement: str
+
+    class CommandeSiteWeb(CommandeBase, tag="site_web"):
+        adresse_livraison: Adresse
+
+    class CommandeMobile(CommandeBase, tag="application_mobile"):
+        option_livraison: str
+        appareil: Optional[Appareil] = None
+        adresse_livraison: Optional[Adresse] = None
+        boutique_collect: Optional[str] = None
+        frais_livraison: float = 0.0
+        notification_push: bool = False
+        promo_code: Optional[str] = None
+
+    class CommandeBoutique(CommandeBase, tag="boutique_physique"):
+        boutique: str
+        vendeur_id: Optional[str] = None
+
+    # Le champ "canal" choisit la structure à décoder
+    Commande = Union[CommandeSiteWeb, CommandeMobile, CommandeBoutique]
+
+
+def decodeur_type():
+    """Décodeur msgspec vers les structures typées (None si msgspec n'est pas installé)
+
+    Les types sont contrôlés pendant le décodage ; les objets obtenus ne sont
+    pas des dictionnaires (msgspec.to_builtins pour en retrouver un).
+    """
+    if msgspec is None:
+        return None
+    return msgspec.json.Decoder(Commande).decode
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Comparaison des backends JSON sur les fichiers de data/sources")
+    parser.add_argument("--base-path", default=BASE_PATH, help="Répertoire des sources (un sous-répertoire par canal)")
+    parser.add_argument("--repeat", type=int, default=20, help="Passes sur l'ensemble des fichiers (meilleure retenue)")
+    parser.add_argument("--output", default=None, help="Fichier de résultats JSON (défaut : bench_results/)")
+    return parser.parse_args()
+
+
+def lire_sources(base_path):
+    """Contenu brut (bytes) des commandes : un document par fichier .json, une ligne par commande .jsonl"""
+    documents = []
+    for source in SOURCES:
+        source_path = os.path.join(base_path, source)
+        if not os.path.isdir(source_path):
+            continue
+        for nom in sorted(os.listdir(source_path)):
+            if nom.startswith('.'):
+                continue
+            with open(os.path.join(source_path, nom), 'rb') as f:
+                if nom.endswith('.json'):
+                    documents.append(f.read())
+                elif nom.endswith('.jsonl'):
+                    documents.extend(ligne for ligne in f if ligne.strip())
+    return documents
+
+
+def meilleurs_temps(variantes, repeat):
+    """Meilleur temps de chaque variante, mesurées à tour de rôle pour lisser le bruit"""
+    meilleurs = {nom: float("inf") for nom in variantes}
+    for _ in range(repeat):
+        for nom, variante in variantes.items():
+            debut = time.perf_counter()
+            variante()
+            meilleurs[nom] = min(meilleurs[nom], time.perf_counter() - debut)
+    return meilleurs
+
+
+def variantes_backends(documents, commandes):
+    """Décodage et encodage (compact et indenté) pour chaque backend installé"""
+    variantes = {}
+    for nom in json_codec.DISPONIBLES:
+        codec = json_codec.charger_codec(nom)
+        variantes[f"{nom}: décodage"] = lambda codec=codec: [codec.loads(doc) for doc in documents]
+        variantes[f"{nom}: encodage compact"] = lambda codec=codec: [codec.dumps_compact(c) for c in commandes]
+        variantes[f"{nom}: encodage indenté"] = lambda codec=codec: [codec.dumps_indente(c) for c in commandes]
+
+    decoder = decodeur_type()
+    if decoder is not None:
+        variantes["msgspec: décodage typé (Struct)"] = lambda: [decoder(doc) for doc in documents]
+    return variantes
+
+
+def main():
+    args = parse_args()
+    output = args.output or os.path.join(RESULTS_DIR, f"json-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+
+    documents = lire_sources(args.base_path)
+    if not documents:
+        print(f"❌ Aucune commande dans {args.base_path}")
+        return
+    commandes = [json.loads(doc) for doc in documents]
+    octets = sum(len(doc) for doc in documents)
+
+    manquants = [nom for nom in json_codec.FABRIQUES if nom not in json_codec.DISPONIBLES]
+    print(f"🧪 {len(documents)} commandes ({octets / 1024 / 1024:.1f} Mo), meilleur de {args.repeat}")
+    if manquants:
+        print(f"⚠️  Backends non installés: {', '.join(manquants)}")
+
+    durees = meilleurs_temps(variantes_backends(documents, commandes), args.repeat)
+    resultats = {}
+    for nom, duree in durees.items():
+        reference = durees[f"json: {nom.split(': ', 1)[1]}"] if nom.endswith(("compact", "indenté")) \
+            else durees["json: décodage"]
+        resultats[nom] = {
+            "us_par_commande": duree / len(documents) * 1e6,
+            "mo_s": octets / 1024 / 1024 / duree if "décodage" in nom else None,
+            "acceleration": reference / duree,
+        }
+        print(f"   {nom:<34} {resultats[nom]['us_par_commande']:8.2f} µs/commande  x{resultats[nom]['acceleration']:.2f}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            "date": datetime.now().isoformat(),
+            "machine": {"python": platform.python_version(), "plateforme": platform.platform(),
+                        "cpus": os.cpu_count()},
+            "config": vars(args),
+            "backend_actif": json_codec.CODEC.nom,
+            "commandes": len(documents),
+            "resultats": resultats,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\n💾 Résultats: {output}")
+
+
+if __name__ == "__main__":
+    main()
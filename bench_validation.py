@@ -0,0 +1,110 @@
+import time
+import random
+import argparse
+
+from bench_dashboard import generer_commandes
+from validation import valider, valider_lot
+
+
+def validate_json_historique(data, canal):
+    """validate_json avant validation.py (référence du benchmark)"""
+
+    # Champs obligatoires pour tous les canaux
+    required_fields_commun = ["id_commande", "client", "produits", "montant_total", "statut"]
+
+    # Vérification des champs communs
+    for field in required_fields_commun:
+        if field not in data:
+            return False, f"Champ commun manquant: {field}"
+
+    # Validation des champs obligatoires selon le canal
+    if canal == "site_web":
+        if "mode_paiement" not in data:
+            return False, "Champ 'mode_paiement' manquant pour site web"
+        if "adresse_livraison" not in data:
+            return False, "Champ 'adresse_livraison' manquant pour site web"
+
+    elif canal == "application_mobile":
+        if "mode_paiement" not in data:
+            return False, "Champ 'mode_paiement' manquant pour application mobile"
+        if "option_livraison" not in data:
+            return False, "Champ 'option_livraison' manquant pour application mobile"
+
+    elif canal == "boutique_physique":
+        if "boutique" not in data:
+            return False, "Champ 'boutique' manquant pour boutique physique"
+        if "mode_paiement" not in data:
+            return False, "Champ 'mode_paiement' manquant pour boutique physique"
+
+    # Validation de la liste de produits
+    if not isinstance(data["produits"], list) or len(data["produits"]) == 0:
+        return False, "Liste de produits invalide ou vide"
+
+    # Validation de la structure de chaque produit
+    for i, produit in enumerate(data["produits"]):
+        produit_fields = ["nom_produit", "quantite", "prix_unitaire", "prix_total"]
+        for field in produit_fields:
+            if field not in produit:
+                return False, f"Produit {i + 1}: champ '{field}' manquant"
+
+    return True, "OK"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Micro-benchmark de la validation des commandes")
+    parser.add_argument("--n", type=int, default=20000, help="Nombre de commandes validées")
+    parser.add_argument("--invalides", type=float, default=0.05, help="Part de commandes rendues invalides")
+    parser.add_argument("--repeat", type=int, default=15, help="Répétitions (meilleur temps retenu)")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def abimer(commandes, part, seed):
+    """Retirer un champ obligatoire à une partie des commandes"""
+    rng = random.Random(seed)
+    for commande in commandes:
+        if rng.random() < part:
+            if rng.random() < 0.5:
+                del commande[rng.choice(["id_commande", "client", "statut"])]
+            else:
+                del rng.choice(commande["produits"])["quantite"]
+    return commandes
+
+
+def meilleurs_temps(variantes, repeat):
+    """Meilleur temps de chaque variante, mesurées à tour de rôle pour lisser le bruit"""
+    meilleurs = {nom: float("inf") for nom in variantes}
+    for _ in range(repeat):
+        for nom, variante in variantes.items():
+            debut = time.perf_counter()
+            variante()
+            meilleurs[nom] = min(meilleurs[nom], time.perf_counter() - debut)
+    return meilleurs
+
+
+def main():
+    args = parse_args()
+    commandes = abimer(generer_commandes(args.n, args.seed), args.invalides, args.seed)
+
+    # Même verdict que l'ancienne fonction sur les contrôles de structure
+    for commande in commandes:
+        historique, _ = validate_json_historique(commande, commande["canal"])
+        assert historique == (not valider(commande, commande["canal"]))
+
+    # structure : chemin de chaque fichier du collecteur ; complet : contrôles
+    # de types et règles numériques, sur demande
+    variantes = {
+        "validate_json historique": lambda: [validate_json_historique(c, c["canal"]) for c in commandes],
+        "structure": lambda: [valider(c, c["canal"]) for c in commandes],
+        "structure (lot)": lambda: valider_lot(commandes),
+        "complet": lambda: [valider(c, c["canal"], complet=True) for c in commandes],
+    }
+    print(f"🧪 {args.n} commandes ({args.invalides:.0%} invalides), meilleur de {args.repeat}")
+    durees = meilleurs_temps(variantes, args.repeat)
+    reference = durees["validate_json historique"]
+    for nom, duree in durees.items():
+        print(f"   {nom:<26} {duree / args.n * 1e6:7.2f} µs/commande  x{reference / duree:.2f}")
+
+
+if __name__ == "__main__":
+    main()
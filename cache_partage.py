@@ -0,0 +1,362 @@
+import os
+import json
+import time
+import shutil
+import argparse
+import threading
+
+import pandas as pd
+
+# pyarrow est requis par les dashboards (requirements.txt) ; import tolérant
+# pour que le module reste importable sans lui
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# fcntl n'existe pas sous Windows : chaque processus a alors son propre rafraîchisseur
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import analyses
+import mongo_source
+import notifications
+import rollup_source
+from analyses import DonneesCommandes
+from data_loader import Filtre, IncrementalLoader
+
+CACHE_DIR = "./data/cache_dashboard"
+
+# Sources de données des dashboards
+SOURCES = ("fichiers", "mongodb", "rollups")
+
+# Fichier désignant la dernière publication complète
+POINTEUR = "courant.json"
+VERROU = ".verrou"
+
+# Fichier touché pour demander un recalcul immédiat (bouton "Actualiser maintenant")
+DEMANDE = ".recalcul"
+
+# Publications conservées : une session peut encore lire la précédente
+PUBLICATIONS_GARDEES = 2
+
+# Nouvelle tentative (prise du verrou, connexion MongoDB) toutes les N secondes
+ATTENTE_REESSAI = 5.0
+
+# Recalcul de contrôle même sans notification (écritures qui n'en publient pas)
+ATTENTE_MAX = 60
+
+# Vérification des nouvelles publications par les sessions et des demandes de recalcul (secondes)
+INTERVALLE_PUBLICATIONS = 0.5
+
+# Une vue filtrée qu'aucune session n'a consultée depuis N secondes est arrêtée
+INACTIVITE_MAX = 300
+
+
+class CachePartage:
+    """Sections du dashboard publiées en fichiers Arrow IPC, lues par memory-map
+
+    Chaque publication est un répertoire <base>/<vue>/<horodatage>/ contenant
+    un fichier .arrow par table : les DataFrames des sections, leurs
+    sous-tables (panier.stats...) et les métriques globales sur une ligne.
+    courant.json, remplacé atomiquement, désigne la dernière publication
+    complète et décrit la forme de chaque section. La vue est la source, suivie
+    de la clé du filtre pour une vue filtrée.
+    """
+
+    def __init__(self, source, base_dir=CACHE_DIR, filtre=None):
+        if pa is None:
+            raise RuntimeError("pyarrow n'est pas installé (pip install pyarrow)")
+        vue = source if filtre is None or filtre.vide else f"{source}-{filtre.cle()}"
+        self.dossier = os.path.join(base_dir, vue)
+        os.makedirs(self.dossier, exist_ok=True)
+
+    def pointeur(self):
+        try:
+            with open(os.path.join(self.dossier, POINTEUR), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def publication(self):
+        """Nom de la dernière publication (None si rien n'est encore publié)"""
+        pointeur = self.pointeur()
+        return pointeur["publication"] if pointeur else None
+
+    def publier(self, version, resultats):
+        """Écrire les sections d'une version des données puis basculer le pointeur"""
+        nom = str(time.time_ns())
+        tmp = os.path.join(self.dossier, f".{nom}.tmp")
+        os.makedirs(tmp)
+
+        # Forme de chaque section : "ligne" (dict de scalaires), "table" ou liste des sous-tables
+        formes = {}
+        for section, valeur in resultats.items():
+            if isinstance(valeur, pd.DataFrame):
+                formes[section] = "table"
+                ecrire_table(os.path.join(tmp, f"{section}.arrow"), valeur)
+            elif all(isinstance(sous, pd.DataFrame) for sous in valeur.values()):
+                formes[section] = list(valeur)
+                for sous, df in valeur.items():
+                    ecrire_table(os.path.join(tmp, f"{section}.{sous}.arrow"), df)
+            else:
+                formes[section] = "ligne"
+                ecrire_table(os.path.join(tmp, f"{section}.arrow"), pd.DataFrame([valeur]))
+        os.rename(tmp, os.path.join(self.dossier, nom))
+
+        pointeur_tmp = os.path.join(self.dossier, f".{POINTEUR}.tmp")
+        with open(pointeur_tmp, "w", encoding="utf-8") as f:
+            json.dump({"publication": nom, "version": version, "sections": formes}, f)
+        os.replace(pointeur_tmp, os.path.join(self.dossier, POINTEUR))
+        self.nettoyer()
+        return nom
+
+    def nettoyer(self):
+        """Supprimer les publications au-delà des PUBLICATIONS_GARDEES plus récentes"""
+        publications = sorted((entree.name for entree in os.scandir(self.dossier)
+                               if entree.is_dir() and entree.name.isdigit()), key=int)
+        for nom in publications[:-PUBLICATIONS_GARDEES]:
+            # Sous Linux, une table encore mappée reste lisible après suppression
+            shutil.rmtree(os.path.join(self.dossier, nom), ignore_errors=True)
+
+    def lire(self):
+        """(publication, sections) de la dernière publication"""
+        for _ in range(3):
+            pointeur = self.pointeur()
+            if pointeur is None:
+                return None, None
+            try:
+                return pointeur["publication"], self.lire_publication(pointeur)
+            except FileNotFoundError:
+                # Publication nettoyée entre la lecture du pointeur et celle des tables
+                continue
+        return None, None
+
+    def lire_publication(self, pointeur):
+        dossier = os.path.join(self.dossier, pointeur["publication"])
+        resultats = {}
+        for section, forme in pointeur["sections"].items():
+            if forme == "table":
+                resultats[section] = lire_table(os.path.join(dossier, f"{section}.arrow")).to_pandas()
+            elif forme == "ligne":
+                resultats[section] = lire_table(os.path.join(dossier, f"{section}.arrow")).to_pylist()[0]
+            else:
+                resultats[section] = {sous: lire_table(os.path.join(dossier, f"{section}.{sous}.arrow")).to_pandas()
+                                      for sous in forme}
+        return resultats
+
+
+def ecrire_table(path, df):
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(path, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def lire_table(path):
+    """Table Arrow adossée au fichier mappé en mémoire (sans copie à la lecture)"""
+    with pa.memory_map(path) as source:
+        return pa.ipc.open_file(source).read_all()
+
+
+# Veilleur des données et collection MongoDB, ouverts une fois par processus et
+# partagés par toutes les vues (filtrées ou non) d'une même source
+_acces = {}
+_acces_lock = threading.Lock()
+
+
+def acces_source(source):
+    """(veilleur, collection) d'une source ; les rollups partagent la connexion MongoDB"""
+    cle = "fichiers" if source == "fichiers" else "mongodb"
+    with _acces_lock:
+        if cle not in _acces:
+            if cle == "fichiers":
+                _acces[cle] = notifications.veilleur_fichiers(), None
+            else:
+                collection = mongo_source.connect()
+                _acces[cle] = notifications.veilleur_mongo(collection), collection
+        return _acces[cle]
+
+
+def preparer_source(source, filtre=None):
+    """(veilleur, lire_version, calculer) d'une source de données
+
+    lire_version() est peu coûteux ; calculer() n'est appelé que si la
+    version a changé depuis la dernière publication. Le filtre est appliqué
+    au chargement : fichiers écartés sur leur nom, requêtes MongoDB indexées.
+    """
+    veilleur, collection = acces_source(source)
+    if source == "fichiers":
+        # Schéma typé : le DataFrame du rafraîchisseur est le seul gardé en mémoire
+        loader = IncrementalLoader(normaliser=True, filtre=filtre)
+
+        def calculer():
+            df = loader.df
+            if df.empty:
+                # Même écran "aucune donnée" que les sources MongoDB vides
+                return {'metriques': {'total_commandes': 0}}
+            return analyses.compute_all(DonneesCommandes(df, loader.lignes))
+        return veilleur, lambda: loader.instantane()[1], calculer
+
+    module = rollup_source if source == "rollups" else mongo_source
+    return (veilleur, lambda: mongo_source.version(collection),
+            lambda: module.compute_all(collection, filtre))
+
+
+class Rafraichisseur:
+    """Thread unique qui recalcule les sections d'une vue à chaque changement et les publie
+
+    Les sessions ne calculent plus rien : elles lisent la dernière publication.
+    Plusieurs serveurs Streamlit (ou un processus lancé à part, voir main)
+    peuvent partager le même répertoire : un verrou fcntl désigne celui qui
+    calcule, les autres restent en attente et prennent le relais s'il s'arrête.
+    Une vue filtrée s'arrête après INACTIVITE_MAX secondes sans consultation.
+    """
+
+    def __init__(self, source, base_dir=CACHE_DIR, filtre=None):
+        self.source = source
+        self.filtre = filtre or Filtre()
+        self.cache = CachePartage(source, base_dir, self.filtre)
+        # Dernière erreur de calcul (MongoDB indisponible...), None si tout va bien
+        self.erreur = None
+        self.actif = True
+        self.consultation = time.monotonic()
+        self._verrou = None
+        # Les sessions surveillent les publications du rafraîchisseur, pas les données
+        self.publications = notifications.Veilleur(self.cache.publication, intervalle=INTERVALLE_PUBLICATIONS)
+        self._thread = threading.Thread(target=self.boucle, name=f"rafraichisseur-{source}", daemon=True)
+        self._thread.start()
+
+    def consulter(self):
+        self.consultation = time.monotonic()
+
+    def forcer(self):
+        """Demander un recalcul de la vue même sans changement de version
+
+        La demande passe par un fichier : elle atteint le rafraîchisseur qui
+        tient le verrou, même dans un autre processus.
+        """
+        chemin = os.path.join(self.cache.dossier, DEMANDE)
+        with open(chemin, "a"):
+            pass
+        os.utime(chemin)
+
+    def demande(self):
+        """Date de la dernière demande de recalcul (None si aucune)"""
+        try:
+            return os.stat(os.path.join(self.cache.dossier, DEMANDE)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def inactif(self):
+        """Vue filtrée qu'aucune session n'a consultée depuis INACTIVITE_MAX secondes"""
+        return not self.filtre.vide and time.monotonic() - self.consultation > INACTIVITE_MAX
+
+    def prendre_verrou(self):
+        if fcntl is None:
+            return True
+        if self._verrou is None:
+            self._verrou = open(os.path.join(self.cache.dossier, VERROU), "w")
+        try:
+            fcntl.flock(self._verrou, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except BlockingIOError:
+            return False
+
+    def arreter(self):
+        self.actif = False
+        self.publications.arreter()
+        if self._verrou is not None:
+            # Fermer le fichier libère le verrou fcntl
+            self._verrou.close()
+            self._verrou = None
+
+    def boucle(self):
+        try:
+            self.rafraichir()
+        finally:
+            self.arreter()
+
+    def rafraichir(self):
+        while not self.prendre_verrou():
+            if self.inactif():
+                return
+            time.sleep(ATTENTE_REESSAI)
+
+        while True:
+            try:
+                veilleur, lire_version, calculer = preparer_source(self.source, self.filtre)
+                break
+            except Exception as e:
+                self.erreur = e
+                if self.inactif():
+                    return
+                time.sleep(ATTENTE_REESSAI)
+
+        pointeur = self.cache.pointeur()
+        publiee = pointeur["version"] if pointeur else None
+        traitee = self.demande()
+        while not self.inactif():
+            vue = veilleur.version
+            demande = self.demande()
+            try:
+                # Version normalisée comme dans le pointeur (tuple MongoDB -> liste JSON)
+                version = json.loads(json.dumps(lire_version()))
+                if version != publiee or demande != traitee:
+                    self.cache.publier(version, calculer())
+                    publiee = version
+                    traitee = demande
+                self.erreur = None
+            except Exception as e:
+                # Les sessions gardent la dernière publication
+                self.erreur = e
+            # Attente par tranches : une demande de recalcul est vue sans attendre les données
+            echeance = time.monotonic() + ATTENTE_MAX
+            while veilleur.version == vue and self.demande() == demande and time.monotonic() < echeance:
+                veilleur.attendre(vue, timeout=INTERVALLE_PUBLICATIONS)
+
+    def join(self):
+        self._thread.join()
+
+
+# Rafraîchisseurs de ce processus par vue (source, filtre, répertoire)
+_rafraichisseurs = {}
+_rafraichisseurs_lock = threading.Lock()
+
+
+def rafraichisseur_partage(source, filtre=None, base_dir=CACHE_DIR):
+    """Rafraîchisseur d'une vue, démarré à la première consultation puis partagé entre les sessions"""
+    cle = (source, filtre or Filtre(), base_dir)
+    with _rafraichisseurs_lock:
+        # Oublier les vues filtrées arrêtées faute de consultation
+        for arretee in [c for c, r in _rafraichisseurs.items() if not r.actif]:
+            del _rafraichisseurs[arretee]
+        rafraichisseur = _rafraichisseurs.get(cle)
+        if rafraichisseur is None:
+            rafraichisseur = _rafraichisseurs[cle] = Rafraichisseur(source, base_dir, filtre)
+        rafraichisseur.consulter()
+        return rafraichisseur
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rafraîchisseur partagé des sections du dashboard")
+    parser.add_argument("--source", choices=SOURCES, nargs="+", default=list(SOURCES),
+                        help="Sources à maintenir (défaut : toutes)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Répertoire des publications Arrow")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    print(f"🔄 Rafraîchisseur: {', '.join(args.source)} -> {args.cache_dir}")
+    rafraichisseurs = [Rafraichisseur(source, args.cache_dir) for source in args.source]
+    try:
+        for rafraichisseur in rafraichisseurs:
+            rafraichisseur.join()
+    except KeyboardInterrupt:
+        print("\n🛑 Arrêt du rafraîchisseur")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,49 @@
 import os
-import json
+import sys
 import time
-import shutil
+import queue
+import argparse
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
 from pymongo import MongoClient
-from pymongo.errors import DuplicateKeyError
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from archive_store import ArchiveStore, ARCHIVE_DIR, FORMATS_BUNDLE
+from dedup import Deduplicateur, TAILLE_RECENTS
+from journal import Journal, JOURNAL_PATH
+from json_codec import ERREURS_DECODAGE, loads, lire_fichier as lire_json
+from order_model import Commande
+from metrics import Compteur, Histogramme, Jauge, demarrer_serveur
+from parquet_sink import ParquetSink, PARQUET_DIR
+from validation import valider
+from resilience import Disjoncteur, avec_reprises
+from rollups import ensure_indexes as ensure_rollup_indexes, incrementer_version, rebuild_rollups, update_rollups
+
+# watchdog est optionnel : sans lui, le collecteur reste en mode polling
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
 
 # Configuration MongoDB
 MONGO_URI = "mongodb://localhost:27017/"
 DATABASE_NAME = "multi_market"
 COLLECTION_NAME = "commandes"
 
+# Code d'erreur MongoDB d'une violation d'index unique
+DUPLICATE_KEY_CODE = 11000
+
+# Options du client MongoDB (surchargées par la ligne de commande)
+MONGO_POOL_MAX = 20
+MONGO_POOL_MIN = 2
+MONGO_WRITE_CONCERN = "1"
+MONGO_WTIMEOUT_MS = 10000
+MONGO_SELECTION_TIMEOUT_MS = 5000
+
 # Répertoires à surveiller
 SOURCE_DIRS = [
     "./data/sources/site_web",
@@ -18,10 +51,36 @@ SOURCE_DIRS = [
     "./data/sources/boutique_physique"
 ]
 
-ARCHIVE_DIR = "./data/archive"
+# Intervalle du mode polling (secondes)
+SCAN_INTERVAL = 10
+
+# Mode watch : rescan de sécurité si aucun événement n'arrive (secondes)
+RECONCILIATION_INTERVAL = 60
+
+# Mode pipeline : fichiers soumis au pool et places dans la file d'écriture, par worker
+PIPELINE_TRANCHE_PAR_WORKER = 64
+PIPELINE_FILE_PAR_WORKER = 16
+
+# Archive partitionnée canal/date/heure (regroupement et rétention configurés par main)
+archive = ArchiveStore()
+
+# Pré-agrégats (rollups) mis à jour à chaque insertion, désactivables par --no-rollups
+rollups_actifs = True
+
+# Zone d'atterrissage Parquet (--parquet), en plus de l'archive JSON
+parquet_sink = None
+
+# Journal local des écritures (reprise exacte après un arrêt), ouvert par main sauf --no-journal
+journal = None
+
+# Pré-contrôle des doublons (filtre de Bloom + identifiants récents), créé par main sauf --no-dedup
+deduplicateur = None
+
+# Disjoncteur des écritures : suspend le traitement tant que MongoDB est indisponible
+disjoncteur = Disjoncteur()
 
-# Créer le répertoire d'archive s'il n'existe pas
-os.makedirs(ARCHIVE_DIR, exist_ok=True)
+# Lots insert_many envoyés en parallèle (--ecritures-paralleles > 1), créé par main
+pool_ecriture = None
 
 # Statistiques
 stats = {
@@ -29,19 +88,56 @@ stats = {
     "succes": 0,
     "erreurs": 0,
     "doublons": 0,
-    "par_canal": {"site_web": 0, "application_mobile": 0, "boutique_physique": 0}
+    "par_canal": {"site_web": 0, "application_mobile": 0, "boutique_physique": 0},
+    # Temps cumulé passé dans chaque étape (secondes de travail, tous workers confondus)
+    "etapes": {
+        "preparation": {"fichiers": 0, "secondes": 0.0},
+        "ecriture": {"fichiers": 0, "secondes": 0.0}
+    }
 }
 
-
-def connect_mongodb():
+# Métriques Prometheus (--metrics-port) : mises à jour en même temps que stats
+metrique_traitees = Compteur("collector_commandes_traitees_total", "Commandes lues dans les fichiers", ["canal"])
+metrique_commandes = Compteur("collector_commandes_total", "Commandes par canal et résultat (succes, doublon, erreur)",
+                              ["canal", "resultat"])
+metrique_archivage = Compteur("collector_archivage_erreurs_total", "Fichiers traités non archivés suite à une erreur")
+metrique_traitement = Histogramme("collector_traitement_fichier_secondes",
+                                  "Durée de bout en bout d'un fichier (préparation, écriture, archivage)")
+metrique_preparation = Histogramme("collector_preparation_fichier_secondes",
+                                   "Durée de lecture, validation et standardisation d'un fichier")
+metrique_mongo = Histogramme("collector_mongo_ecriture_secondes", "Durée des écritures MongoDB", ["operation"])
+metrique_cycles = Compteur("collector_cycles_total", "Cycles de traitement (scan ou rafale d'événements)")
+metrique_cycle_duree = Jauge("collector_cycle_duree_secondes", "Durée du dernier cycle de traitement")
+# Calculée au moment du scrape : aucun coût sur le chemin d'ingestion
+metrique_en_attente = Jauge("collector_fichiers_en_attente", "Fichiers en attente par répertoire source", ["source"],
+                            fonction=lambda: compter_en_attente())
+metrique_reprises = Compteur("collector_mongo_reprises_total",
+                              "Écritures MongoDB retentées après une erreur transitoire", ["operation"])
+metrique_disjoncteur = Jauge("collector_disjoncteur_ouvert", "1 si les écritures MongoDB sont suspendues",
+                             fonction=lambda: {(): int(disjoncteur.ouvert)})
+metrique_dedup = Compteur("collector_dedup_total",
+                          "Pré-contrôle des doublons (cache, confirme, faux_positif, nouveau)", ["resultat"])
+
+
+def connect_mongodb(pool_max=MONGO_POOL_MAX, pool_min=MONGO_POOL_MIN, write_concern=MONGO_WRITE_CONCERN,
+                    wtimeout_ms=MONGO_WTIMEOUT_MS):
     """Établir la connexion à MongoDB"""
     try:
-        client = MongoClient(MONGO_URI)
+        # Le pilote retente déjà une fois chaque écriture (retryWrites) ; les
+        # reprises avec backoff du collecteur viennent en complément
+        client = MongoClient(MONGO_URI, maxPoolSize=pool_max, minPoolSize=pool_min,
+                             w=write_concern if write_concern == "majority" else int(write_concern),
+                             wTimeoutMS=wtimeout_ms, retryWrites=True,
+                             serverSelectionTimeoutMS=MONGO_SELECTION_TIMEOUT_MS)
         db = client[DATABASE_NAME]
         collection = db[COLLECTION_NAME]
 
         # Créer un index unique sur id_commande pour éviter les doublons
         collection.create_index("id_commande", unique=True)
+        # Filtres des dashboards (mongo_source.selection) : période seule, ou canaux puis période
+        collection.create_index("date_commande")
+        collection.create_index([("canal", 1), ("date_commande", 1)])
+        ensure_rollup_indexes(db)
 
         print("✅ Connexion à MongoDB établie")
         print(f"   Base de données: {DATABASE_NAME}")
@@ -54,90 +150,20 @@ def connect_mongodb():
 
 
 def standardize_commande(data, canal):
-    """Standardiser la structure de la commande pour MongoDB"""
-
-    # Structure commune à tous les canaux
-    commande_standard = {
-        "id_commande": data.get("id_commande", ""),
-        "canal": canal,
-        "date_commande": data.get("date_commande", datetime.now().isoformat()),
-        "client": data.get("client", {}),
-        "produits": data.get("produits", []),
-        "montant_total": data.get("montant_total", 0.0),
-        "statut": data.get("statut", "inconnu"),
-        "date_import": datetime.now().isoformat()
-    }
-
-    # Ajouter les champs spécifiques à chaque canal
-    if canal == "site_web":
-        commande_standard.update({
-            "adresse_livraison": data.get("adresse_livraison", {}),
-            "mode_paiement": data.get("mode_paiement", "inconnu")
-        })
-
-    elif canal == "application_mobile":
-        commande_standard.update({
-            "appareil": data.get("appareil", {}),
-            "adresse_livraison": data.get("adresse_livraison"),
-            "boutique_collect": data.get("boutique_collect"),
-            "mode_paiement": data.get("mode_paiement", "inconnu"),
-            "option_livraison": data.get("option_livraison", "standard"),
-            "frais_livraison": data.get("frais_livraison", 0.0),
-            "notification_push": data.get("notification_push", False),
-            "promo_code": data.get("promo_code")
-        })
-
-    elif canal == "boutique_physique":
-        commande_standard.update({
-            "boutique": data.get("boutique", "inconnue"),
-            "mode_paiement": data.get("mode_paiement", "inconnu"),
-            "vendeur_id": data.get("vendeur_id", "inconnu")
-        })
-
-    return commande_standard
+    """Standardiser la commande pour MongoDB : une conversion vers le modèle typé (order_model)"""
+    return Commande.depuis_dict(data, canal, datetime.now().isoformat())
 
 
 def validate_json(data, canal):
-    """Valider la structure d'une commande selon son canal"""
-
-    # Champs obligatoires pour tous les canaux
-    required_fields_commun = ["id_commande", "client", "produits", "montant_total", "statut"]
-
-    # Vérification des champs communs
-    for field in required_fields_commun:
-        if field not in data:
-            return False, f"Champ commun manquant: {field}"
-
-    # Validation des champs obligatoires selon le canal
-    if canal == "site_web":
-        if "mode_paiement" not in data:
-            return False, "Champ 'mode_paiement' manquant pour site web"
-        if "adresse_livraison" not in data:
-            return False, "Champ 'adresse_livraison' manquant pour site web"
-
-    elif canal == "application_mobile":
-        if "mode_paiement" not in data:
-            return False, "Champ 'mode_paiement' manquant pour application mobile"
-        if "option_livraison" not in data:
-            return False, "Champ 'option_livraison' manquant pour application mobile"
-
-    elif canal == "boutique_physique":
-        if "boutique" not in data:
-            return False, "Champ 'boutique' manquant pour boutique physique"
-        if "mode_paiement" not in data:
-            return False, "Champ 'mode_paiement' manquant pour boutique physique"
-
-    # Validation de la liste de produits
-    if not isinstance(data["produits"], list) or len(data["produits"]) == 0:
-        return False, "Liste de produits invalide ou vide"
-
-    # Validation de la structure de chaque produit
-    for i, produit in enumerate(data["produits"]):
-        produit_fields = ["nom_produit", "quantite", "prix_unitaire", "prix_total"]
-        for field in produit_fields:
-            if field not in produit:
-                return False, f"Produit {i + 1}: champ '{field}' manquant"
-
+    """Valider la structure d'une commande selon son canal
+
+    Délègue à valider (validation.py) : contrôle de structure seul sur le
+    chemin de chaque fichier ; toutes les erreurs trouvées sont regroupées
+    dans le message.
+    """
+    erreurs = valider(data, canal)
+    if erreurs:
+        return False, " ; ".join(erreurs)
     return True, "OK"
 
 
@@ -157,73 +183,618 @@ def detect_canal_from_filename(filename):
         return "inconnu"
 
 
-def process_file(filepath, collection):
-    """Traiter un fichier JSON et l'insérer dans MongoDB"""
+def prepare_data(data, filename):
+    """Valider et standardiser une commande déjà décodée
+
+    Retourne un tuple (statut, commande_standard, canal, message) où statut
+    vaut "ok" ou "invalide".
+    """
+    # Détecter le canal
+    canal_detected = detect_canal_from_filename(filename)
+
+    # Si le canal n'est pas déjà dans les données, l'ajouter
+    if "canal" not in data:
+        data["canal"] = canal_detected
+    else:
+        canal_detected = data["canal"]
+
+    # Valider les données selon le canal
+    is_valid, message = validate_json(data, canal_detected)
+    if not is_valid:
+        return "invalide", None, canal_detected, message
+
+    # Standardiser la structure
+    return "ok", standardize_commande(data, canal_detected), canal_detected, "OK"
+
+
+def prepare_commande(filepath):
+    """Lire, valider et standardiser une commande sans l'écrire dans MongoDB
+
+    Retourne un tuple (statut, commande_standard, canal, message) où statut
+    vaut "ok", "invalide", "json_invalide" ou "erreur".
+    """
     try:
-        # Lire le fichier JSON
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
+        # Lire le fichier JSON (décodeur le plus rapide installé, voir json_codec)
+        data = lire_json(filepath)
 
-        # Détecter le canal
-        filename = os.path.basename(filepath)
-        canal_detected = detect_canal_from_filename(filename)
+    except ERREURS_DECODAGE as e:
+        return "json_invalide", None, None, str(e)
 
-        # Si le canal n'est pas déjà dans les données, l'ajouter
-        if "canal" not in data:
-            data["canal"] = canal_detected
-        else:
-            canal_detected = data["canal"]
+    except Exception as e:
+        return "erreur", None, None, str(e)
+
+    try:
+        return prepare_data(data, os.path.basename(filepath))
+
+    except Exception as e:
+        return "erreur", None, None, str(e)
+
+
+def prepare_segment(filepath):
+    """Préparer un segment .jsonl ligne par ligne (une commande par ligne)
+
+    Une ligne illisible ou invalide donne un résultat "rejet_ligne" sans
+    bloquer les autres lignes du segment.
+    """
+    filename = os.path.basename(filepath)
+    resultats = []
+    try:
+        # Lignes lues en bytes : le décodeur JSON traite directement l'UTF-8
+        with open(filepath, 'rb') as f:
+            for numero, ligne in enumerate(f, start=1):
+                if not ligne.strip():
+                    continue
+                try:
+                    resultat = prepare_data(loads(ligne), filename)
+                except Exception as e:
+                    resultat = ("invalide", None, None, f"{type(e).__name__}: {e}")
+
+                statut, commande_standard, canal, message = resultat
+                if statut != "ok":
+                    resultat = ("rejet_ligne", None, canal, f"ligne {numero}: {message}")
+                resultats.append(resultat)
+
+    except Exception as e:
+        return [("erreur", None, None, str(e))]
+
+    return resultats
+
+
+def prepare_file(filepath):
+    """Préparer toutes les commandes d'un fichier (.json unitaire ou segment .jsonl)"""
+    if filepath.endswith(".jsonl"):
+        return prepare_segment(filepath)
+    return [prepare_commande(filepath)]
 
-        # Valider les données selon le canal
-        is_valid, message = validate_json(data, canal_detected)
-        if not is_valid:
-            print(f"   ⚠️  Validation échouée pour {filename}: {message}")
-            stats["erreurs"] += 1
-            return False
 
-        # Standardiser la structure
-        commande_standard = standardize_commande(data, canal_detected)
+def prepare_file_timed(filepath):
+    """prepare_file avec sa durée, pour les workers du pool de processus"""
+    debut = time.perf_counter()
+    resultats = prepare_file(filepath)
+    return resultats, time.perf_counter() - debut
 
-        # Insérer dans MongoDB
-        collection.insert_one(commande_standard)
 
-        # Mettre à jour les statistiques
-        stats["succes"] += 1
-        stats["par_canal"][canal_detected] += 1
+def record_etape(nom, fichiers, secondes):
+    """Cumuler le débit d'une étape du traitement"""
+    etape = stats["etapes"][nom]
+    etape["fichiers"] += fichiers
+    etape["secondes"] += secondes
 
-        print(f"   ✅ Commande insérée: {commande_standard['id_commande']} ({canal_detected})")
 
-        # Archiver le fichier
-        archive_path = os.path.join(ARCHIVE_DIR, filename)
-        shutil.move(filepath, archive_path)
+def record_preparation(secondes):
+    """Comptabiliser la préparation d'un fichier"""
+    record_etape("preparation", 1, secondes)
+    metrique_preparation.observe(secondes)
 
+
+def archive_file(filepath):
+    """Déplacer un fichier traité vers sa partition d'archive (canal/date/heure)"""
+    if os.path.exists(filepath):
+        archive.archiver(filepath)
+
+
+def handle_rejet(filepath, statut, message, canal=None):
+    """Comptabiliser une commande rejetée avant toute écriture MongoDB
+
+    Retourne True si le fichier peut tout de même être archivé.
+    """
+    filename = os.path.basename(filepath)
+    record_erreur(canal)
+
+    if statut == "rejet_ligne":
+        print(f"   ⚠️  Ligne rejetée dans {filename}: {message}")
+        # Le segment est archivé tel quel ; le journal indique les lignes à reprendre
+        with open(archive.journal_rejets(filepath), 'a', encoding='utf-8') as f:
+            f.write(message + "\n")
         return True
 
-    except DuplicateKeyError:
-        stats["doublons"] += 1
-        print(f"   ⚠️  Doublon détecté: {filename}")
-        # Archiver quand même
-        archive_path = os.path.join(ARCHIVE_DIR, filename)
-        if os.path.exists(filepath):
-            shutil.move(filepath, archive_path)
-        return False
-
-    except json.JSONDecodeError as e:
-        stats["erreurs"] += 1
-        print(f"   ❌ Erreur JSON dans {filename}: {e}")
-        # Déplacer le fichier corrompu vers un dossier d'erreurs
-        error_dir = os.path.join(ARCHIVE_DIR, "erreurs")
-        os.makedirs(error_dir, exist_ok=True)
-        error_path = os.path.join(error_dir, filename)
+    if statut == "invalide":
+        print(f"   ⚠️  Validation échouée pour {filename}: {message}")
+
+    elif statut == "json_invalide":
+        print(f"   ❌ Erreur JSON dans {filename}: {message}")
+        # Déplacer le fichier corrompu vers la partition d'erreurs
         if os.path.exists(filepath):
-            shutil.move(filepath, error_path)
-        print(f"   📁 Fichier déplacé vers: {error_path}")
-        return False
+            error_path = archive.archiver(filepath, erreurs=True)
+            print(f"   📁 Fichier déplacé vers: {error_path}")
+
+    else:
+        print(f"   ❌ Erreur lors du traitement de {filename}: {message}")
+
+    return False
+
+
+def record_success(commande_standard, canal):
+    """Mettre à jour les statistiques après une insertion réussie"""
+    stats["succes"] += 1
+    stats["par_canal"][canal] += 1
+    metrique_commandes.inc(canal=canal, resultat="succes")
+    print(f"   ✅ Commande insérée: {commande_standard.id_commande} ({canal})")
+
+
+def record_doublon(filepath, canal):
+    """Comptabiliser un doublon (le fichier sera archivé quand même)"""
+    stats["doublons"] += 1
+    metrique_commandes.inc(canal=canal, resultat="doublon")
+    print(f"   ⚠️  Doublon détecté: {os.path.basename(filepath)}")
+
+
+def record_erreur(canal, nombre=1, archivage=False):
+    """Comptabiliser des erreurs : seul point de mise à jour de stats["erreurs"]
+
+    Commandes en erreur (rejet ou échec d'écriture) par défaut ; avec
+    archivage, fichiers traités mais non archivés (métrique dédiée, leurs
+    commandes étant déjà comptées).
+    """
+    stats["erreurs"] += nombre
+    if archivage:
+        metrique_archivage.inc(nombre)
+    else:
+        metrique_commandes.inc(nombre, canal=canal or "inconnu", resultat="erreur")
+
+
+def after_insert(commandes, collection):
+    """Propager des commandes fraîchement insérées vers les pré-agrégats et la zone Parquet
+
+    La version des données lue par les dashboards est ensuite incrémentée,
+    puis les commandes sont marquées "insere" dans le journal.
+    """
+    if not commandes:
+        return
+
+    if parquet_sink is not None:
+        parquet_sink.ajouter(commandes)
+
+    if rollups_actifs:
+        try:
+            update_rollups(collection.database, commandes)
+        except Exception as e:
+            # Les commandes sont déjà en base : --rebuild-rollups permet de rattraper
+            print(f"   ⚠️  Mise à jour des rollups échouée ({len(commandes)} commande(s)): {e}")
+
+    # Après les rollups : un dashboard qui voit la nouvelle version lit des rollups à jour
+    try:
+        incrementer_version(collection.database, collection.name)
+    except Exception as e:
+        print(f"   ⚠️  Version des données non incrémentée: {e}")
+
+    if journal is not None:
+        # Propagation terminée : une commande encore "en_cours" au redémarrage
+        # n'a pas été propagée, et le sera à sa reprise (voir reprises)
+        journal.fin_ecriture([commande["id_commande"] for commande in commandes])
+
+
+def write_commande(filepath, commande_standard, canal, collection, reprises=frozenset()):
+    """Insérer une commande standardisée (insert_one)
+
+    Retourne "insere", "doublon", "deja" (insertion d'avant un arrêt, voir
+    reprises) ou "erreur".
+    """
+    debut = time.perf_counter()
+    document = commande_standard.vers_dict()
+    echecs, sur_reprise = suivi_reprises("insert_one")
+    try:
+        avec_reprises(lambda: collection.insert_one(document), disjoncteur, sur_reprise=sur_reprise)
+        metrique_mongo.observe(time.perf_counter() - debut, operation="insert_one")
+        record_success(commande_standard, canal)
+        after_insert([document], collection)
+        return "insere"
+
+    except DuplicateKeyError:
+        metrique_mongo.observe(time.perf_counter() - debut, operation="insert_one")
+        if echecs:
+            try:
+                notre = document["_id"] in deja_inseres([document], collection)
+            except Exception as e:
+                record_erreur(canal)
+                print(f"   ❌ Vérification du doublon de {os.path.basename(filepath)} impossible: {e}")
+                return "erreur"
+            if notre:
+                # Doublon après une reprise : la tentative interrompue avait inséré
+                # la commande, seul l'acquittement a été perdu
+                record_success(commande_standard, canal)
+                after_insert([document], collection)
+                return "insere"
+        if commande_standard.id_commande in reprises:
+            # Insérée avant un arrêt mais pas propagée : rollups et Parquet rattrapés
+            after_insert([document], collection)
+            return "deja"
+        record_doublon(filepath, canal)
+        return "doublon"
+
+    except Exception as e:
+        record_erreur(canal)
+        print(f"   ❌ Erreur lors du traitement de {os.path.basename(filepath)}: {e}")
+        return "erreur"
+
 
+def deja_inseres(documents, collection):
+    """_id des documents présents en base sous leur propre _id
+
+    Le pilote attribue l'_id avant le premier envoi et le garde pour les
+    reprises : un doublon portant cet _id vient d'une tentative interrompue,
+    un autre _id est un vrai doublon (commande déjà présente, ou répétée
+    dans le lot).
+    """
+    ids = [document["_id"] for document in documents if "_id" in document]
+    if not ids:
+        return set()
+    return {document["_id"] for document in collection.find({"_id": {"$in": ids}}, {"_id": 1})}
+
+
+def suivi_reprises(operation):
+    """Callback sur_reprise de avec_reprises ; la liste retournée garde les erreurs retentées"""
+    echecs = []
+
+    def sur_reprise(erreur):
+        echecs.append(erreur)
+        metrique_reprises.inc(operation=operation)
+        print(f"   🔁 Écriture MongoDB retentée ({operation}): {erreur}")
+    return echecs, sur_reprise
+
+
+def inserer_lot(documents, collection):
+    """Appel insert_many(ordered=False) d'un lot, avec reprises sur erreur transitoire
+
+    Sans état partagé : peut s'exécuter dans le pool d'écritures parallèles.
+    Retourne (erreurs par index dans le lot, True si une tentative a été retentée).
+    """
+    erreurs_par_index = {}
+    echecs, sur_reprise = suivi_reprises("insert_many")
+    debut = time.perf_counter()
+    try:
+        avec_reprises(lambda: collection.insert_many(documents, ordered=False), disjoncteur, sur_reprise=sur_reprise)
+    except BulkWriteError as e:
+        # En mode non ordonné, MongoDB tente chaque document et renvoie
+        # l'index (dans le lot) de chacun de ceux qui ont échoué
+        for erreur in e.details.get("writeErrors", []):
+            erreurs_par_index[erreur["index"]] = erreur
+    metrique_mongo.observe(time.perf_counter() - debut, operation="insert_many")
+    return erreurs_par_index, bool(echecs)
+
+
+def write_batch(lot, collection, reprises=frozenset(), documents=None, insertion=None):
+    """Insérer un lot avec insert_many(ordered=False) et répartir le résultat par commande
+
+    lot est une liste de tuples (filepath, commande_standard, canal). Retourne
+    la liste des issues ("insere", "doublon", "deja" ou "erreur") dans l'ordre du lot.
+    Avec les écritures parallèles, documents et insertion (futur d'inserer_lot)
+    sont fournis par l'appelant : seul le bilan est fait ici.
+    """
+    if documents is None:
+        documents = [commande.vers_dict() for _, commande, _ in lot]
+    try:
+        if insertion is not None:
+            erreurs_par_index, reprise = insertion.result()
+        else:
+            erreurs_par_index, reprise = inserer_lot(documents, collection)
     except Exception as e:
-        stats["erreurs"] += 1
-        print(f"   ❌ Erreur lors du traitement de {filename}: {e}")
-        return False
+        # Échec global (connexion, timeout...) : les fichiers restent en place
+        # et seront repris au prochain cycle
+        for _, _, canal in lot:
+            record_erreur(canal)
+        print(f"   ❌ Échec de l'insertion groupée de {len(lot)} commande(s): {e}")
+        return ["erreur"] * len(lot)
+
+    nos_doublons = set()
+    non_verifies = False
+    if reprise:
+        suspects = [documents[index] for index, erreur in erreurs_par_index.items()
+                    if erreur.get("code") == DUPLICATE_KEY_CODE]
+        try:
+            nos_doublons = deja_inseres(suspects, collection)
+        except Exception as e:
+            # Origine des doublons inconnue : ces commandes seront reprises au prochain cycle
+            non_verifies = True
+            print(f"   ❌ Vérification des doublons après reprise impossible: {e}")
+
+    issues = []
+    inseres = []
+    rejouees = []
+    for index, (filepath, commande_standard, canal) in enumerate(lot):
+        erreur = erreurs_par_index.get(index)
+        doublon = erreur is not None and erreur.get("code") == DUPLICATE_KEY_CODE
+        if doublon and documents[index].get("_id") in nos_doublons:
+            # Doublon après une reprise : inséré par la tentative dont l'acquittement a été perdu
+            erreur = None
+        elif doublon and non_verifies:
+            record_erreur(canal)
+            issues.append("erreur")
+            continue
+        if erreur is None:
+            record_success(commande_standard, canal)
+            inseres.append(documents[index])
+            issues.append("insere")
+        elif erreur.get("code") == DUPLICATE_KEY_CODE and commande_standard.id_commande in reprises:
+            # Insérée avant un arrêt mais pas propagée : rollups et Parquet rattrapés
+            rejouees.append(documents[index])
+            issues.append("deja")
+        elif erreur.get("code") == DUPLICATE_KEY_CODE:
+            record_doublon(filepath, canal)
+            issues.append("doublon")
+        else:
+            record_erreur(canal)
+            print(f"   ❌ Erreur d'insertion pour {os.path.basename(filepath)}: {erreur.get('errmsg')}")
+            issues.append("erreur")
+
+    after_insert(inseres + rejouees, collection)
+    return issues
+
+
+def write_resultats(resultats, collection, batch_size, debuts=None):
+    """Écrire des fichiers préparés puis archiver ceux dont toutes les commandes sont traitées
+
+    resultats est une liste de (filepath, [résultat de prepare_commande, ...]) :
+    un résultat pour un fichier .json, un par ligne pour un segment .jsonl.
+    debuts donne l'instant (perf_counter) où le traitement de chaque fichier a
+    commencé, pour la latence de bout en bout ; à défaut, le début de l'écriture.
+    Retourne le nombre de commandes insérées.
+    """
+    debut = time.perf_counter()
+    archivable = {}
+    prets = []
+    for filepath, resultats_fichier in resultats:
+        archivable[filepath] = True
+        for statut, commande_standard, canal, message in resultats_fichier:
+            stats["total_traite"] += 1
+            metrique_traitees.inc(canal=canal or "inconnu")
+            if statut != "ok":
+                archivable[filepath] = handle_rejet(filepath, statut, message, canal) and archivable[filepath]
+            else:
+                prets.append((filepath, commande_standard, canal))
+
+    issues = write_commandes(prets, collection, batch_size)
+
+    # Après une erreur MongoDB, le fichier reste en place pour être repris au
+    # prochain cycle (les lignes déjà insérées d'un segment seront vues comme doublons)
+    for (filepath, _, _), issue in zip(prets, issues):
+        if issue == "erreur":
+            archivable[filepath] = False
+
+    a_archiver = [filepath for filepath, ok in archivable.items() if ok]
+    if journal is not None:
+        # Un arrêt entre l'écriture et l'archivage ne fera pas relire ces fichiers
+        journal.marquer_ecrits(a_archiver)
+    archiver_fichiers(a_archiver)
+
+    fin = time.perf_counter()
+    debuts = debuts or {}
+    for filepath, _ in resultats:
+        metrique_traitement.observe(fin - debuts.get(filepath, debut))
+    record_etape("ecriture", len(resultats), fin - debut)
+    return issues.count("insere")
+
+
+def write_commandes(prets, collection, batch_size):
+    """Écrire les commandes prêtes (tuples (filepath, commande, canal)) ; retourne leurs issues
+
+    Avec le journal, une commande déjà insérée n'est pas renvoyée à MongoDB :
+    "deja" si elle vient du même fichier, pas encore archivé (reprise après
+    un arrêt), doublon détecté localement sinon. Le déduplicateur écarte ensuite les doublons
+    connus sans tenter d'écriture ; l'index unique reste l'arbitre final.
+    """
+    issues = [None] * len(prets)
+    a_ecrire = list(range(len(prets)))
+    reprises = set()
+    if journal is not None:
+        etats = journal.etats_commandes([commande.id_commande for _, commande, _ in prets])
+        a_ecrire = []
+        for index, (filepath, commande, canal) in enumerate(prets):
+            fichier, etat = etats.get(commande.id_commande, (None, None))
+            meme_fichier = fichier == os.path.basename(filepath)
+            if etat == "insere" and meme_fichier:
+                issues[index] = "deja"
+            elif etat == "insere":
+                record_doublon(filepath, canal)
+                issues[index] = "doublon"
+            else:
+                if etat == "en_cours" and meme_fichier:
+                    # Écriture ou propagation interrompue : MongoDB dira si l'insertion avait abouti
+                    reprises.add(commande.id_commande)
+                a_ecrire.append(index)
+
+    if deduplicateur is not None and a_ecrire:
+        doublons = deduplicateur.doublons([prets[index][1].id_commande for index in a_ecrire
+                                           if prets[index][1].id_commande not in reprises], collection)
+        if doublons:
+            restants = []
+            for index in a_ecrire:
+                filepath, commande, canal = prets[index]
+                if commande.id_commande in doublons and commande.id_commande not in reprises:
+                    record_doublon(filepath, canal)
+                    issues[index] = "doublon"
+                else:
+                    restants.append(index)
+            a_ecrire = restants
+
+    if journal is not None:
+        journal.debut_ecriture([(prets[index][1].id_commande, os.path.basename(prets[index][0]))
+                                for index in a_ecrire])
+
+    lot = [prets[index] for index in a_ecrire]
+    if batch_size > 0:
+        lots = [lot[debut_lot:debut_lot + batch_size] for debut_lot in range(0, len(lot), batch_size)]
+        ecrites = []
+        if pool_ecriture is not None and len(lots) > 1:
+            # Les lots partent en parallèle (au plus --ecritures-paralleles en vol) ;
+            # le bilan reste fait dans l'ordre, dans ce thread
+            documents = [[commande.vers_dict() for _, commande, _ in lot_] for lot_ in lots]
+            insertions = [pool_ecriture.submit(inserer_lot, documents_lot, collection) for documents_lot in documents]
+            for lot_, documents_lot, insertion in zip(lots, documents, insertions):
+                ecrites.extend(write_batch(lot_, collection, reprises, documents_lot, insertion))
+        else:
+            for lot_ in lots:
+                ecrites.extend(write_batch(lot_, collection, reprises))
+    else:
+        ecrites = [write_commande(filepath, commande_standard, canal, collection, reprises)
+                   for filepath, commande_standard, canal in lot]
+    for index, issue in zip(a_ecrire, ecrites):
+        issues[index] = issue
+
+    if deduplicateur is not None:
+        deduplicateur.ajouter([prets[index][1].id_commande for index in a_ecrire if issues[index] != "erreur"])
+
+    if journal is not None:
+        journal.fin_ecriture(
+            [prets[index][1].id_commande for index in a_ecrire if issues[index] in ("insere", "deja")],
+            [(prets[index][1].id_commande, os.path.basename(prets[index][0]))
+             for index in a_ecrire if issues[index] == "doublon"])
+    return issues
+
+
+def archiver_fichiers(filepaths):
+    """Archiver des fichiers entièrement traités (et les retirer du journal)"""
+    archives = []
+    for filepath in filepaths:
+        try:
+            archive_file(filepath)
+            archives.append(filepath)
+        except Exception as e:
+            record_erreur(None, archivage=True)
+            print(f"   ❌ Erreur lors de l'archivage de {os.path.basename(filepath)}: {e}")
+    if journal is not None:
+        journal.retirer(archives)
+
+
+def reprendre_fichiers(filepaths):
+    """Archiver sans les relire les fichiers déjà écrits avant un arrêt ; retourne les autres"""
+    if journal is None or not filepaths:
+        return filepaths
+    ecrits = journal.fichiers_ecrits(filepaths)
+    if ecrits:
+        print(f"   ♻️  {len(ecrits)} fichier(s) déjà écrit(s) avant l'arrêt : archivage")
+        archiver_fichiers([filepath for filepath in filepaths if filepath in ecrits])
+    return [filepath for filepath in filepaths if filepath not in ecrits]
+
+
+def process_file(filepath, collection):
+    """Traiter un fichier JSON (ou un segment JSONL) et l'insérer dans MongoDB"""
+    debut = time.perf_counter()
+    resultats, duree = prepare_file_timed(filepath)
+    record_preparation(duree)
+    return write_resultats([(filepath, resultats)], collection, 0, {filepath: debut}) > 0
+
+
+def process_batch(filepaths, collection, batch_size):
+    """Traiter tout un cycle en insertions groupées par paquets de batch_size"""
+    resultats = []
+    debuts = {}
+    for filepath in filepaths:
+        debuts[filepath] = time.perf_counter()
+        resultats_fichier, duree = prepare_file_timed(filepath)
+        record_preparation(duree)
+        resultats.append((filepath, resultats_fichier))
+
+    write_resultats(resultats, collection, batch_size, debuts)
+
+
+def writer_loop(file_ecriture, collection, batch_size):
+    """Étape d'écriture du pipeline : consommer les fichiers préparés jusqu'à None
+
+    Chaque élément est (filepath, résultats, instant de soumission au pool).
+    """
+    en_attente = []
+    debuts = {}
+    while True:
+        element = file_ecriture.get()
+        fin = element is None
+        if not fin:
+            filepath, resultats_fichier, debut = element
+            en_attente.append((filepath, resultats_fichier))
+            debuts[filepath] = debut
+
+        # Écrire dès que le lot est plein, ou dès que les workers n'ont plus
+        # rien en attente pour ne pas ajouter de latence
+        if en_attente and (fin or len(en_attente) >= max(batch_size, 1) or file_ecriture.empty()):
+            try:
+                write_resultats(en_attente, collection, batch_size, debuts)
+            except Exception as e:
+                # Le thread doit survivre : sinon le producteur reste bloqué sur la
+                # file pleine. Les fichiers non archivés sont repris au prochain cycle
+                for _, resultats_fichier in en_attente:
+                    for _, _, canal, _ in resultats_fichier:
+                        record_erreur(canal)
+                print(f"   ❌ Écriture de {len(en_attente)} fichier(s) échouée: {e}")
+            en_attente = []
+            debuts = {}
+
+        if fin:
+            return
+
+
+def process_pipeline(filepaths, collection, pool, workers, batch_size):
+    """Préparer les fichiers dans le pool de processus et les écrire dans un thread dédié
+
+    La file d'écriture est bornée : si MongoDB ou le disque ralentissent, la
+    soumission de nouveaux fichiers au pool se bloque (backpressure).
+    """
+    file_ecriture = queue.Queue(maxsize=workers * PIPELINE_FILE_PAR_WORKER)
+    writer = threading.Thread(target=writer_loop, args=(file_ecriture, collection, batch_size), daemon=True)
+    writer.start()
+
+    try:
+        # Soumettre par tranches pour borner le nombre de résultats en vol
+        tranche = workers * PIPELINE_TRANCHE_PAR_WORKER
+        for debut in range(0, len(filepaths), tranche):
+            if disjoncteur.ouvert:
+                # MongoDB indisponible : ne plus préparer de fichiers ce cycle
+                break
+            paths = filepaths[debut:debut + tranche]
+            soumission = time.perf_counter()
+            resultats = pool.map(prepare_file_timed, paths, chunksize=max(1, len(paths) // (workers * 4)))
+            for filepath, (resultats_fichier, duree) in zip(paths, resultats):
+                record_preparation(duree)
+                file_ecriture.put((filepath, resultats_fichier, soumission))
+    finally:
+        file_ecriture.put(None)
+        writer.join()
+
+
+def base_indisponible():
+    """Disjoncteur ouvert et délai d'essai non écoulé : les fichiers restent en place"""
+    attente = disjoncteur.attente_restante()
+    if attente > 0:
+        print(f"   ⏸️  MongoDB indisponible : traitement suspendu (nouvel essai dans {attente:.0f}s)")
+    return attente > 0
+
+
+def process_files(filepaths, collection, batch_size=0, pool=None, workers=0):
+    """Traiter une liste de fichiers : un par un, par lots ou via le pipeline parallèle"""
+    if base_indisponible():
+        return
+    debut = time.perf_counter()
+    filepaths = reprendre_fichiers(filepaths)
+    if pool is not None:
+        process_pipeline(filepaths, collection, pool, workers, batch_size)
+    elif batch_size > 0:
+        process_batch(filepaths, collection, batch_size)
+    else:
+        for filepath in filepaths:
+            if disjoncteur.ouvert:
+                break
+            process_file(filepath, collection)
+    metrique_cycles.inc()
+    metrique_cycle_duree.set(time.perf_counter() - debut)
 
 
 def scan_directories(collection):
@@ -235,15 +806,52 @@ def scan_directories(collection):
             print(f"⚠️  Répertoire inexistant: {source_dir}")
             continue
 
-        # Lister uniquement les fichiers .json
+        # Lister les fichiers .json et les segments .jsonl publiés
         for filename in os.listdir(source_dir):
-            if filename.endswith('.json'):
+            if filename.endswith(('.json', '.jsonl')) and not filename.startswith('.'):
                 filepath = os.path.join(source_dir, filename)
                 files_to_process.append(filepath)
 
     return files_to_process
 
 
+def compter_en_attente():
+    """Nombre de fichiers en attente par répertoire source (jauge calculée au scrape)"""
+    en_attente = {}
+    for source_dir in SOURCE_DIRS:
+        try:
+            with os.scandir(source_dir) as entries:
+                en_attente[(os.path.basename(source_dir),)] = sum(
+                    1 for entry in entries if is_commande_file(entry.path))
+        except OSError:
+            continue
+    return en_attente
+
+
+def is_commande_file(filepath):
+    """Vérifier qu'un chemin correspond à un fichier de commande à ingérer"""
+    filename = os.path.basename(filepath)
+    return filename.startswith("commande_") and filename.endswith((".json", ".jsonl"))
+
+
+class CommandeEventHandler(FileSystemEventHandler):
+    """Pousser dans une file chaque commande dont l'écriture est terminée"""
+
+    def __init__(self, file_attente):
+        super().__init__()
+        self.file_attente = file_attente
+
+    def on_closed(self, event):
+        # IN_CLOSE_WRITE : le simulateur a fermé le fichier, son contenu est complet
+        if not event.is_directory and is_commande_file(event.src_path):
+            self.file_attente.put(event.src_path)
+
+    def on_moved(self, event):
+        # Écriture atomique (fichier temporaire puis renommage dans le répertoire)
+        if not event.is_directory and is_commande_file(event.dest_path):
+            self.file_attente.put(event.dest_path)
+
+
 def print_stats():
     """Afficher les statistiques détaillées"""
     print("\n" + "=" * 60)
@@ -257,12 +865,195 @@ def print_stats():
     for canal, count in stats['par_canal'].items():
         print(f"      • {canal}: {count}")
 
+    print("\n   ⏱️  Par étape:")
+    for nom, etape in stats['etapes'].items():
+        debit = (etape['fichiers'] / etape['secondes']) if etape['secondes'] > 0 else 0
+        print(f"      • {nom}: {etape['fichiers']} fichier(s) en {etape['secondes']:.2f} s ({debit:.0f} fichiers/s)")
+
     taux_succes = (stats['succes'] / stats['total_traite'] * 100) if stats['total_traite'] > 0 else 0
     print(f"\n   📊 Taux de succès:       {taux_succes:.1f}%")
     print("=" * 60 + "\n")
 
 
+def flush_parquet(force=True):
+    """Écrire en Parquet les commandes du cycle (si la zone Parquet est active)"""
+    if parquet_sink is None:
+        return
+    try:
+        ecrites = parquet_sink.flush() if force else parquet_sink.flush_si_necessaire()
+        if ecrites:
+            print(f"   🧱 {ecrites} commande(s) écrite(s) en Parquet")
+    except Exception as e:
+        print(f"   ⚠️  Écriture Parquet échouée: {e}")
+
+
+def maintenir_archive():
+    """Regrouper les heures terminées de l'archive et appliquer la rétention"""
+    try:
+        regroupees, supprimes = archive.maintenance()
+        if regroupees or supprimes:
+            print(f"   🗄️  Archive: {regroupees} heure(s) regroupée(s), {supprimes} jour(s) supprimé(s)")
+    except Exception as e:
+        print(f"   ⚠️  Maintenance de l'archive échouée: {e}")
+
+
+def run_polling(collection, batch_size=0, pool=None, workers=0):
+    """Mode polling : scanner les répertoires toutes les SCAN_INTERVAL secondes"""
+    cycle = 0
+    while True:
+        cycle += 1
+        print(f"🔍 Cycle {cycle} - {datetime.now().strftime('%H:%M:%S')}")
+        if base_indisponible():
+            # Pas de scan tant que la base est indisponible
+            time.sleep(min(SCAN_INTERVAL, max(1.0, disjoncteur.attente_restante())))
+            continue
+
+        # Scanner les répertoires
+        files_to_process = scan_directories(collection)
+
+        if files_to_process:
+            print(f"   📁 {len(files_to_process)} fichier(s) trouvé(s)")
+
+            process_files(files_to_process, collection, batch_size, pool, workers)
+            flush_parquet()
+
+            # Afficher les stats après chaque cycle de traitement
+            if cycle % 3 == 0:  # Afficher détaillé tous les 3 cycles
+                print_stats()
+            else:
+                print(f"   📊 Traitement effectué: {len(files_to_process)} fichier(s)")
+        else:
+            print("   ℹ️  Aucun nouveau fichier")
+        maintenir_archive()
+
+        # Attendre le prochain cycle
+        time.sleep(SCAN_INTERVAL)
+
+
+def run_watch(collection, batch_size=0, pool=None, workers=0):
+    """Mode watch : traiter chaque commande dès la fin de son écriture (inotify)"""
+    file_attente = queue.Queue()
+    observer = Observer()
+    handler = CommandeEventHandler(file_attente)
+    for source_dir in SOURCE_DIRS:
+        os.makedirs(source_dir, exist_ok=True)
+        observer.schedule(handler, source_dir, recursive=False)
+    observer.start()
+
+    try:
+        # Rattraper les fichiers déposés pendant que le collecteur était arrêté
+        for filepath in scan_directories(collection):
+            file_attente.put(filepath)
+
+        traites = 0
+        while True:
+            try:
+                filepath = file_attente.get(timeout=RECONCILIATION_INTERVAL)
+            except queue.Empty:
+                # Période calme : bilan de la dernière rafale
+                flush_parquet()
+                maintenir_archive()
+                if traites:
+                    print_stats()
+                    traites = 0
+                # Filet de sécurité : récupérer un éventuel événement perdu
+                for filepath in scan_directories(collection):
+                    file_attente.put(filepath)
+                continue
+
+            # Regrouper les fichiers déjà en attente pour une insertion groupée
+            lot = [filepath]
+            while len(lot) < max(batch_size, workers * PIPELINE_TRANCHE_PAR_WORKER, 1):
+                try:
+                    lot.append(file_attente.get_nowait())
+                except queue.Empty:
+                    break
+
+            # Le même fichier peut être signalé deux fois (événement + rescan)
+            lot = [path for path in dict.fromkeys(lot) if os.path.exists(path)]
+            if not lot:
+                continue
+
+            # Base indisponible : attendre l'essai suivant, les événements s'accumulent
+            while base_indisponible():
+                time.sleep(max(1.0, disjoncteur.attente_restante()))
+
+            process_files(lot, collection, batch_size, pool, workers)
+            flush_parquet(force=False)
+            traites += len(lot)
+
+            # Afficher les stats détaillées toutes les 100 commandes
+            if traites >= 100:
+                print_stats()
+                traites = 0
+    finally:
+        observer.stop()
+        observer.join()
+
+
+def parse_args():
+    """Lire les options de la ligne de commande"""
+    mode_defaut = "watch" if Observer is not None and sys.platform.startswith("linux") else "poll"
+    parser = argparse.ArgumentParser(description="Collecteur multicanal vers MongoDB")
+    parser.add_argument("--mode", choices=["watch", "poll"], default=mode_defaut,
+                        help="watch: événements inotify (défaut si watchdog est installé), "
+                             "poll: scan périodique des répertoires")
+    parser.add_argument("--batch-size", type=int, default=0,
+                        help="taille des lots insert_many (0 = insertion unitaire insert_one)")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="processus de préparation (décodage/validation) en parallèle (0 = séquentiel)")
+    parser.add_argument("--no-rollups", action="store_true",
+                        help="ne pas maintenir les pré-agrégats (rollups) à l'insertion")
+    parser.add_argument("--parquet", action="store_true",
+                        help=f"écrire aussi les commandes en Parquet partitionné (canal/date) dans {PARQUET_DIR}")
+    parser.add_argument("--archive-bundle", choices=FORMATS_BUNDLE, default=None,
+                        help="regrouper chaque heure terminée de l'archive en une archive tar compressée")
+    parser.add_argument("--archive-retention-jours", type=int, default=None,
+                        help="supprimer les jours d'archive plus anciens que ce nombre de jours (défaut : conservés)")
+    parser.add_argument("--no-journal", action="store_true",
+                        help=f"ne pas tenir le journal local des écritures ({JOURNAL_PATH})")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="ne pas pré-contrôler les doublons en mémoire "
+                             "(filtre de Bloom + identifiants récents)")
+    parser.add_argument("--dedup-recents", type=int, default=TAILLE_RECENTS,
+                        help="nombre d'identifiants récents gardés pour le contrôle exact des doublons")
+    parser.add_argument("--mongo-pool-max", type=int, default=MONGO_POOL_MAX,
+                        help="connexions MongoDB maximum du pool (maxPoolSize)")
+    parser.add_argument("--mongo-pool-min", type=int, default=MONGO_POOL_MIN,
+                        help="connexions MongoDB gardées ouvertes (minPoolSize)")
+    parser.add_argument("--write-concern", choices=["1", "majority"], default=MONGO_WRITE_CONCERN,
+                        help="acquittement des écritures : primaire seul (1) ou majorité du replica set")
+    parser.add_argument("--write-timeout-ms", type=int, default=MONGO_WTIMEOUT_MS,
+                        help="délai maximal d'acquittement du write concern (wTimeoutMS)")
+    parser.add_argument("--ecritures-paralleles", type=int, default=1,
+                        help="lots insert_many envoyés en parallèle (avec --batch-size)")
+    parser.add_argument("--rebuild-rollups", action="store_true",
+                        help="recalculer les rollups depuis la collection des commandes puis quitter")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="exposer les métriques Prometheus sur http://127.0.0.1:<port>/metrics (0 = désactivé)")
+    return parser.parse_args()
+
+
 def main():
+    global rollups_actifs, parquet_sink, archive, journal, deduplicateur, pool_ecriture
+
+    args = parse_args()
+    rollups_actifs = not args.no_rollups
+    if args.parquet:
+        try:
+            parquet_sink = ParquetSink()
+        except RuntimeError as e:
+            print(f"⚠️  Zone Parquet désactivée: {e}")
+    if args.archive_bundle or args.archive_retention_jours is not None:
+        try:
+            archive = ArchiveStore(bundle=args.archive_bundle, retention_jours=args.archive_retention_jours)
+        except RuntimeError as e:
+            print(f"⚠️  Regroupement de l'archive désactivé: {e}")
+            archive = ArchiveStore(retention_jours=args.archive_retention_jours)
+    if args.mode == "watch" and Observer is None:
+        print("⚠️  watchdog non installé : repli sur le mode polling")
+        args.mode = "poll"
+
     print("=" * 60)
     print("🚀 DÉMARRAGE DU SYSTÈME DE COLLECTE ET INTÉGRATION")
     print("=" * 60)
@@ -270,50 +1061,84 @@ def main():
     print(f"🔍 Surveillance des répertoires:")
     for dir_path in SOURCE_DIRS:
         print(f"   • {dir_path}")
-    print(f"📦 Archivage dans: {ARCHIVE_DIR}")
-    print(f"⏱️  Intervalle de scan: 10 secondes")
+    print(f"📦 Archivage dans: {ARCHIVE_DIR} (partitions canal/date/heure)")
+    if archive.bundle:
+        print(f"🗜️  Heures terminées regroupées en {archive.bundle}")
+    if archive.retention_jours is not None:
+        print(f"🧹 Rétention de l'archive: {archive.retention_jours} jour(s)")
+    if args.mode == "watch":
+        print(f"⚡ Mode: événements fichiers (rescan de sécurité toutes les {RECONCILIATION_INTERVAL} s)")
+    else:
+        print(f"⏱️  Intervalle de scan: {SCAN_INTERVAL} secondes")
+    if args.batch_size > 0:
+        print(f"📦 Insertion groupée: lots de {args.batch_size} commandes (insert_many non ordonné)")
+    if parquet_sink is not None:
+        print(f"🧱 Zone Parquet: {PARQUET_DIR} (partitions canal/date)")
+    if args.workers > 0:
+        print(f"⚙️  Pipeline parallèle: {args.workers} processus de préparation + 1 thread d'écriture")
     print("=" * 60 + "\n")
 
     # Connexion à MongoDB
-    collection = connect_mongodb()
+    collection = connect_mongodb(args.mongo_pool_max, args.mongo_pool_min, args.write_concern, args.write_timeout_ms)
     if collection is None:
         print("❌ Impossible de continuer sans connexion MongoDB")
         return
 
-    print("🔄 Démarrage de la surveillance...\n")
-
-    try:
-        cycle = 0
-        while True:
-            cycle += 1
-            print(f"🔍 Cycle {cycle} - {datetime.now().strftime('%H:%M:%S')}")
-
-            # Scanner les répertoires
-            files_to_process = scan_directories(collection)
-
-            if files_to_process:
-                print(f"   📁 {len(files_to_process)} fichier(s) trouvé(s)")
+    if args.rebuild_rollups:
+        print("🧮 Recalcul des rollups...")
+        total = rebuild_rollups(collection)
+        print(f"✅ Rollups recalculés à partir de {total} commande(s)")
+        return
 
-                for filepath in files_to_process:
-                    stats["total_traite"] += 1
-                    process_file(filepath, collection)
+    if args.metrics_port:
+        try:
+            demarrer_serveur(args.metrics_port)
+            print(f"📡 Métriques Prometheus: http://127.0.0.1:{args.metrics_port}/metrics")
+        except OSError as e:
+            print(f"⚠️  Serveur de métriques non démarré: {e}")
+
+    if not args.no_dedup:
+        debut = time.perf_counter()
+        deduplicateur = Deduplicateur.depuis_collection(collection, args.dedup_recents, metrique_dedup)
+        taille_mo = len(deduplicateur.bloom.bits) / 1024 / 1024
+        print(f"🧮 Pré-contrôle des doublons: filtre de Bloom de {taille_mo:.1f} Mo "
+              f"chargé en {time.perf_counter() - debut:.1f}s")
+
+    if args.ecritures_paralleles > 1 and args.batch_size > 0:
+        pool_ecriture = ThreadPoolExecutor(max_workers=args.ecritures_paralleles, thread_name_prefix="ecriture")
+        print(f"📤 Écritures parallèles: {args.ecritures_paralleles} lots en vol au maximum")
+
+    if not args.no_journal:
+        journal = Journal()
+        print(f"📓 Journal des écritures: {JOURNAL_PATH} (SQLite WAL)")
+
+    # Pool de préparation ("spawn" : sûr même avec les threads de watchdog)
+    pool = None
+    if args.workers > 0:
+        pool = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"))
 
-                # Afficher les stats après chaque cycle de traitement
-                if cycle % 3 == 0:  # Afficher détaillé tous les 3 cycles
-                    print_stats()
-                else:
-                    print(f"   📊 Traitement effectué: {len(files_to_process)} fichier(s)")
-            else:
-                print("   ℹ️  Aucun nouveau fichier")
+    print("🔄 Démarrage de la surveillance...\n")
 
-            # Attendre 10 secondes
-            time.sleep(10)
+    try:
+        if args.mode == "watch":
+            run_watch(collection, args.batch_size, pool, args.workers)
+        else:
+            run_polling(collection, args.batch_size, pool, args.workers)
 
     except KeyboardInterrupt:
         print("\n\n⚠️  Arrêt du système demandé")
         print_stats()
         print("👋 Au revoir!\n")
 
+    finally:
+        flush_parquet()
+        if pool is not None:
+            pool.shutdown()
+        if pool_ecriture is not None:
+            pool_ecriture.shutdown()
+        if journal is not None:
+            journal.close()
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
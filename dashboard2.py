@@ -1,13 +1,31 @@
 import streamlit as st
-import json
-import os
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime
-from pathlib import Path
 import time
 
+import cache_partage
+import figures
+from data_loader import SOURCES as CANAUX, Filtre
+from order_model import BOUTIQUES, STATUTS
+
+# Attente maximale d'une publication avant un rerun de contrôle (secondes) : une
+# session fermée libère ainsi son thread
+ATTENTE_MAX = 60
+
+# Durée maximale d'un appel bloquant entre deux appels st.* (secondes)
+TRANCHE_ATTENTE = 1.0
+
+# Attente du premier calcul des sections au démarrage du rafraîchisseur (secondes)
+ATTENTE_PREMIERE_PUBLICATION = 30
+
+# Source du dashboard -> source du rafraîchisseur (cache_partage.SOURCES)
+SOURCES_DONNEES = {
+    "Fichiers JSON": "fichiers",
+    "MongoDB": "mongodb",
+    "MongoDB (pré-agrégé)": "rollups",
+}
+
+debut_rerun = time.monotonic()
+
 # Configuration de la page
 st.set_page_config(
     page_title="MultiMarket Analytics Dashboard",
@@ -188,38 +206,19 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# Fonction pour lire tous les fichiers JSON depuis les sources
-@st.cache_data(ttl=2)
-def load_all_data():
-    all_data = []
-    sources = ['site_web', 'application_mobile', 'boutique_physique']
-    base_path = Path('./data/sources')
+# Chaque publication (tables Arrow mappées en mémoire) n'est lue qu'une fois par serveur
+# et par vue (répertoire). La lecture prend la dernière publication, au moins aussi
+# récente que la clé.
+@st.cache_resource(max_entries=4)
+def lire_publication(dossier, publication, _cache):
+    return _cache.lire()[1]
 
-    for source in sources:
-        source_path = base_path / source
-        if source_path.exists():
-            for json_file in source_path.glob('*.json'):
-                try:
-                    with open(json_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        all_data.append(data)
-                except Exception as e:
-                    continue
 
-    if not all_data:
-        return pd.DataFrame()
-
-    df = pd.DataFrame(all_data)
-
-    # Conversion de la date
-    if 'date_commande' in df.columns:
-        df['date_commande'] = pd.to_datetime(df['date_commande'])
-        df['mois'] = df['date_commande'].dt.to_period('M').astype(str)
-        df['heure'] = df['date_commande'].dt.hour
-        df['jour_semaine'] = df['date_commande'].dt.day_name()
-        df['date'] = df['date_commande'].dt.date
-
-    return df
+# Figures d'une section, en cache sur le contenu de son résultat : seules les
+# sections dont les données ont changé sont redessinées
+@st.cache_data(max_entries=4 * len(figures.SECTIONS), show_spinner=False)
+def figures_section(nom, donnees):
+    return figures.SECTIONS[nom](donnees)
 
 
 # Auto-refresh sidebar
@@ -227,20 +226,43 @@ with st.sidebar:
     st.markdown("### ⚙️ Paramètres")
     st.markdown("---")
 
+    # MongoDB : agrégations côté serveur ; pré-agrégé : rollups maintenus par le collecteur
+    source_donnees = st.radio("📂 Source des données", list(SOURCES_DONNEES))
+
+    st.markdown("---")
+
+    # Filtres appliqués au chargement : fichiers écartés sur leur nom, requêtes MongoDB indexées
+    st.markdown("### 🔎 Filtres")
+    periode = st.date_input("📅 Période", value=(), format="DD/MM/YYYY")
+    canaux = st.multiselect("🛍️ Canaux", CANAUX)
+    boutiques_filtre = st.multiselect("🏪 Boutiques", BOUTIQUES)
+    statuts = st.multiselect("📌 Statuts", sorted(set(STATUTS)))
+
+    # Valeurs triées : le même filtre désigne la même vue quel que soit l'ordre de sélection
+    filtre = Filtre(
+        debut=periode[0] if periode else None,
+        fin=periode[1] if len(periode) == 2 else None,
+        canaux=tuple(sorted(canaux)),
+        boutiques=tuple(sorted(boutiques_filtre)),
+        statuts=tuple(sorted(statuts))
+    )
+
+    st.markdown("---")
+
     # Auto-refresh activé par défaut
     auto_refresh = st.checkbox("🔄 Actualisation automatique", value=True)
     if auto_refresh:
-        refresh_interval = st.slider("Intervalle (secondes)", 2, 10, 3)
+        refresh_interval = st.slider("Intervalle minimal (secondes)", 2, 10, 3)
 
     st.markdown("---")
 
-    # Bouton refresh manuel
+    # Bouton refresh manuel : recalcul de la vue affichée par son rafraîchisseur
     if st.button("🔄 Actualiser maintenant", use_container_width=True):
-        st.cache_data.clear()
+        cache_partage.rafraichisseur_partage(SOURCES_DONNEES[source_donnees], filtre).forcer()
         st.rerun()
 
     st.markdown("---")
-    st.info("💡 Les données se mettent à jour automatiquement toutes les 2 secondes")
+    st.info("💡 Les données se mettent à jour automatiquement dès l'arrivée de nouvelles commandes")
 
 # Titre principal
 st.markdown("""
@@ -248,10 +270,33 @@ st.markdown("""
     <p class="subtitle">⚡ Analyse en temps réel des ventes multicanal</p>
 """, unsafe_allow_html=True)
 
-# Charger les données
-df = load_all_data()
+# Sections calculées par un seul rafraîchisseur par vue (source, filtres) : thread
+# de ce serveur ou processus cache_partage.py lancé à part, partagé entre les sessions
+source = SOURCES_DONNEES[source_donnees]
+rafraichisseur = cache_partage.rafraichisseur_partage(source, filtre)
+
+# Lire la dernière publication des sections. Sa version est lue avant le rendu :
+# une publication survenue pendant le rendu déclenche le prochain rerun
+veilleur = rafraichisseur.publications
+version_vue = veilleur.version
+if version_vue is None:
+    # Rafraîchisseur qui vient de démarrer : premier calcul en cours
+    with st.spinner("⏳ Calcul des sections..."):
+        version_vue = veilleur.attendre(None, timeout=ATTENTE_PREMIERE_PUBLICATION)
+
+if rafraichisseur.erreur is not None and source != "fichiers":
+    st.error(f"❌ MongoDB indisponible: {rafraichisseur.erreur}")
+    st.info("🚀 Lancez le collecteur: `python collector.py`")
+    st.stop()
+
+resultats = lire_publication(rafraichisseur.cache.dossier, version_vue, rafraichisseur.cache) \
+    if version_vue is not None else None
 
-if df.empty:
+if resultats is not None and resultats['metriques']['total_commandes'] == 0 and not filtre.vide:
+    st.warning("⚠️ Aucune commande ne correspond aux filtres sélectionnés.")
+    st.stop()
+
+if resultats is None or resultats['metriques']['total_commandes'] == 0:
     st.warning("⚠️ Aucune donnée disponible. Veuillez générer des commandes avec les scripts Python.")
     st.info("🚀 Lancez les scripts: `python site_web.py`, `python application_mobile.py`, `python boutique_physique.py`")
     st.stop()
@@ -261,11 +306,12 @@ st.markdown("## 📊 Métriques Clés")
 
 col1, col2, col3, col4, col5 = st.columns(5)
 
-total_commandes = len(df)
-ca_total = df['montant_total'].sum()
-ca_moyen = df['montant_total'].mean()
-commandes_annulees = len(df[df['statut'] == 'annulée'])
-taux_annulation = (commandes_annulees / total_commandes * 100) if total_commandes > 0 else 0
+metriques = resultats['metriques']
+total_commandes = metriques['total_commandes']
+ca_total = metriques['ca_total']
+ca_moyen = metriques['ca_moyen']
+commandes_annulees = metriques['commandes_annulees']
+taux_annulation = metriques['taux_annulation']
 
 with col1:
     st.metric("🛒 Total Commandes", f"{total_commandes:,}")
@@ -283,286 +329,111 @@ st.markdown("---")
 # ===================== ANALYSE 1: CA PAR MOIS ET CANAL =====================
 st.markdown("## 💰 1. Chiffre d'affaires par mois et canal")
 
-df_ca = df[df['statut'] != 'annulée'].copy()
-ca_mois_canal = df_ca.groupby(['mois', 'canal'])['montant_total'].sum().reset_index()
+fig1, fig2 = figures_section('ca_mois_canal', resultats['ca_mois_canal'])
 
 col1, col2 = st.columns(2)
 
 with col1:
-    fig1 = px.bar(ca_mois_canal, x='mois', y='montant_total', color='canal',
-                  title='📊 CA Total par mois et canal',
-                  barmode='group',
-                  labels={'montant_total': 'CA (MAD)', 'mois': 'Mois'},
-                  color_discrete_sequence=px.colors.qualitative.Set2)
-    fig1.update_layout(height=400, hovermode='x unified')
     st.plotly_chart(fig1, use_container_width=True)
 
 with col2:
-    fig2 = px.line(ca_mois_canal, x='mois', y='montant_total', color='canal',
-                   title='📈 Évolution du CA par canal',
-                   markers=True,
-                   labels={'montant_total': 'CA (MAD)', 'mois': 'Mois'},
-                   color_discrete_sequence=px.colors.qualitative.Pastel)
-    fig2.update_layout(height=400, hovermode='x unified')
     st.plotly_chart(fig2, use_container_width=True)
 
 # ===================== ANALYSE 2: TOP 10 PRODUITS =====================
 st.markdown("## 🏆 2. Top 10 des produits les plus vendus")
 
-produits_list = []
-for idx, row in df_ca.iterrows():
-    if isinstance(row['produits'], list):
-        for p in row['produits']:
-            produits_list.append({
-                'nom': p.get('nom_produit', 'N/A'),
-                'quantite': p.get('quantite', 0),
-                'prix_total': p.get('prix_total', 0)
-            })
-
-df_produits = pd.DataFrame(produits_list)
-top_produits = df_produits.groupby('nom').agg({
-    'quantite': 'sum',
-    'prix_total': 'sum'
-}).reset_index().nlargest(10, 'quantite')
+fig3, fig4 = figures_section('top_produits', resultats['top_produits'])
 
 col1, col2 = st.columns(2)
 
 with col1:
-    fig3 = px.bar(top_produits, x='quantite', y='nom',
-                  title='📦 Top 10 - Quantité vendue',
-                  orientation='h',
-                  color='quantite',
-                  color_continuous_scale='Blues',
-                  labels={'nom': 'Produit', 'quantite': 'Quantité'})
-    fig3.update_layout(yaxis={'categoryorder': 'total ascending'}, height=500)
     st.plotly_chart(fig3, use_container_width=True)
 
 with col2:
-    fig4 = px.bar(top_produits, x='prix_total', y='nom',
-                  title='💵 Top 10 - Chiffre d\'affaires',
-                  orientation='h',
-                  color='prix_total',
-                  color_continuous_scale='Greens',
-                  labels={'nom': 'Produit', 'prix_total': 'CA (MAD)'})
-    fig4.update_layout(yaxis={'categoryorder': 'total ascending'}, height=500)
     st.plotly_chart(fig4, use_container_width=True)
 
 # ===================== ANALYSE 3: TAUX D'ANNULATION =====================
 st.markdown("## ❌ 3. Taux de commandes annulées par canal")
 
-annulation_data = df.groupby(['canal', 'statut']).size().reset_index(name='count')
-annulation_pivot = annulation_data.pivot(index='canal', columns='statut', values='count').fillna(0)
-if 'annulée' not in annulation_pivot.columns:
-    annulation_pivot['annulée'] = 0
-if 'confirmée' not in annulation_pivot.columns:
-    annulation_pivot['confirmée'] = 0
-
-annulation_pivot['total'] = annulation_pivot.sum(axis=1)
-annulation_pivot['taux'] = (annulation_pivot['annulée'] / annulation_pivot['total'] * 100)
-annulation_pivot = annulation_pivot.reset_index()
+fig5, fig6 = figures_section('annulation', resultats['annulation'])
 
 col1, col2 = st.columns(2)
 
 with col1:
-    fig5 = px.bar(annulation_pivot, x='canal', y='taux',
-                  title='📊 Taux d\'annulation par canal (%)',
-                  color='taux',
-                  color_continuous_scale='Reds',
-                  labels={'canal': 'Canal', 'taux': 'Taux (%)'})
-    fig5.update_traces(text=annulation_pivot['taux'].round(1), textposition='outside', texttemplate='%{text}%')
-    fig5.update_layout(height=400)
     st.plotly_chart(fig5, use_container_width=True)
 
 with col2:
-    fig6 = px.pie(annulation_pivot, values='annulée', names='canal',
-                  title='🥧 Répartition des annulations par canal',
-                  color_discrete_sequence=px.colors.sequential.RdBu,
-                  hole=0.4)
-    fig6.update_layout(height=400)
     st.plotly_chart(fig6, use_container_width=True)
 
 # ===================== ANALYSE 4: CA MOYEN PAR COMMANDE =====================
 st.markdown("## 💵 4. Chiffre d'affaires moyen par commande")
 
-ca_moyen_canal = df_ca.groupby('canal')['montant_total'].agg(['mean', 'min', 'max', 'count']).reset_index()
-ca_moyen_canal.columns = ['Canal', 'CA Moyen', 'CA Min', 'CA Max', 'Nb Commandes']
+fig7, fig8 = figures_section('ca_moyen', resultats['ca_moyen'])
 
 col1, col2 = st.columns(2)
 
 with col1:
-    fig7 = px.bar(ca_moyen_canal, x='Canal', y='CA Moyen',
-                  title='📊 CA Moyen par canal',
-                  color='CA Moyen',
-                  color_continuous_scale='Teal',
-                  labels={'CA Moyen': 'Montant (MAD)'})
-    fig7.update_traces(text=ca_moyen_canal['CA Moyen'].round(2), textposition='outside', texttemplate='%{text:.0f} MAD')
-    fig7.update_layout(height=400)
     st.plotly_chart(fig7, use_container_width=True)
 
 with col2:
-    fig8 = go.Figure()
-    for idx, row in ca_moyen_canal.iterrows():
-        fig8.add_trace(go.Box(
-            y=[row['CA Min'], row['CA Moyen'], row['CA Max']],
-            name=row['Canal'],
-            boxmean='sd'
-        ))
-    fig8.update_layout(title='📦 Distribution du CA par canal',
-                       yaxis_title='Montant (MAD)',
-                       height=400)
     st.plotly_chart(fig8, use_container_width=True)
 
 # ===================== ANALYSE 5: SAISONNALITÉ =====================
 st.markdown("## 📅 5. Analyse de la saisonnalité des ventes")
 
-saison_data = df_ca.groupby(['heure', 'canal']).agg({
-    'id_commande': 'count',
-    'montant_total': 'sum'
-}).reset_index()
-saison_data.columns = ['Heure', 'Canal', 'Nb Commandes', 'CA Total']
+fig9, fig10, fig11 = figures_section('saisonnalite', resultats['saisonnalite'])
 
 col1, col2 = st.columns(2)
 
 with col1:
-    fig9 = px.line(saison_data, x='Heure', y='Nb Commandes', color='Canal',
-                   title='⏰ Nombre de commandes par heure',
-                   markers=True,
-                   color_discrete_sequence=px.colors.qualitative.Bold)
-    fig9.update_layout(height=400, hovermode='x unified')
     st.plotly_chart(fig9, use_container_width=True)
 
 with col2:
-    fig10 = px.bar(saison_data, x='Heure', y='CA Total', color='Canal',
-                   title='💰 CA par heure de la journée',
-                   barmode='group',
-                   color_discrete_sequence=px.colors.qualitative.Pastel)
-    fig10.update_layout(height=400)
     st.plotly_chart(fig10, use_container_width=True)
 
 # Heatmap
-pivot_heatmap = saison_data.pivot_table(values='Nb Commandes', index='Canal', columns='Heure', fill_value=0)
-fig11 = px.imshow(pivot_heatmap,
-                  title='🔥 Heatmap - Activité par canal et heure',
-                  labels=dict(x="Heure", y="Canal", color="Commandes"),
-                  color_continuous_scale='YlOrRd',
-                  aspect='auto')
-fig11.update_layout(height=300)
 st.plotly_chart(fig11, use_container_width=True)
 
 # ===================== ANALYSE 6: PANIER MOYEN =====================
 st.markdown("## 🛒 6. Analyse du panier moyen")
 
-df_panier = df_ca.copy()
-df_panier['nb_produits'] = df_panier['produits'].apply(lambda x: len(x) if isinstance(x, list) else 0)
-
-panier_stats = df_panier.groupby('canal').agg({
-    'nb_produits': ['mean', 'min', 'max'],
-    'montant_total': ['mean', 'min', 'max']
-}).reset_index()
-panier_stats.columns = ['Canal', 'Panier Moyen', 'Panier Min', 'Panier Max', 'Montant Moyen', 'Montant Min',
-                        'Montant Max']
+fig12, fig13 = figures_section('panier', resultats['panier'])
 
 col1, col2 = st.columns(2)
 
 with col1:
-    fig12 = px.bar(panier_stats, x='Canal', y='Panier Moyen',
-                   title='📊 Nombre moyen de produits par panier',
-                   color='Panier Moyen',
-                   color_continuous_scale='Purples')
-    fig12.update_traces(text=panier_stats['Panier Moyen'].round(2), textposition='outside', texttemplate='%{text:.2f}')
-    fig12.update_layout(height=400)
     st.plotly_chart(fig12, use_container_width=True)
 
 with col2:
-    dist_panier = df_panier.groupby(['canal', 'nb_produits']).size().reset_index(name='count')
-    fig13 = px.bar(dist_panier, x='nb_produits', y='count', color='canal',
-                   title='📦 Distribution du nombre de produits',
-                   barmode='group',
-                   labels={'nb_produits': 'Nb Produits', 'count': 'Nb Commandes'})
-    fig13.update_layout(height=400)
     st.plotly_chart(fig13, use_container_width=True)
 
 # ===================== ANALYSE 7: FIDÉLISATION =====================
 st.markdown("## 👥 7. Analyse de la fidélisation client")
 
-# Extraire les emails clients
-df_fidelite = df.copy()
-df_fidelite['client_email'] = df_fidelite['client'].apply(
-    lambda x: x.get('email', 'N/A') if isinstance(x, dict) else 'N/A')
-
-fidelite_data = df_fidelite.groupby(['client_email', 'canal']).agg({
-    'id_commande': 'count',
-    'montant_total': 'sum'
-}).reset_index()
-fidelite_data.columns = ['Email', 'Canal', 'Nb Commandes', 'CA Total']
-fidelite_data = fidelite_data[fidelite_data['Nb Commandes'] >= 2]
+fig14, fig15 = figures_section('fidelisation', resultats['fidelisation'])
 
 col1, col2 = st.columns(2)
 
 with col1:
-    top_clients = fidelite_data.nlargest(10, 'CA Total')
-    top_clients['Email_Court'] = top_clients['Email'].str[:20] + '...'
-    fig14 = px.bar(top_clients, x='CA Total', y='Email_Court',
-                   title='🏆 Top 10 Clients récurrents (par CA)',
-                   orientation='h',
-                   color='CA Total',
-                   color_continuous_scale='Greens',
-                   labels={'Email_Court': 'Client'})
-    fig14.update_layout(yaxis={'categoryorder': 'total ascending'}, height=400)
     st.plotly_chart(fig14, use_container_width=True)
 
 with col2:
-    # Taux de rétention
-    clients_total = df_fidelite.groupby('canal')['client_email'].nunique().reset_index()
-    clients_total.columns = ['Canal', 'Total Clients']
-
-    clients_recurrents = fidelite_data.groupby('Canal')['Email'].nunique().reset_index()
-    clients_recurrents.columns = ['Canal', 'Clients Récurrents']
-
-    retention = clients_total.merge(clients_recurrents, on='Canal', how='left').fillna(0)
-    retention['Taux Rétention'] = (retention['Clients Récurrents'] / retention['Total Clients'] * 100)
-
-    fig15 = px.bar(retention, x='Canal', y='Taux Rétention',
-                   title='🎯 Taux de rétention par canal (%)',
-                   color='Taux Rétention',
-                   color_continuous_scale='Viridis')
-    fig15.update_traces(text=retention['Taux Rétention'].round(1), textposition='outside', texttemplate='%{text:.1f}%')
-    fig15.update_layout(height=400)
     st.plotly_chart(fig15, use_container_width=True)
 
 # ===================== ANALYSE 8: GÉOGRAPHIQUE =====================
 st.markdown("## 🗺️ 8. Analyse géographique (Web & Mobile)")
 
-df_geo = df_ca[df_ca['canal'].isin(['site_web', 'application_mobile'])].copy()
-df_geo['ville'] = df_geo['adresse_livraison'].apply(
-    lambda x: x.get('ville', 'N/A') if isinstance(x, dict) else 'N/A'
-)
-df_geo = df_geo[df_geo['ville'] != 'N/A']
+ville_stats = resultats['geographique']
 
-if not df_geo.empty:
-    ville_stats = df_geo.groupby('ville').agg({
-        'montant_total': 'sum',
-        'id_commande': 'count'
-    }).reset_index().nlargest(15, 'montant_total')
-    ville_stats.columns = ['Ville', 'CA Total', 'Nb Commandes']
+if not ville_stats.empty:
+    fig16, fig17 = figures_section('geographique', ville_stats)
 
     col1, col2 = st.columns(2)
 
     with col1:
-        fig16 = px.bar(ville_stats, x='CA Total', y='Ville',
-                       title='🏙️ Top 15 Villes par CA',
-                       orientation='h',
-                       color='CA Total',
-                       color_continuous_scale='Sunset')
-        fig16.update_layout(yaxis={'categoryorder': 'total ascending'}, height=500)
         st.plotly_chart(fig16, use_container_width=True)
 
     with col2:
-        fig17 = px.treemap(ville_stats, path=['Ville'], values='CA Total',
-                           title='🗺️ Cartographie des ventes par ville',
-                           color='Nb Commandes',
-                           color_continuous_scale='Viridis')
-        fig17.update_layout(height=500)
         st.plotly_chart(fig17, use_container_width=True)
 else:
     st.warning("⚠️ Aucune donnée géographique disponible")
@@ -570,51 +441,17 @@ else:
 # ===================== ANALYSE 9: CROSS-CANAL =====================
 st.markdown("## 🔄 9. Performance produit cross-canal")
 
-produits_canal = []
-for idx, row in df_ca.iterrows():
-    if isinstance(row['produits'], list):
-        for p in row['produits']:
-            produits_canal.append({
-                'produit': p.get('nom_produit', 'N/A'),
-                'canal': row['canal'],
-                'quantite': p.get('quantite', 0),
-                'ca': p.get('prix_total', 0)
-            })
-
-df_cross = pd.DataFrame(produits_canal)
-cross_stats = df_cross.groupby(['produit', 'canal']).agg({
-    'quantite': 'sum',
-    'ca': 'sum'
-}).reset_index()
-
-top_produits_cross = df_cross.groupby('produit')['quantite'].sum().nlargest(10).index
-df_cross_top = cross_stats[cross_stats['produit'].isin(top_produits_cross)]
+fig18, fig19, fig20 = figures_section('cross_canal', resultats['cross_canal'])
 
 col1, col2 = st.columns(2)
 
 with col1:
-    fig18 = px.bar(df_cross_top, x='produit', y='quantite', color='canal',
-                   title='📊 Top 10 Produits - Quantité par canal',
-                   barmode='group')
-    fig18.update_layout(xaxis_tickangle=-45, height=400)
     st.plotly_chart(fig18, use_container_width=True)
 
 with col2:
-    fig19 = px.bar(df_cross_top, x='produit', y='ca', color='canal',
-                   title='💰 Top 10 Produits - CA par canal',
-                   barmode='group',
-                   labels={'ca': 'CA (MAD)'})
-    fig19.update_layout(xaxis_tickangle=-45, height=400)
     st.plotly_chart(fig19, use_container_width=True)
 
 # Heatmap cross-canal
-pivot_cross = df_cross_top.pivot_table(values='quantite', index='produit', columns='canal', fill_value=0)
-fig20 = px.imshow(pivot_cross,
-                  title='🔥 Heatmap - Performance cross-canal',
-                  labels=dict(x="Canal", y="Produit", color="Quantité"),
-                  color_continuous_scale='Blues',
-                  aspect='auto')
-fig20.update_layout(height=400)
 st.plotly_chart(fig20, use_container_width=True)
 
 # ===================== FOOTER =====================
@@ -623,11 +460,24 @@ col1, col2, col3 = st.columns(3)
 with col1:
     st.info(f"📅 **Dernière mise à jour:** {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
 with col2:
-    st.success(f"✅ **{len(df)} commandes** chargées")
+    st.success(f"✅ **{total_commandes} commandes** chargées")
 with col3:
     st.metric("🔄 Status", "Actif" if auto_refresh else "Manuel")
 
-# Auto-refresh
+# Auto-refresh : rerun uniquement quand de nouvelles données sont publiées, au plus
+# une fois par intervalle minimal (absorbe les rafales de commandes). L'attente se
+# fait par tranches : l'appel st.* de chaque tranche laisse Streamlit interrompre
+# le script dès qu'un widget change (filtres, source, intervalle)
 if auto_refresh:
-    time.sleep(refresh_interval)
+    battement = st.empty()
+    echeance = time.monotonic() + ATTENTE_MAX
+    while time.monotonic() < echeance:
+        ecoule = time.monotonic() - debut_rerun
+        if veilleur.version == version_vue:
+            veilleur.attendre(version_vue, timeout=TRANCHE_ATTENTE)
+        elif ecoule >= refresh_interval:
+            break
+        else:
+            time.sleep(min(TRANCHE_ATTENTE, refresh_interval - ecoule))
+        battement.empty()
     st.rerun()
\ No newline at end of file
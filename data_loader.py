@@ -0,0 +1,382 @@
+import os
+import re
+import hashlib
+import time
+import threading
+from dataclasses import dataclass, fields
+from datetime import timedelta
+from functools import cached_property
+
+import pandas as pd
+
+# pyarrow est optionnel : sans lui, les chaînes du chargement normalisé restent des objets Python
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+from json_codec import ERREURS_DECODAGE, loads
+from order_model import AdresseLivraison, Appareil, Client
+
+# Répertoires sources des trois canaux
+BASE_PATH = './data/sources'
+SOURCES = ['site_web', 'application_mobile', 'boutique_physique']
+
+# Chargement normalisé : objets imbriqués aplatis en colonnes "<objet>_<champ>"
+OBJETS_IMBRIQUES = {
+    'client': Client,
+    'adresse_livraison': AdresseLivraison,
+    'appareil': Appareil,
+}
+
+# Champs à faible cardinalité : dtype category (un code entier par ligne)
+CATEGORIES = [
+    'canal', 'statut', 'mode_paiement', 'boutique', 'vendeur_id', 'boutique_collect', 'option_livraison',
+    'promo_code', 'mois', 'jour_semaine', 'adresse_livraison_ville', 'adresse_livraison_pays',
+    'appareil_type', 'appareil_version_app', 'appareil_os_version', 'produit',
+]
+
+# Entiers réduits au plus petit type qui contient leurs valeurs
+ENTIERS = ['heure', 'nb_produits', 'quantite']
+
+# float32 seulement pour les montants qui ne sont jamais sommés : montant_total
+# et le CA des lignes restent en float64 (sommes sur des millions de lignes)
+FLOTTANTS_32 = ['frais_livraison']
+
+# Chaînes à forte cardinalité : stockage Arrow (un buffer par colonne au lieu d'un objet par ligne)
+CHAINES = [
+    'id_commande', 'date_import', 'client_nom', 'client_email', 'client_telephone', 'client_compte_client',
+    'adresse_livraison_rue', 'adresse_livraison_code_postal',
+]
+TYPE_CHAINE = pd.StringDtype('pyarrow') if pyarrow is not None else object
+
+# Colonnes de la table des lignes de commande (voir analyses.exploser_produits)
+COLONNES_LIGNES = ['id_commande', 'canal', 'statut', 'produit', 'quantite', 'ca']
+
+# Noms des fichiers déposés : une commande (horodatage de sa date, voir
+# load_generator.identifiant) ou un segment (dates de sa première et de sa
+# dernière commande, voir segment_writer)
+NOM_COMMANDE = re.compile(r'commande_[^-]+-(\d{14})-\d+\.json')
+NOM_SEGMENT = re.compile(r'commande_[^-]+-(\d{14})-(\d{14})-\d+\.jsonl')
+
+
+def dates_fichier(nom):
+    """(première, dernière) date des commandes d'un fichier d'après son nom, None si inconnue"""
+    correspondance = NOM_COMMANDE.fullmatch(nom)
+    if correspondance:
+        return correspondance[1], correspondance[1]
+    # Les anciens segments n'ont qu'un horodatage (leur rotation) : dates inconnues
+    correspondance = NOM_SEGMENT.fullmatch(nom)
+    return correspondance.groups() if correspondance else None
+
+
+@dataclass(frozen=True)
+class Filtre:
+    """Filtres des dashboards, appliqués dès le chargement des commandes
+
+    debut et fin (datetime.date, inclus) bornent date_commande ; canaux,
+    boutiques et statuts sont les tuples des valeurs retenues. None ou tuple
+    vide : pas de filtre sur ce champ. Seules les commandes en boutique
+    physique ont une boutique : filtrer les boutiques exclut les autres canaux.
+    """
+    debut: object = None
+    fin: object = None
+    canaux: tuple = ()
+    boutiques: tuple = ()
+    statuts: tuple = ()
+
+    @property
+    def vide(self):
+        return not (self.debut or self.fin or self.canaux or self.boutiques or self.statuts)
+
+    def cle(self):
+        """Identifiant court et stable du filtre (nom de répertoire)"""
+        return hashlib.blake2b(repr(self).encode('utf-8'), digest_size=6).hexdigest()
+
+    @cached_property
+    def bornes(self):
+        """(début inclus, fin exclue) au format ISO "YYYY-MM-DD" : comparables aux dates ISO par ordre lexical"""
+        return (self.debut.isoformat() if self.debut else None,
+                (self.fin + timedelta(days=1)).isoformat() if self.fin else None)
+
+    def garde_source(self, source):
+        """Répertoire d'un canal à parcourir (les répertoires sources portent le nom du canal)"""
+        if self.canaux and source not in self.canaux:
+            return False
+        return not self.boutiques or source == 'boutique_physique'
+
+    def garde_fichier(self, nom):
+        """Fichier dont les dates (lues dans son nom, sans l'ouvrir) peuvent être dans la période"""
+        debut, fin = self.bornes
+        if debut is None and fin is None:
+            return True
+        dates = dates_fichier(nom)
+        if dates is None:
+            return True
+        premiere, derniere = dates
+        # Horodatages "YYYYmmddHHMMSS" : les bornes ISO sans tirets leur sont comparables
+        return (debut is None or derniere >= debut.replace('-', '')) and \
+            (fin is None or premiere < fin.replace('-', ''))
+
+    def garde(self, commande):
+        """Commande brute (dict) retenue par le filtre"""
+        debut, fin = self.bornes
+        if debut is not None or fin is not None:
+            date_commande = str(commande.get('date_commande', ''))
+            if (debut is not None and date_commande < debut) or (fin is not None and date_commande >= fin):
+                return False
+        return (not self.canaux or commande.get('canal') in self.canaux) and \
+            (not self.boutiques or commande.get('boutique') in self.boutiques) and \
+            (not self.statuts or commande.get('statut') in self.statuts)
+
+    def requete_mongo(self):
+        """Même filtre en requête MongoDB (date_commande est stockée en ISO)"""
+        requete = {}
+        debut, fin = self.bornes
+        if debut is not None or fin is not None:
+            requete['date_commande'] = {}
+            if debut is not None:
+                requete['date_commande']['$gte'] = debut
+            if fin is not None:
+                requete['date_commande']['$lt'] = fin
+        for champ, valeurs in (('canal', self.canaux), ('boutique', self.boutiques), ('statut', self.statuts)):
+            if valeurs:
+                requete[champ] = {'$in': list(valeurs)}
+        return requete
+
+
+def enrichir_dates(df):
+    """Ajouter les colonnes temporelles dérivées de date_commande"""
+    if 'date_commande' in df.columns:
+        # isoformat() omet les microsecondes quand elles sont nulles : formats ISO mixtes
+        df['date_commande'] = pd.to_datetime(df['date_commande'], format='ISO8601')
+        df['mois'] = df['date_commande'].dt.to_period('M').astype(str)
+        df['heure'] = df['date_commande'].dt.hour
+        df['jour_semaine'] = df['date_commande'].dt.day_name()
+        df['date'] = df['date_commande'].dt.date
+    return df
+
+
+def typer(df):
+    """Appliquer les dtypes compacts du chargement normalisé
+
+    Idempotent : une colonne déjà au bon type n'est pas recopiée. Après un
+    pd.concat, seules les catégories dont les modalités différaient (repassées
+    en object) sont reconverties.
+    """
+    for colonne in df.columns:
+        serie = df[colonne]
+        if colonne in CATEGORIES:
+            if not isinstance(serie.dtype, pd.CategoricalDtype):
+                df[colonne] = serie.astype('category')
+        elif colonne in ENTIERS:
+            if serie.dtype.kind not in 'iu' or serie.dtype.itemsize >= 4:
+                df[colonne] = pd.to_numeric(serie.fillna(0), downcast='integer')
+        elif colonne in FLOTTANTS_32:
+            if serie.dtype != 'float32':
+                df[colonne] = pd.to_numeric(serie, errors='coerce').astype('float32')
+        elif colonne in CHAINES:
+            if serie.dtype != TYPE_CHAINE:
+                df[colonne] = serie.astype(TYPE_CHAINE)
+        elif colonne == 'notification_push':
+            if serie.dtype != 'boolean':
+                df[colonne] = serie.astype('boolean')
+        elif colonne == 'date' and serie.dtype == object:
+            # dt.date produit un objet Python par ligne : date à minuit en datetime64
+            df[colonne] = pd.to_datetime(serie)
+    return df
+
+
+def normaliser(df):
+    """Aplatir les objets imbriqués et typer les colonnes
+
+    client, adresse_livraison et appareil deviennent des colonnes
+    <objet>_<champ> (None si l'objet ou le champ manque) ; produits est
+    remplacé par nb_produits, les produits étant chargés à part (lignes_produits).
+    """
+    for objet, classe in OBJETS_IMBRIQUES.items():
+        if objet not in df.columns:
+            continue
+        noms = [champ.name for champ in fields(classe)]
+        # Construction en un bloc (un seul passage sur les objets) ; champs absents : NaN
+        colonnes = pd.DataFrame([valeur if valeur.__class__ is dict else {} for valeur in df.pop(objet)],
+                                columns=noms, index=df.index)
+        for nom in noms:
+            df[f'{objet}_{nom}'] = colonnes[nom]
+    if 'produits' in df.columns:
+        df['nb_produits'] = [len(produits) if produits.__class__ is list else 0 for produits in df.pop('produits')]
+    return typer(df)
+
+
+def lignes_produits(records, index=None):
+    """Table typée des lignes de commande, construite directement depuis les commandes brutes
+
+    Mêmes colonnes et mêmes valeurs par défaut que analyses.exploser_produits ;
+    index donne l'étiquette de chaque commande (chemin du fichier pour le loader).
+    """
+    ids, canaux, statuts, noms, quantites, montants, etiquettes = [], [], [], [], [], [], []
+    for position, commande in enumerate(records):
+        produits = commande.get('produits')
+        if produits.__class__ is not list:
+            continue
+        produits = [produit for produit in produits if produit.__class__ is dict]
+        # Champs de la commande répétés une fois par produit
+        nombre = len(produits)
+        ids += [commande.get('id_commande')] * nombre
+        canaux += [commande.get('canal')] * nombre
+        statuts += [commande.get('statut')] * nombre
+        etiquettes += [index[position] if index is not None else position] * nombre
+        noms += [produit.get('nom_produit') for produit in produits]
+        quantites += [produit.get('quantite') for produit in produits]
+        montants += [produit.get('prix_total') for produit in produits]
+
+    lignes = pd.DataFrame({'id_commande': ids, 'canal': canaux, 'statut': statuts, 'produit': noms,
+                           'quantite': quantites, 'ca': montants}, index=etiquettes)
+    lignes['produit'] = lignes['produit'].fillna('N/A')
+    lignes['ca'] = lignes['ca'].fillna(0).astype('float64')
+    return typer(lignes)
+
+
+def charger_normalise(records, index=None):
+    """(commandes, lignes) typées à partir de commandes brutes"""
+    lignes = lignes_produits(records, index)
+    return normaliser(enrichir_dates(pd.DataFrame(records, index=index))), lignes
+
+
+def memoire(df):
+    """Mémoire occupée par un DataFrame, objets Python compris (octets)"""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def lire_fichier(path):
+    """Lire les commandes d'un fichier .json (une commande) ou d'un segment .jsonl"""
+    with open(path, 'rb') as f:
+        if not path.endswith('.jsonl'):
+            return [loads(f.read())]
+
+        # Un segment est publié complet : une ligne illisible le restera, on l'ignore
+        commandes = []
+        for ligne in f:
+            try:
+                commandes.append(loads(ligne))
+            except ERREURS_DECODAGE:
+                continue
+        return commandes
+
+
+class IncrementalLoader:
+    """Charger les commandes JSON en ne relisant que les fichiers nouveaux ou modifiés
+
+    L'index associe chaque chemin à sa signature (mtime, taille). Un
+    rafraîchissement ne parse que les fichiers dont la signature a changé,
+    les ajoute au DataFrame en cache et retire les lignes des fichiers qui
+    ont disparu (archivés par le collecteur).
+
+    Avec normaliser=True, le DataFrame suit le schéma typé de normaliser() et
+    la table des lignes de produits est maintenue à côté (attribut lignes).
+
+    Avec un filtre, les répertoires des canaux exclus et les fichiers dont le
+    nom situe les commandes hors de la période ne sont ni listés ni ouverts ;
+    les commandes lues sont ensuite filtrées avant la construction du DataFrame.
+
+    version identifie l'état du DataFrame : elle change à chaque
+    rafraîchissement qui le modifie et sert de clé de cache aux dashboards.
+    """
+
+    def __init__(self, base_path=BASE_PATH, sources=SOURCES, normaliser=False, filtre=None):
+        self.base_path = base_path
+        self.sources = sources
+        self.normaliser = normaliser
+        self.filtre = filtre or Filtre()
+        self.index = {}
+        self.df = pd.DataFrame()
+        self.lignes = pd.DataFrame(columns=COLONNES_LIGNES)
+        # Horodatage du dernier changement : unique même entre deux instances du loader
+        self.version = time.time_ns()
+        # Réentrant : instantane() rafraîchit sous le même verrou
+        self._lock = threading.RLock()
+
+    def scan(self):
+        """Lister les fichiers JSON et segments JSONL retenus par le filtre avec leur signature (mtime, taille)"""
+        fichiers = {}
+        filtre = self.filtre
+        for source in self.sources:
+            if not filtre.garde_source(source):
+                continue
+            source_path = os.path.join(self.base_path, source)
+            if not os.path.isdir(source_path):
+                continue
+            with os.scandir(source_path) as entries:
+                for entry in entries:
+                    # Les segments .jsonl en cours d'écriture sont cachés (préfixe ".")
+                    if entry.name.endswith(('.json', '.jsonl')) and not entry.name.startswith('.') \
+                            and filtre.garde_fichier(entry.name) and entry.is_file():
+                        stat = entry.stat()
+                        fichiers[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return fichiers
+
+    def refresh(self):
+        """Mettre à jour le DataFrame en cache et le retourner"""
+        # Le loader est partagé entre les sessions Streamlit
+        with self._lock:
+            fichiers = self.scan()
+            a_lire = [path for path, signature in fichiers.items() if self.index.get(path) != signature]
+            a_retirer = [path for path in self.index if path not in fichiers]
+
+            if not a_lire and not a_retirer:
+                return self.df
+
+            records = []
+            chemins = []
+            for path in a_lire:
+                try:
+                    commandes = lire_fichier(path)
+                    if not self.filtre.vide:
+                        commandes = [commande for commande in commandes if self.filtre.garde(commande)]
+                    records.extend(commandes)
+                    # Un segment donne plusieurs lignes indexées par le même chemin
+                    chemins.extend([path] * len(commandes))
+                except Exception:
+                    # Fichier illisible ou en cours d'écriture : il sera relu
+                    # dès que sa signature changera
+                    continue
+
+            # Retirer les fichiers disparus et les anciennes versions des fichiers modifiés
+            df = self.df
+            obsoletes = df.index.intersection(a_retirer + a_lire) if not df.empty else []
+            if len(obsoletes):
+                df = df.drop(index=obsoletes)
+
+            if records:
+                if self.normaliser:
+                    df_nouveaux, lignes_nouvelles = charger_normalise(records, chemins)
+                else:
+                    df_nouveaux = enrichir_dates(pd.DataFrame(records, index=chemins))
+                df = df_nouveaux if df.empty else pd.concat([df, df_nouveaux])
+
+            if self.normaliser:
+                lignes = self.lignes
+                obsoletes = lignes.index.intersection(a_retirer + a_lire) if not lignes.empty else []
+                if len(obsoletes):
+                    lignes = lignes.drop(index=obsoletes)
+                if records:
+                    lignes = lignes_nouvelles if lignes.empty else pd.concat([lignes, lignes_nouvelles])
+                # Catégories des lots concaténés réunies, entiers au plus petit type
+                self.lignes = typer(lignes)
+                df = typer(df)
+
+            for path in a_retirer:
+                del self.index[path]
+            for path in a_lire:
+                self.index[path] = fichiers[path]
+
+            self.df = df
+            self.version = time.time_ns()
+            return df
+
+    def instantane(self):
+        """Rafraîchir puis retourner (DataFrame, version) cohérents entre eux"""
+        # Le loader est partagé entre les sessions : un autre rafraîchissement
+        # ne peut pas s'intercaler entre la lecture du DataFrame et de sa version
+        with self._lock:
+            return self.refresh(), self.version
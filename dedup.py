@@ -0,0 +1,137 @@
+import math
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Identifiants récents gardés en mémoire (contrôle exact, sans requête)
+TAILLE_RECENTS = 100000
+
+# Dimensionnement du filtre de Bloom : capacité minimale et taux de faux positifs visé
+CAPACITE_MIN = 1000000
+TAUX_FAUX_POSITIFS = 0.001
+
+# Identifiants par requête de confirmation ($in)
+TAILLE_CONFIRMATION = 1000
+
+
+class FiltreBloom:
+    """Ensemble probabiliste d'identifiants : jamais de faux négatif
+
+    Les k positions d'un identifiant sont dérivées d'un seul hachage blake2b
+    de 128 bits (double hachage h1 + i * h2).
+    """
+
+    def __init__(self, capacite, taux_faux_positifs=TAUX_FAUX_POSITIFS):
+        self.nb_bits = max(8, int(-capacite * math.log(taux_faux_positifs) / math.log(2) ** 2))
+        self.nb_hachages = max(1, round(self.nb_bits / capacite * math.log(2)))
+        self.bits = bytearray((self.nb_bits + 7) // 8)
+
+    def positions(self, identifiant):
+        empreinte = hashlib.blake2b(identifiant.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(empreinte[:8], "little")
+        h2 = int.from_bytes(empreinte[8:], "little") | 1
+        nb_bits = self.nb_bits
+        return [(h1 + i * h2) % nb_bits for i in range(self.nb_hachages)]
+
+    def ajouter(self, identifiant):
+        bits = self.bits
+        for position in self.positions(identifiant):
+            bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, identifiant):
+        bits = self.bits
+        for position in self.positions(identifiant):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                # Un bit absent suffit : cas courant d'une commande nouvelle
+                return False
+        return True
+
+
+class CacheRecents:
+    """Identifiants vus récemment, les plus anciens évincés au-delà de taille (LRU)"""
+
+    def __init__(self, taille=TAILLE_RECENTS):
+        self.taille = taille
+        self.ids = OrderedDict()
+
+    def ajouter(self, identifiant):
+        self.ids[identifiant] = None
+        self.ids.move_to_end(identifiant)
+        if len(self.ids) > self.taille:
+            self.ids.popitem(last=False)
+
+    def __contains__(self, identifiant):
+        if identifiant in self.ids:
+            self.ids.move_to_end(identifiant)
+            return True
+        return False
+
+
+class Deduplicateur:
+    """Pré-contrôle des doublons d'id_commande avant l'écriture MongoDB
+
+    - présent dans le cache des récents : doublon certain, aucune requête ;
+    - absent du filtre de Bloom : commande nouvelle, aucune requête ;
+    - sinon : confirmation par une lecture groupée sur l'index id_commande.
+    L'index unique reste l'arbitre final (écritures concurrentes, faux négatifs
+    impossibles mais cache perdu au redémarrage).
+    """
+
+    def __init__(self, capacite=CAPACITE_MIN, taille_recents=TAILLE_RECENTS, metrique=None):
+        self.bloom = FiltreBloom(capacite)
+        self.recents = CacheRecents(taille_recents)
+        self.compteurs = {"cache": 0, "confirme": 0, "faux_positif": 0, "nouveau": 0}
+        # Compteur Prometheus optionnel, label "resultat" (mêmes clés que compteurs)
+        self.metrique = metrique
+        # Le pipeline écrit depuis son thread dédié
+        self._lock = threading.Lock()
+
+    @classmethod
+    def depuis_collection(cls, collection, taille_recents=TAILLE_RECENTS, metrique=None):
+        """Dimensionner le filtre sur la collection et y charger tous ses identifiants"""
+        existants = collection.estimated_document_count()
+        deduplicateur = cls(max(CAPACITE_MIN, 2 * existants), taille_recents, metrique)
+        # Projection sur le seul champ indexé et index imposé (sans filtre, MongoDB
+        # parcourrait la collection) : lecture couverte par l'index
+        for document in collection.find({}, {"id_commande": 1, "_id": 0}).hint([("id_commande", 1)]):
+            if "id_commande" in document:
+                deduplicateur.bloom.ajouter(document["id_commande"])
+        return deduplicateur
+
+    def doublons(self, ids, collection):
+        """Sous-ensemble des ids déjà présents dans la collection"""
+        with self._lock:
+            certains = set()
+            suspects = []
+            for identifiant in ids:
+                if identifiant in self.recents:
+                    certains.add(identifiant)
+                elif identifiant in self.bloom:
+                    suspects.append(identifiant)
+            self.compter("cache", len(certains))
+            self.compter("nouveau", len(ids) - len(certains) - len(suspects))
+
+        confirmes = set()
+        for debut in range(0, len(suspects), TAILLE_CONFIRMATION):
+            paquet = suspects[debut:debut + TAILLE_CONFIRMATION]
+            confirmes.update(document["id_commande"] for document in
+                             collection.find({"id_commande": {"$in": paquet}}, {"id_commande": 1, "_id": 0}))
+
+        with self._lock:
+            self.compter("confirme", len(confirmes))
+            self.compter("faux_positif", len(suspects) - len(confirmes))
+            for identifiant in confirmes:
+                self.recents.ajouter(identifiant)
+        return certains | confirmes
+
+    def compter(self, resultat, nombre):
+        self.compteurs[resultat] += nombre
+        if self.metrique is not None and nombre:
+            self.metrique.inc(nombre, resultat=resultat)
+
+    def ajouter(self, ids):
+        """Enregistrer des identifiants désormais présents dans la collection"""
+        with self._lock:
+            for identifiant in ids:
+                self.bloom.ajouter(identifiant)
+                self.recents.ajouter(identifiant)
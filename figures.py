@@ -0,0 +1,211 @@
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Figures des dashboards : une fonction par section, qui reçoit le résultat
+# de la section (analyses.SECTIONS ou son équivalent MongoDB) et retourne
+# ses figures dans l'ordre d'affichage. Les fonctions ne dépendent que de
+# ce résultat : les dashboards peuvent les mettre en cache sur son contenu.
+
+
+# ===================== ANALYSE 1: CA PAR MOIS ET CANAL =====================
+def ca_mois_canal(ca_mois_canal):
+    fig1 = px.bar(ca_mois_canal, x='mois', y='montant_total', color='canal',
+                  title='📊 CA Total par mois et canal',
+                  barmode='group',
+                  labels={'montant_total': 'CA (MAD)', 'mois': 'Mois'},
+                  color_discrete_sequence=px.colors.qualitative.Set2)
+    fig1.update_layout(height=400, hovermode='x unified')
+
+    fig2 = px.line(ca_mois_canal, x='mois', y='montant_total', color='canal',
+                   title='📈 Évolution du CA par canal',
+                   markers=True,
+                   labels={'montant_total': 'CA (MAD)', 'mois': 'Mois'},
+                   color_discrete_sequence=px.colors.qualitative.Pastel)
+    fig2.update_layout(height=400, hovermode='x unified')
+    return fig1, fig2
+
+
+# ===================== ANALYSE 2: TOP 10 PRODUITS =====================
+def top_produits(top_produits):
+    fig3 = px.bar(top_produits, x='quantite', y='nom',
+                  title='📦 Top 10 - Quantité vendue',
+                  orientation='h',
+                  color='quantite',
+                  color_continuous_scale='Blues',
+                  labels={'nom': 'Produit', 'quantite': 'Quantité'})
+    fig3.update_layout(yaxis={'categoryorder': 'total ascending'}, height=500)
+
+    fig4 = px.bar(top_produits, x='prix_total', y='nom',
+                  title='💵 Top 10 - Chiffre d\'affaires',
+                  orientation='h',
+                  color='prix_total',
+                  color_continuous_scale='Greens',
+                  labels={'nom': 'Produit', 'prix_total': 'CA (MAD)'})
+    fig4.update_layout(yaxis={'categoryorder': 'total ascending'}, height=500)
+    return fig3, fig4
+
+
+# ===================== ANALYSE 3: TAUX D'ANNULATION =====================
+def annulation(annulation_pivot):
+    fig5 = px.bar(annulation_pivot, x='canal', y='taux',
+                  title='📊 Taux d\'annulation par canal (%)',
+                  color='taux',
+                  color_continuous_scale='Reds',
+                  labels={'canal': 'Canal', 'taux': 'Taux (%)'})
+    fig5.update_traces(text=annulation_pivot['taux'].round(1), textposition='outside', texttemplate='%{text}%')
+    fig5.update_layout(height=400)
+
+    fig6 = px.pie(annulation_pivot, values='annulée', names='canal',
+                  title='🥧 Répartition des annulations par canal',
+                  color_discrete_sequence=px.colors.sequential.RdBu,
+                  hole=0.4)
+    fig6.update_layout(height=400)
+    return fig5, fig6
+
+
+# ===================== ANALYSE 4: CA MOYEN PAR COMMANDE =====================
+def ca_moyen(ca_moyen_canal):
+    fig7 = px.bar(ca_moyen_canal, x='Canal', y='CA Moyen',
+                  title='📊 CA Moyen par canal',
+                  color='CA Moyen',
+                  color_continuous_scale='Teal',
+                  labels={'CA Moyen': 'Montant (MAD)'})
+    fig7.update_traces(text=ca_moyen_canal['CA Moyen'].round(2), textposition='outside', texttemplate='%{text:.0f} MAD')
+    fig7.update_layout(height=400)
+
+    fig8 = go.Figure()
+    for idx, row in ca_moyen_canal.iterrows():
+        fig8.add_trace(go.Box(
+            y=[row['CA Min'], row['CA Moyen'], row['CA Max']],
+            name=row['Canal'],
+            boxmean='sd'
+        ))
+    fig8.update_layout(title='📦 Distribution du CA par canal',
+                       yaxis_title='Montant (MAD)',
+                       height=400)
+    return fig7, fig8
+
+
+# ===================== ANALYSE 5: SAISONNALITÉ =====================
+def saisonnalite(saison_data):
+    fig9 = px.line(saison_data, x='Heure', y='Nb Commandes', color='Canal',
+                   title='⏰ Nombre de commandes par heure',
+                   markers=True,
+                   color_discrete_sequence=px.colors.qualitative.Bold)
+    fig9.update_layout(height=400, hovermode='x unified')
+
+    fig10 = px.bar(saison_data, x='Heure', y='CA Total', color='Canal',
+                   title='💰 CA par heure de la journée',
+                   barmode='group',
+                   color_discrete_sequence=px.colors.qualitative.Pastel)
+    fig10.update_layout(height=400)
+
+    # Heatmap
+    pivot_heatmap = saison_data.pivot_table(values='Nb Commandes', index='Canal', columns='Heure',
+                                            fill_value=0, observed=True)
+    fig11 = px.imshow(pivot_heatmap,
+                      title='🔥 Heatmap - Activité par canal et heure',
+                      labels=dict(x="Heure", y="Canal", color="Commandes"),
+                      color_continuous_scale='YlOrRd',
+                      aspect='auto')
+    fig11.update_layout(height=300)
+    return fig9, fig10, fig11
+
+
+# ===================== ANALYSE 6: PANIER MOYEN =====================
+def panier(panier):
+    panier_stats = panier['stats']
+    dist_panier = panier['distribution']
+
+    fig12 = px.bar(panier_stats, x='Canal', y='Panier Moyen',
+                   title='📊 Nombre moyen de produits par panier',
+                   color='Panier Moyen',
+                   color_continuous_scale='Purples')
+    fig12.update_traces(text=panier_stats['Panier Moyen'].round(2), textposition='outside', texttemplate='%{text:.2f}')
+    fig12.update_layout(height=400)
+
+    fig13 = px.bar(dist_panier, x='nb_produits', y='count', color='canal',
+                   title='📦 Distribution du nombre de produits',
+                   barmode='group',
+                   labels={'nb_produits': 'Nb Produits', 'count': 'Nb Commandes'})
+    fig13.update_layout(height=400)
+    return fig12, fig13
+
+
+# ===================== ANALYSE 7: FIDÉLISATION =====================
+def fidelisation(fidelisation):
+    top_clients = fidelisation['top_clients'].copy()
+    retention = fidelisation['retention']
+
+    top_clients['Email_Court'] = top_clients['Email'].str[:20] + '...'
+    fig14 = px.bar(top_clients, x='CA Total', y='Email_Court',
+                   title='🏆 Top 10 Clients récurrents (par CA)',
+                   orientation='h',
+                   color='CA Total',
+                   color_continuous_scale='Greens',
+                   labels={'Email_Court': 'Client'})
+    fig14.update_layout(yaxis={'categoryorder': 'total ascending'}, height=400)
+
+    fig15 = px.bar(retention, x='Canal', y='Taux Rétention',
+                   title='🎯 Taux de rétention par canal (%)',
+                   color='Taux Rétention',
+                   color_continuous_scale='Viridis')
+    fig15.update_traces(text=retention['Taux Rétention'].round(1), textposition='outside', texttemplate='%{text:.1f}%')
+    fig15.update_layout(height=400)
+    return fig14, fig15
+
+
+# ===================== ANALYSE 8: GÉOGRAPHIQUE =====================
+def geographique(ville_stats):
+    fig16 = px.bar(ville_stats, x='CA Total', y='Ville',
+                   title='🏙️ Top 15 Villes par CA',
+                   orientation='h',
+                   color='CA Total',
+                   color_continuous_scale='Sunset')
+    fig16.update_layout(yaxis={'categoryorder': 'total ascending'}, height=500)
+
+    fig17 = px.treemap(ville_stats, path=['Ville'], values='CA Total',
+                       title='🗺️ Cartographie des ventes par ville',
+                       color='Nb Commandes',
+                       color_continuous_scale='Viridis')
+    fig17.update_layout(height=500)
+    return fig16, fig17
+
+
+# ===================== ANALYSE 9: CROSS-CANAL =====================
+def cross_canal(df_cross_top):
+    fig18 = px.bar(df_cross_top, x='produit', y='quantite', color='canal',
+                   title='📊 Top 10 Produits - Quantité par canal',
+                   barmode='group')
+    fig18.update_layout(xaxis_tickangle=-45, height=400)
+
+    fig19 = px.bar(df_cross_top, x='produit', y='ca', color='canal',
+                   title='💰 Top 10 Produits - CA par canal',
+                   barmode='group',
+                   labels={'ca': 'CA (MAD)'})
+    fig19.update_layout(xaxis_tickangle=-45, height=400)
+
+    # Heatmap cross-canal
+    pivot_cross = df_cross_top.pivot_table(values='quantite', index='produit', columns='canal',
+                                           fill_value=0, observed=True)
+    fig20 = px.imshow(pivot_cross,
+                      title='🔥 Heatmap - Performance cross-canal',
+                      labels=dict(x="Canal", y="Produit", color="Quantité"),
+                      color_continuous_scale='Blues',
+                      aspect='auto')
+    fig20.update_layout(height=400)
+    return fig18, fig19, fig20
+
+
+# Figures par section (mêmes noms que analyses.SECTIONS, hors métriques globales)
+SECTIONS = {
+    'ca_mois_canal': ca_mois_canal,
+    'top_produits': top_produits,
+    'annulation': annulation,
+    'ca_moyen': ca_moyen,
+    'saisonnalite': saisonnalite,
+    'panier': panier,
+    'fidelisation': fidelisation,
+    'geographique': geographique,
+    'cross_canal': cross_canal,
+}
@@ -0,0 +1,120 @@
+import os
+import time
+import sqlite3
+import threading
+
+JOURNAL_PATH = "./data/journal.sqlite"
+
+# Nombre maximal de paramètres par requête IN (...)
+TAILLE_REQUETE = 500
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fichiers (
+    chemin TEXT PRIMARY KEY,
+    etat TEXT NOT NULL,
+    maj REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS commandes (
+    id_commande TEXT PRIMARY KEY,
+    fichier TEXT NOT NULL,
+    etat TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS commandes_fichier ON commandes (fichier);
+"""
+
+
+class Journal:
+    """Journal local (SQLite en mode WAL) des écritures du collecteur
+
+    Commandes : "en_cours" est enregistré avant l'écriture MongoDB, "insere"
+    une fois l'insertion acquittée et propagée (rollups, Parquet). Au
+    redémarrage, une commande "en_cours" refusée comme doublon par MongoDB est
+    une insertion interrompue et non un vrai doublon : sa propagation est
+    rejouée. Une commande déjà "insere" n'est pas renvoyée à MongoDB.
+
+    Fichiers : "ecrit" quand toutes leurs commandes sont traitées ; la ligne
+    est retirée une fois le fichier archivé, avec celles de ses commandes. Un
+    fichier encore présent dans les sources mais "ecrit" est archivé sans être
+    relu. Un fichier redéposé après son archivage n'est donc pas une reprise :
+    ses commandes sont de vrais doublons.
+    """
+
+    def __init__(self, path=JOURNAL_PATH):
+        self.path = path
+        # Utilisé par le thread d'écriture du pipeline et par la boucle principale
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            # En WAL, NORMAL reste cohérent après un arrêt brutal du processus
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def selectionner(self, requete, valeurs):
+        """Exécuter une requête SELECT ... IN (?) par paquets de TAILLE_REQUETE valeurs"""
+        lignes = []
+        for debut in range(0, len(valeurs), TAILLE_REQUETE):
+            paquet = valeurs[debut:debut + TAILLE_REQUETE]
+            lignes += self._conn.execute(requete.format(",".join("?" * len(paquet))), paquet).fetchall()
+        return lignes
+
+    def etats_commandes(self, ids):
+        """{id_commande: (fichier, etat)} des commandes déjà journalisées"""
+        with self._lock:
+            lignes = self.selectionner("SELECT id_commande, fichier, etat FROM commandes WHERE id_commande IN ({})",
+                                       list(ids))
+        return {id_commande: (fichier, etat) for id_commande, fichier, etat in lignes}
+
+    def debut_ecriture(self, commandes):
+        """Enregistrer (id_commande, fichier) avant leur envoi à MongoDB"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO commandes (id_commande, fichier, etat) VALUES (?, ?, 'en_cours') "
+                "ON CONFLICT (id_commande) DO NOTHING", commandes)
+
+    def fin_ecriture(self, inseres, doublons=()):
+        """Marquer des commandes comme présentes dans MongoDB
+
+        inseres : id des commandes insérées par ce fichier ; doublons : couples
+        (id_commande, fichier) refusés par MongoDB, déjà insérés par un autre
+        fichier (propriétaire inconnu si la ligne venait d'être créée).
+        """
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE commandes SET etat = 'insere' WHERE id_commande = ?",
+                                   [(id_commande,) for id_commande in inseres])
+            self._conn.executemany(
+                "UPDATE commandes SET etat = 'insere', fichier = CASE WHEN fichier = ? THEN '' ELSE fichier END "
+                "WHERE id_commande = ?", [(fichier, id_commande) for id_commande, fichier in doublons])
+
+    def fichiers_ecrits(self, chemins):
+        """Chemins dont toutes les commandes ont déjà été écrites"""
+        chemins = {os.path.abspath(chemin): chemin for chemin in chemins}
+        with self._lock:
+            lignes = self.selectionner("SELECT chemin FROM fichiers WHERE etat = 'ecrit' AND chemin IN ({})",
+                                       list(chemins))
+        return {chemins[chemin] for chemin, in lignes}
+
+    def marquer_ecrits(self, chemins):
+        """Fichiers entièrement écrits, sur le point d'être archivés"""
+        maintenant = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO fichiers (chemin, etat, maj) VALUES (?, 'ecrit', ?)",
+                                   [(os.path.abspath(chemin), maintenant) for chemin in chemins])
+
+    def retirer(self, chemins):
+        """Oublier des fichiers archivés et leurs commandes
+
+        Les doublons sans propriétaire connu (fichier vide, voir fin_ecriture)
+        sont oubliés aussi : l'index unique de MongoDB les refusera encore.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM fichiers WHERE chemin = ?",
+                                   [(os.path.abspath(chemin),) for chemin in chemins])
+            # Les commandes sont journalisées sous le nom du fichier (voir collector.write_commandes)
+            self._conn.executemany("DELETE FROM commandes WHERE fichier = ?",
+                                   [(os.path.basename(chemin),) for chemin in chemins])
+            self._conn.execute("DELETE FROM commandes WHERE fichier = ''")
@@ -0,0 +1,89 @@
+import os
+import json
+
+# Décodeurs rapides optionnels : orjson, puis msgspec, sinon json standard
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# Forcer un backend (ex. JSON_BACKEND=json pour comparer avec la bibliothèque standard)
+BACKEND_ENV = "JSON_BACKEND"
+
+
+class Codec:
+    """Fonctions de (dé)codage d'un backend JSON
+
+    loads accepte des bytes ou une str ; les encodeurs retournent une str
+    (JSON compact sur une ligne, ou indenté comme les fichiers des simulateurs).
+    """
+
+    def __init__(self, nom, loads, dumps_compact, dumps_indente):
+        self.nom = nom
+        self.loads = loads
+        self.dumps_compact = dumps_compact
+        self.dumps_indente = dumps_indente
+
+
+def codec_json():
+    return Codec(
+        "json",
+        json.loads,
+        lambda data: json.dumps(data, ensure_ascii=False, separators=(",", ":")),
+        lambda data: json.dumps(data, ensure_ascii=False, indent=2),
+    )
+
+
+def codec_orjson():
+    return Codec(
+        "orjson",
+        orjson.loads,
+        lambda data: orjson.dumps(data).decode("utf-8"),
+        lambda data: orjson.dumps(data, option=orjson.OPT_INDENT_2).decode("utf-8"),
+    )
+
+
+def codec_msgspec():
+    decoder = msgspec.json.Decoder()
+    encoder = msgspec.json.Encoder()
+    return Codec(
+        "msgspec",
+        decoder.decode,
+        lambda data: encoder.encode(data).decode("utf-8"),
+        lambda data: msgspec.json.format(encoder.encode(data), indent=2).decode("utf-8"),
+    )
+
+
+# Backends installés, du plus rapide au plus lent
+FABRIQUES = {"orjson": codec_orjson, "msgspec": codec_msgspec, "json": codec_json}
+DISPONIBLES = [nom for nom, module in (("orjson", orjson), ("msgspec", msgspec), ("json", json)) if module is not None]
+
+# Erreurs de décodage de tous les backends (json.JSONDecodeError et orjson.JSONDecodeError sont des ValueError)
+ERREURS_DECODAGE = (ValueError,) if msgspec is None else (ValueError, msgspec.DecodeError)
+
+
+def charger_codec(nom=None):
+    """Codec du backend demandé ; par défaut JSON_BACKEND ou le plus rapide installé"""
+    nom = nom or os.environ.get(BACKEND_ENV) or DISPONIBLES[0]
+    if nom not in DISPONIBLES:
+        raise ValueError(f"Backend JSON indisponible: {nom} (installés: {', '.join(DISPONIBLES)})")
+    return FABRIQUES[nom]()
+
+
+CODEC = charger_codec()
+
+# Raccourcis vers le codec actif
+loads = CODEC.loads
+dumps_compact = CODEC.dumps_compact
+dumps_indente = CODEC.dumps_indente
+
+
+def lire_fichier(path):
+    """Décoder un fichier .json entier (lu en bytes : pas de décodage UTF-8 intermédiaire)"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
@@ -0,0 +1,259 @@
+import os
+import time
+import random
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from faker import Faker
+
+from json_codec import dumps_indente
+from order_model import AdresseLivraison, Produit
+from segment_writer import SegmentWriter, SEGMENT_MAX_OCTETS, SEGMENT_MAX_SECONDES
+
+BASE_OUTPUT_DIR = "./data/sources"
+
+# Liste de produits possibles (mêmes pour les trois canaux)
+PRODUITS = [
+    {"nom": "Laptop Dell XPS", "prix": 1200.00},
+    {"nom": "iPhone 15 Pro", "prix": 1100.00},
+    {"nom": "Samsung Galaxy S24", "prix": 950.00},
+    {"nom": "iPad Air", "prix": 650.00},
+    {"nom": "Écouteurs Sony WH-1000XM5", "prix": 350.00},
+    {"nom": "Montre Apple Watch Series 9", "prix": 450.00},
+    {"nom": "Clavier Mécanique Logitech", "prix": 120.00},
+    {"nom": "Souris Gaming Razer", "prix": 80.00},
+    {"nom": "Webcam Logitech 4K", "prix": 150.00},
+    {"nom": "Disque dur externe 2TB", "prix": 85.00},
+    {"nom": "Chargeur sans fil", "prix": 35.00},
+    {"nom": "Câble USB-C", "prix": 15.00},
+    {"nom": "Adaptateur HDMI", "prix": 25.00},
+    {"nom": "Support laptop", "prix": 40.00},
+    {"nom": "Sac à dos ordinateur", "prix": 60.00}
+]
+
+# Nombre de valeurs Faker pré-générées par champ et par processus
+TAILLE_POOL_FAKER = 5000
+
+# Commandes générées par défaut (comportement historique des simulateurs)
+NB_COMMANDES_DEFAUT = 500
+
+# Fréquence des messages de progression en mode haut débit
+PROGRESSION_SECONDES = 5
+
+
+class PoolFaker:
+    """Valeurs Faker générées une fois, puis tirées avec le RNG du générateur
+
+    Faker coûte plusieurs dizaines de microsecondes par appel : tirer dans
+    des listes pré-générées rend la génération indépendante de Faker.
+    """
+
+    def __init__(self, taille=TAILLE_POOL_FAKER, seed=None):
+        fake = Faker('fr_FR')
+        if seed is not None:
+            fake.seed_instance(seed)
+        self.noms = [fake.name() for _ in range(taille)]
+        # (utilisateur, domaine) : l'email est complété par commande, voir email()
+        self.comptes_email = [tuple(fake.email().split("@")) for _ in range(taille)]
+        self.telephones = [fake.phone_number() for _ in range(taille)]
+        self.rues = [fake.street_address() for _ in range(taille)]
+        self.villes = [fake.city() for _ in range(taille)]
+        self.codes_postaux = [fake.postcode() for _ in range(taille)]
+
+    def email(self, rng, id_commande):
+        """Email propre à une commande : utilisateur du pool suffixé du numéro de commande
+
+        Tirer des adresses entières dans le pool ferait de presque tous les
+        clients des clients récurrents dès que le run dépasse sa taille ;
+        comme les fake.email() d'origine, les adresses restent quasi uniques.
+        """
+        utilisateur, domaine = rng.choice(self.comptes_email)
+        return f"{utilisateur}{id_commande.rsplit('-', 1)[1]}@{domaine}"
+
+    def adresse(self, rng):
+        return AdresseLivraison(
+            rue=rng.choice(self.rues),
+            ville=rng.choice(self.villes),
+            code_postal=rng.choice(self.codes_postaux),
+            pays="Maroc"
+        )
+
+
+def generer_produits(rng):
+    """Tirer 1 à 4 lignes de produits ; retourne (liste de Produit, montant total)"""
+    produits_commande = []
+    total = 0
+
+    for _ in range(rng.randint(1, 4)):
+        produit = rng.choice(PRODUITS)
+        quantite = rng.randint(1, 3)
+        prix_total = produit["prix"] * quantite
+        total += prix_total
+
+        produits_commande.append(Produit(
+            nom_produit=produit["nom"],
+            quantite=quantite,
+            prix_unitaire=produit["prix"],
+            prix_total=round(prix_total, 2)
+        ))
+
+    return produits_commande, round(total, 2)
+
+
+def identifiant(prefixe, date, numero):
+    """Identifiant de commande unique pour un run (numéro global, tous processus confondus)"""
+    return f"{prefixe}-{date.strftime('%Y%m%d%H%M%S')}-{numero:04d}"
+
+
+def parse_args(libelle, delai):
+    parser = argparse.ArgumentParser(description=f"Simulateur de commandes {libelle}")
+    parser.add_argument("--count", type=int, default=None,
+                        help=f"Nombre total de commandes (défaut : {NB_COMMANDES_DEFAUT}, illimité avec --duration)")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="Durée maximale de génération en secondes")
+    parser.add_argument("--rate", type=float, default=None,
+                        help=f"Débit cible en commandes/s (0 : sans limite ; défaut : une commande "
+                             f"toutes les {delai[0]}-{delai[1]} s)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Nombre de processus de génération")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Graine du générateur (chaque processus dérive la sienne)")
+    parser.add_argument("--date-debut", type=datetime.fromisoformat, default=None,
+                        help="Dater les commandes à partir de cette date ISO, espacées de 1/rate s, "
+                             "au lieu de l'heure courante (runs reproductibles)")
+    parser.add_argument("--pool-faker", type=int, default=TAILLE_POOL_FAKER,
+                        help="Nombre de valeurs Faker pré-générées par champ")
+    parser.add_argument("--output-dir", default=None,
+                        help="Répertoire de sortie (défaut : data/sources/<canal>)")
+    # Format de sortie : un fichier JSON par commande ou des segments JSON-lines tournants
+    parser.add_argument("--format", choices=["json", "jsonl"], default="json",
+                        help="json : un fichier par commande ; jsonl : segments .jsonl publiés par rotation")
+    parser.add_argument("--segment-octets", type=int, default=SEGMENT_MAX_OCTETS,
+                        help="Taille maximale d'un segment .jsonl avant rotation")
+    parser.add_argument("--segment-secondes", type=float, default=SEGMENT_MAX_SECONDES,
+                        help="Âge maximal d'un segment .jsonl avant rotation")
+    return parser.parse_args()
+
+
+def executer_worker(generer_commande, prefixe, output_dir, options, index, nb_commandes):
+    """Boucle de génération d'un processus ; retourne le nombre de commandes écrites"""
+    seed = None if options.seed is None else options.seed + index
+    rng = random.Random(seed)
+    pool = PoolFaker(options.pool_faker, seed)
+
+    segments = None
+    if options.format == "jsonl":
+        segments = SegmentWriter(output_dir, prefixe, options.segment_octets, options.segment_secondes)
+
+    # Débit partagé équitablement entre les processus
+    debit = options.rate / options.workers if options.rate else 0
+    espacement_dates = 1 / options.rate if options.rate else 1
+    legacy = options.rate is None
+
+    compteur = 0
+    debut = time.monotonic()
+    derniere_progression = debut
+    try:
+        while nb_commandes is None or compteur < nb_commandes:
+            maintenant = time.monotonic()
+            if options.duration is not None and maintenant - debut >= options.duration:
+                break
+
+            # Numérotation entrelacée : unique entre processus, ordonnée dans le temps
+            numero = compteur * options.workers + index
+            if options.date_debut is not None:
+                date = options.date_debut + timedelta(seconds=numero * espacement_dates)
+            else:
+                date = datetime.now()
+            commande = generer_commande(rng, pool, identifiant(prefixe, date, numero), date)
+
+            if segments is not None:
+                # Ajouter la commande (JSON compact) au segment courant
+                segments.ecrire(commande)
+            else:
+                # Sauvegarder dans un fichier JSON
+                filename = f"{output_dir}/commande_{commande['id_commande']}.json"
+                with open(filename, 'w', encoding='utf-8') as f:
+                    f.write(dumps_indente(commande))
+            compteur += 1
+
+            if legacy:
+                total = nb_commandes if nb_commandes is not None else "∞"
+                print(f"✅ [{compteur}/{total}] Commande générée: {commande['id_commande']} - "
+                      f"Montant: {commande['montant_total']} MAD")
+                time.sleep(random.uniform(*options.delai))
+                continue
+
+            if maintenant - derniere_progression >= PROGRESSION_SECONDES:
+                derniere_progression = maintenant
+                print(f"   [processus {index}] {compteur} commandes ({compteur / (maintenant - debut):.0f}/s)")
+
+            if debit:
+                # Cadencement sur l'échéance théorique : pas de dérive cumulée
+                attente = debut + compteur / debit - time.monotonic()
+                if attente > 0:
+                    time.sleep(attente)
+
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # Publier le dernier segment, même partiel
+        if segments is not None:
+            segments.close()
+
+    return compteur
+
+
+def repartir(nb_commandes, workers):
+    """Répartir le nombre total de commandes entre les processus"""
+    if nb_commandes is None:
+        return [None] * workers
+    return [nb_commandes // workers + (1 if index < nb_commandes % workers else 0) for index in range(workers)]
+
+
+def lancer(canal, prefixe, generer_commande, libelle, delai):
+    """Point d'entrée commun des simulateurs de canal
+
+    generer_commande(rng, pool, id_commande, date) construit une commande ;
+    elle doit être définie au niveau module pour être transmise aux processus.
+    """
+    options = parse_args(libelle, delai)
+    options.delai = delai
+    options.workers = max(1, options.workers)
+    nb_commandes = options.count
+    if nb_commandes is None and options.duration is None:
+        nb_commandes = NB_COMMANDES_DEFAUT
+
+    # Créer le répertoire de destination s'il n'existe pas
+    output_dir = options.output_dir or os.path.join(BASE_OUTPUT_DIR, canal)
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"{libelle} Démarrage du simulateur...")
+    print(f"📁 Répertoire de sortie: {output_dir}")
+    if options.rate is None:
+        print(f"⏱️  Génération d'une commande toutes les {delai[0]}-{delai[1]} secondes\n")
+    else:
+        cible = f"{options.rate:.0f} commandes/s" if options.rate else "sans limite de débit"
+        print(f"⚡ Génération {cible} sur {options.workers} processus ({options.format})\n")
+
+    debut = time.monotonic()
+    compteur = 0
+    parts = repartir(nb_commandes, options.workers)
+    try:
+        if options.workers == 1:
+            compteur = executer_worker(generer_commande, prefixe, output_dir, options, 0, parts[0])
+        else:
+            with ProcessPoolExecutor(max_workers=options.workers) as pool:
+                futures = [pool.submit(executer_worker, generer_commande, prefixe, output_dir, options, index, part)
+                           for index, part in enumerate(parts)]
+                compteur = sum(future.result() for future in futures)
+
+    except KeyboardInterrupt:
+        print(f"\n⚠️  Arrêt du simulateur.")
+    except Exception as e:
+        print(f"\n❌ Erreur: {e}")
+
+    duree = time.monotonic() - debut
+    debit = compteur / duree if duree > 0 else 0
+    print(f"\n✅ Simulation terminée! {compteur} commandes générées dans {output_dir} "
+          f"en {duree:.1f}s ({debit:.0f} commandes/s)")
@@ -0,0 +1,167 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Bornes par défaut des histogrammes de latence (secondes)
+BUCKETS_DEFAUT = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Registre:
+    """Ensemble des métriques exposées par un processus"""
+
+    def __init__(self):
+        self.metriques = []
+
+    def enregistrer(self, metrique):
+        self.metriques.append(metrique)
+        return metrique
+
+    def exposition(self):
+        """Texte au format d'exposition Prometheus (version 0.0.4)"""
+        return "".join(metrique.exposition() for metrique in self.metriques)
+
+
+REGISTRE = Registre()
+
+
+def echapper(valeur):
+    return str(valeur).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def formater_valeur(valeur):
+    if valeur == float("inf"):
+        return "+Inf"
+    return repr(float(valeur)) if isinstance(valeur, float) else str(valeur)
+
+
+class Metrique:
+    """Base commune : valeurs indexées par le tuple des labels
+
+    Les mises à jour ne prennent qu'un verrou et un accès dictionnaire : le
+    formatage du texte n'a lieu qu'au moment du scrape.
+    """
+    type = "untyped"
+
+    def __init__(self, nom, aide, labels=(), registre=REGISTRE):
+        self.nom = nom
+        self.aide = aide
+        self.labels = tuple(labels)
+        self.valeurs = {}
+        self._lock = threading.Lock()
+        registre.enregistrer(self)
+
+    def cle(self, labels):
+        return tuple(str(labels.get(label, "")) for label in self.labels)
+
+    def formater_labels(self, cle, extra=()):
+        paires = list(zip(self.labels, cle)) + list(extra)
+        if not paires:
+            return ""
+        return "{" + ",".join(f'{nom}="{echapper(valeur)}"' for nom, valeur in paires) + "}"
+
+    def echantillons(self):
+        """Liste de (suffixe, cle, labels supplémentaires, valeur)"""
+        with self._lock:
+            return [("", cle, (), valeur) for cle, valeur in self.valeurs.items()]
+
+    def exposition(self):
+        lignes = [f"# HELP {self.nom} {self.aide}", f"# TYPE {self.nom} {self.type}"]
+        for suffixe, cle, extra, valeur in self.echantillons():
+            lignes.append(f"{self.nom}{suffixe}{self.formater_labels(cle, extra)} {formater_valeur(valeur)}")
+        return "\n".join(lignes) + "\n"
+
+
+class Compteur(Metrique):
+    type = "counter"
+
+    def __init__(self, nom, aide, labels=(), registre=REGISTRE):
+        super().__init__(nom, aide, labels, registre)
+        if not self.labels:
+            # Exposé à 0 dès le démarrage plutôt qu'absent
+            self.valeurs[()] = 0
+
+    def inc(self, valeur=1, **labels):
+        cle = self.cle(labels)
+        with self._lock:
+            self.valeurs[cle] = self.valeurs.get(cle, 0) + valeur
+
+
+class Jauge(Metrique):
+    """Valeur instantanée, fixée par set() ou calculée au scrape par fonction()
+
+    fonction retourne un dictionnaire {tuple des labels: valeur}.
+    """
+    type = "gauge"
+
+    def __init__(self, nom, aide, labels=(), registre=REGISTRE, fonction=None):
+        super().__init__(nom, aide, labels, registre)
+        self.fonction = fonction
+
+    def set(self, valeur, **labels):
+        cle = self.cle(labels)
+        with self._lock:
+            self.valeurs[cle] = valeur
+
+    def echantillons(self):
+        if self.fonction is None:
+            return super().echantillons()
+        return [("", tuple(str(v) for v in cle), (), valeur) for cle, valeur in self.fonction().items()]
+
+
+class Histogramme(Metrique):
+    type = "histogram"
+
+    def __init__(self, nom, aide, labels=(), registre=REGISTRE, buckets=BUCKETS_DEFAUT):
+        super().__init__(nom, aide, labels, registre)
+        self.buckets = tuple(buckets)
+
+    def observe(self, valeur, **labels):
+        cle = self.cle(labels)
+        index = bisect.bisect_left(self.buckets, valeur)
+        with self._lock:
+            serie = self.valeurs.get(cle)
+            if serie is None:
+                # Un compteur par borne, plus +Inf ; puis somme et nombre
+                serie = self.valeurs[cle] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            serie[0][index] += 1
+            serie[1] += valeur
+            serie[2] += 1
+
+    def echantillons(self):
+        with self._lock:
+            series = [(cle, list(comptes), somme, nombre) for cle, (comptes, somme, nombre) in self.valeurs.items()]
+
+        echantillons = []
+        for cle, comptes, somme, nombre in series:
+            cumul = 0
+            for borne, compte in zip(self.buckets + (float("inf"),), comptes):
+                cumul += compte
+                echantillons.append(("_bucket", cle, (("le", formater_valeur(float(borne))),), cumul))
+            echantillons.append(("_sum", cle, (), somme))
+            echantillons.append(("_count", cle, (), nombre))
+        return echantillons
+
+
+def demarrer_serveur(port, adresse="127.0.0.1", registre=REGISTRE):
+    """Servir /metrics depuis un thread daemon (le collecteur n'est jamais bloqué)"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] not in ("/", "/metrics"):
+                self.send_error(404)
+                return
+            corps = registre.exposition().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(corps)))
+            self.end_headers()
+            self.wfile.write(corps)
+
+        def log_message(self, format, *args):
+            # Pas de ligne de log à chaque scrape
+            pass
+
+    serveur = ThreadingHTTPServer((adresse, port), MetricsHandler)
+    serveur.daemon_threads = True
+    threading.Thread(target=serveur.serve_forever, name="metrics", daemon=True).start()
+    return serveur
@@ -0,0 +1,278 @@
+import pandas as pd
+from pymongo import MongoClient
+
+from analyses import calcul_retention, pivot_annulation, top_produits_cross
+from rollups import VERSIONS
+
+# Configuration MongoDB (alimentée par collector.py)
+MONGO_URI = "mongodb://localhost:27017/"
+DATABASE_NAME = "multi_market"
+COLLECTION_NAME = "commandes"
+
+# Étape commune : exclure les commandes annulées du chiffre d'affaires
+NON_ANNULEES = {"$match": {"statut": {"$ne": "annulée"}}}
+
+
+def connect(uri=MONGO_URI):
+    """Ouvrir la collection des commandes standardisées"""
+    client = MongoClient(uri, serverSelectionTimeoutMS=3000)
+    collection = client[DATABASE_NAME][COLLECTION_NAME]
+    # Échouer tout de suite si le serveur est injoignable
+    client.admin.command("ping")
+    return collection
+
+
+def version(collection):
+    """Version des données : séquence du collecteur et nombre estimé de commandes
+
+    Deux lectures sur métadonnées et clé primaire, sans parcours de la
+    collection. Le nombre couvre les écritures qui ne passent pas par le
+    collecteur (import manuel, suppression).
+    """
+    sequence = collection.database[VERSIONS].find_one({"_id": collection.name})
+    return (sequence or {}).get("sequence", 0), collection.estimated_document_count()
+
+
+def selection(filtre):
+    """Étape $match initiale des filtres du dashboard
+
+    En tête de pipeline, elle est servie par les index du collecteur
+    (date_commande, canal + date_commande) au lieu d'un parcours complet.
+    """
+    if filtre is None or filtre.vide:
+        return []
+    return [{"$match": filtre.requete_mongo()}]
+
+
+def aggregate(collection, pipeline, colonnes):
+    """Exécuter un pipeline et ne rapatrier que les lignes du résultat"""
+    return pd.DataFrame(list(collection.aggregate(pipeline)), columns=colonnes)
+
+
+# ===================== MÉTRIQUES GLOBALES =====================
+def metriques_globales(collection, filtre=None):
+    resultat = list(collection.aggregate([
+        *selection(filtre),
+        {"$group": {
+            "_id": None,
+            "total_commandes": {"$sum": 1},
+            "ca_total": {"$sum": "$montant_total"},
+            "ca_moyen": {"$avg": "$montant_total"},
+            "commandes_annulees": {"$sum": {"$cond": [{"$eq": ["$statut", "annulée"]}, 1, 0]}}
+        }}
+    ]))
+    if not resultat:
+        return {'total_commandes': 0, 'ca_total': 0, 'ca_moyen': 0, 'commandes_annulees': 0, 'taux_annulation': 0}
+
+    metriques = resultat[0]
+    metriques.pop("_id")
+    metriques['taux_annulation'] = metriques['commandes_annulees'] / metriques['total_commandes'] * 100
+    return metriques
+
+
+# ===================== ANALYSE 1: CA PAR MOIS ET CANAL =====================
+def ca_par_mois_canal(collection, filtre=None):
+    return aggregate(collection, [
+        *selection(filtre),
+        NON_ANNULEES,
+        # date_commande est stockée au format ISO (ASCII) : "YYYY-MM" = 7 premiers octets
+        {"$group": {
+            "_id": {"mois": {"$substrBytes": ["$date_commande", 0, 7]}, "canal": "$canal"},
+            "montant_total": {"$sum": "$montant_total"}
+        }},
+        {"$project": {"_id": 0, "mois": "$_id.mois", "canal": "$_id.canal", "montant_total": 1}},
+        {"$sort": {"mois": 1, "canal": 1}}
+    ], ['mois', 'canal', 'montant_total'])
+
+
+# ===================== ANALYSE 2: TOP 10 PRODUITS =====================
+def top_produits(collection, filtre=None):
+    return aggregate(collection, [
+        *selection(filtre),
+        NON_ANNULEES,
+        {"$unwind": "$produits"},
+        {"$group": {
+            "_id": "$produits.nom_produit",
+            "quantite": {"$sum": "$produits.quantite"},
+            "prix_total": {"$sum": "$produits.prix_total"}
+        }},
+        {"$sort": {"quantite": -1}},
+        {"$limit": 10},
+        {"$project": {"_id": 0, "nom": "$_id", "quantite": 1, "prix_total": 1}}
+    ], ['nom', 'quantite', 'prix_total'])
+
+
+# ===================== ANALYSE 3: TAUX D'ANNULATION =====================
+def taux_annulation(collection, filtre=None):
+    annulation_data = aggregate(collection, [
+        *selection(filtre),
+        {"$group": {"_id": {"canal": "$canal", "statut": "$statut"}, "count": {"$sum": 1}}},
+        {"$project": {"_id": 0, "canal": "$_id.canal", "statut": "$_id.statut", "count": 1}}
+    ], ['canal', 'statut', 'count'])
+    return pivot_annulation(annulation_data)
+
+
+# ===================== ANALYSE 4: CA MOYEN PAR COMMANDE =====================
+def ca_moyen_par_canal(collection, filtre=None):
+    return aggregate(collection, [
+        *selection(filtre),
+        NON_ANNULEES,
+        {"$group": {
+            "_id": "$canal",
+            "CA Moyen": {"$avg": "$montant_total"},
+            "CA Min": {"$min": "$montant_total"},
+            "CA Max": {"$max": "$montant_total"},
+            "Nb Commandes": {"$sum": 1}
+        }},
+        {"$sort": {"_id": 1}},
+        {"$project": {"_id": 0, "Canal": "$_id", "CA Moyen": 1, "CA Min": 1, "CA Max": 1, "Nb Commandes": 1}}
+    ], ['Canal', 'CA Moyen', 'CA Min', 'CA Max', 'Nb Commandes'])
+
+
+# ===================== ANALYSE 5: SAISONNALITÉ =====================
+def saisonnalite(collection, filtre=None):
+    return aggregate(collection, [
+        *selection(filtre),
+        NON_ANNULEES,
+        # Heure = octets 11-12 de la date ISO "YYYY-MM-DDTHH:..."
+        {"$group": {
+            "_id": {"heure": {"$toInt": {"$substrBytes": ["$date_commande", 11, 2]}}, "canal": "$canal"},
+            "Nb Commandes": {"$sum": 1},
+            "CA Total": {"$sum": "$montant_total"}
+        }},
+        {"$sort": {"_id.heure": 1, "_id.canal": 1}},
+        {"$project": {"_id": 0, "Heure": "$_id.heure", "Canal": "$_id.canal", "Nb Commandes": 1, "CA Total": 1}}
+    ], ['Heure', 'Canal', 'Nb Commandes', 'CA Total'])
+
+
+# ===================== ANALYSE 6: PANIER MOYEN =====================
+def panier_moyen(collection, filtre=None):
+    nb_produits = {"$project": {
+        "canal": 1,
+        "montant_total": 1,
+        "nb_produits": {"$size": {"$ifNull": ["$produits", []]}}
+    }}
+
+    panier_stats = aggregate(collection, [
+        *selection(filtre),
+        NON_ANNULEES,
+        nb_produits,
+        {"$group": {
+            "_id": "$canal",
+            "Panier Moyen": {"$avg": "$nb_produits"},
+            "Panier Min": {"$min": "$nb_produits"},
+            "Panier Max": {"$max": "$nb_produits"},
+            "Montant Moyen": {"$avg": "$montant_total"},
+            "Montant Min": {"$min": "$montant_total"},
+            "Montant Max": {"$max": "$montant_total"}
+        }},
+        {"$sort": {"_id": 1}},
+        {"$addFields": {"Canal": "$_id"}},
+        {"$project": {"_id": 0}}
+    ], ['Canal', 'Panier Moyen', 'Panier Min', 'Panier Max', 'Montant Moyen', 'Montant Min', 'Montant Max'])
+
+    dist_panier = aggregate(collection, [
+        *selection(filtre),
+        NON_ANNULEES,
+        nb_produits,
+        {"$group": {"_id": {"canal": "$canal", "nb_produits": "$nb_produits"}, "count": {"$sum": 1}}},
+        {"$sort": {"_id.canal": 1, "_id.nb_produits": 1}},
+        {"$project": {"_id": 0, "canal": "$_id.canal", "nb_produits": "$_id.nb_produits", "count": 1}}
+    ], ['canal', 'nb_produits', 'count'])
+
+    return {'stats': panier_stats, 'distribution': dist_panier}
+
+
+# ===================== ANALYSE 7: FIDÉLISATION =====================
+def fidelisation(collection, filtre=None):
+    resultat = list(collection.aggregate([
+        *selection(filtre),
+        {"$match": {"client.email": {"$ne": None}}},
+        {"$group": {
+            "_id": {"email": "$client.email", "canal": "$canal"},
+            "Nb Commandes": {"$sum": 1},
+            "CA Total": {"$sum": "$montant_total"}
+        }},
+        {"$facet": {
+            "top_clients": [
+                {"$match": {"Nb Commandes": {"$gte": 2}}},
+                {"$sort": {"CA Total": -1}},
+                {"$limit": 10},
+                {"$project": {"_id": 0, "Email": "$_id.email", "Canal": "$_id.canal",
+                              "Nb Commandes": 1, "CA Total": 1}}
+            ],
+            "clients": [
+                {"$group": {
+                    "_id": "$_id.canal",
+                    "Total Clients": {"$sum": 1},
+                    "Clients Récurrents": {"$sum": {"$cond": [{"$gte": ["$Nb Commandes", 2]}, 1, 0]}}
+                }},
+                {"$sort": {"_id": 1}},
+                {"$project": {"_id": 0, "Canal": "$_id", "Total Clients": 1, "Clients Récurrents": 1}}
+            ]
+        }}
+    ]))
+    facettes = resultat[0] if resultat else {"top_clients": [], "clients": []}
+
+    top_clients = pd.DataFrame(facettes["top_clients"], columns=['Email', 'Canal', 'Nb Commandes', 'CA Total'])
+    clients = pd.DataFrame(facettes["clients"], columns=['Canal', 'Total Clients', 'Clients Récurrents'])
+    retention = calcul_retention(clients[['Canal', 'Total Clients']], clients[['Canal', 'Clients Récurrents']])
+    return {'top_clients': top_clients, 'retention': retention}
+
+
+# ===================== ANALYSE 8: GÉOGRAPHIQUE =====================
+def geographique(collection, filtre=None):
+    return aggregate(collection, [
+        *selection(filtre),
+        NON_ANNULEES,
+        {"$match": {
+            "canal": {"$in": ["site_web", "application_mobile"]},
+            "adresse_livraison.ville": {"$type": "string"}
+        }},
+        {"$group": {
+            "_id": "$adresse_livraison.ville",
+            "CA Total": {"$sum": "$montant_total"},
+            "Nb Commandes": {"$sum": 1}
+        }},
+        {"$sort": {"CA Total": -1}},
+        {"$limit": 15},
+        {"$project": {"_id": 0, "Ville": "$_id", "CA Total": 1, "Nb Commandes": 1}}
+    ], ['Ville', 'CA Total', 'Nb Commandes'])
+
+
+# ===================== ANALYSE 9: CROSS-CANAL =====================
+def cross_canal(collection, filtre=None):
+    # Au plus (nb produits x nb canaux) lignes : le top 10 est extrait côté pandas
+    cross_stats = aggregate(collection, [
+        *selection(filtre),
+        NON_ANNULEES,
+        {"$unwind": "$produits"},
+        {"$group": {
+            "_id": {"produit": "$produits.nom_produit", "canal": "$canal"},
+            "quantite": {"$sum": "$produits.quantite"},
+            "ca": {"$sum": "$produits.prix_total"}
+        }},
+        {"$sort": {"_id.produit": 1, "_id.canal": 1}},
+        {"$project": {"_id": 0, "produit": "$_id.produit", "canal": "$_id.canal", "quantite": 1, "ca": 1}}
+    ], ['produit', 'canal', 'quantite', 'ca'])
+    return top_produits_cross(cross_stats)
+
+
+# Mêmes sections (et mêmes colonnes) que analyses.SECTIONS
+SECTIONS = {
+    'metriques': metriques_globales,
+    'ca_mois_canal': ca_par_mois_canal,
+    'top_produits': top_produits,
+    'annulation': taux_annulation,
+    'ca_moyen': ca_moyen_par_canal,
+    'saisonnalite': saisonnalite,
+    'panier': panier_moyen,
+    'fidelisation': fidelisation,
+    'geographique': geographique,
+    'cross_canal': cross_canal,
+}
+
+
+def compute_all(collection, filtre=None):
+    """Calculer toutes les sections côté serveur MongoDB (commandes retenues par le filtre)"""
+    return {nom: section(collection, filtre) for nom, section in SECTIONS.items()}
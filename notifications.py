@@ -0,0 +1,98 @@
+import os
+import threading
+
+import mongo_source
+from data_loader import BASE_PATH, SOURCES
+from rollups import VERSIONS
+
+# Intervalle de vérification quand aucune notification n'est disponible (secondes)
+INTERVALLE = 1.0
+
+
+class Veilleur:
+    """Version des données surveillée par un seul thread, partagé entre les sessions
+
+    Le thread lit la version (lire_version) puis publie chaque changement ;
+    les sessions du dashboard attendent un changement sur une condition au
+    lieu de relancer leur script à intervalle fixe. Si flux est fourni, c'est
+    un itérateur bloquant qui produit un élément à chaque changement possible
+    (change stream MongoDB) ; en cas d'échec, repli sur la lecture périodique.
+    """
+
+    def __init__(self, lire_version, flux=None, intervalle=INTERVALLE):
+        self.lire_version = lire_version
+        self.flux = flux
+        self.intervalle = intervalle
+        self._condition = threading.Condition()
+        self._arret = threading.Event()
+        self.version = None
+        # Version initiale lue tout de suite : la première attente ne se réveille pas à vide
+        self.version = self.lire()
+        self._thread = threading.Thread(target=self.boucle, name="veilleur-donnees", daemon=True)
+        self._thread.start()
+
+    def lire(self):
+        try:
+            return self.lire_version()
+        except Exception:
+            # Source momentanément indisponible : la version reste inchangée
+            return self.version
+
+    def publier(self, version):
+        with self._condition:
+            if version != self.version:
+                self.version = version
+                self._condition.notify_all()
+
+    def boucle(self):
+        if self.flux is not None:
+            try:
+                for _ in self.flux():
+                    self.publier(self.lire())
+            except Exception:
+                # Notifications indisponibles (MongoDB sans replica set, connexion
+                # perdue...) : lecture périodique
+                pass
+        while not self._arret.wait(self.intervalle):
+            self.publier(self.lire())
+
+    def arreter(self):
+        """Arrêter la lecture périodique (le flux, bloquant, n'est pas interrompu)"""
+        self._arret.set()
+
+    def attendre(self, version, timeout=None):
+        """Bloquer jusqu'à ce que la version diffère de version (ou timeout) ; retourne la version courante"""
+        with self._condition:
+            self._condition.wait_for(lambda: self.version != version, timeout)
+            return self.version
+
+
+def signature_repertoires(base_path=BASE_PATH, sources=SOURCES):
+    """mtime des répertoires sources : change à chaque fichier déposé, publié (renommage) ou archivé"""
+    signature = []
+    for source in sources:
+        try:
+            signature.append(os.stat(os.path.join(base_path, source)).st_mtime_ns)
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def veilleur_fichiers(base_path=BASE_PATH, sources=SOURCES, intervalle=INTERVALLE):
+    """Surveiller les fichiers JSON : trois stat() par vérification, sans lister les fichiers"""
+    return Veilleur(lambda: signature_repertoires(base_path, sources), intervalle=intervalle)
+
+
+def veilleur_mongo(collection, intervalle=INTERVALLE):
+    """Surveiller la séquence publiée par le collecteur (rollups.VERSIONS)
+
+    Un change stream sur la séquence réveille les sessions dès qu'un lot est
+    écrit ; il exige un replica set, sinon la séquence est relue à intervalle.
+    """
+    versions = collection.database[VERSIONS]
+
+    def flux():
+        with versions.watch([{"$match": {"documentKey._id": collection.name}}]) as stream:
+            yield from stream
+
+    return Veilleur(lambda: mongo_source.version(collection), flux=flux, intervalle=intervalle)
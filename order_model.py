@@ -0,0 +1,199 @@
+from dataclasses import dataclass
+from datetime import datetime
+
+# Modèle de commande partagé par les simulateurs, le collecteur et les dashboards.
+# Les classes utilisent __slots__ : pas de __dict__ par instance, ce qui réduit
+# la mémoire des commandes en transit (files du pipeline, lots d'insertion).
+# vers_dict() produit le document MongoDB / JSON ; depuis_dict() fait
+# l'opération inverse en une seule passe.
+
+# Statuts et boutiques possibles : tirés par les simulateurs, proposés par les
+# filtres des dashboards (qui n'importent donc pas les simulateurs ni Faker)
+STATUTS = ["confirmée", "confirmée", "confirmée", "confirmée", "annulée"]  # 80% confirmée, 20% annulée
+BOUTIQUES = [
+    "Khouribga Centre",
+    "Khouribga Mall",
+    "Casablanca Marina",
+    "Rabat Agdal",
+    "Marrakech Gueliz"
+]
+
+
+class Modele:
+    __slots__ = ()
+
+    def __reduce__(self):
+        # Pickle compact pour les échanges avec le pool de préparation :
+        # valeurs dans l'ordre des champs, sans leurs noms
+        return self.__class__, tuple(getattr(self, champ) for champ in self.__slots__)
+
+
+@dataclass(slots=True)
+class Client(Modele):
+    nom: str = None
+    email: str = None
+    telephone: str = None
+    # Compte client de l'application mobile
+    compte_client: str = None
+
+    @classmethod
+    def depuis_dict(cls, data):
+        get = data.get
+        return cls(get("nom"), get("email"), get("telephone"), get("compte_client"))
+
+    def vers_dict(self):
+        data = {"nom": self.nom, "email": self.email, "telephone": self.telephone}
+        if self.compte_client is not None:
+            data["compte_client"] = self.compte_client
+        return data
+
+
+@dataclass(slots=True)
+class Produit(Modele):
+    nom_produit: str
+    quantite: int
+    prix_unitaire: float
+    prix_total: float
+
+    @classmethod
+    def depuis_dict(cls, data):
+        # Champs garantis par la validation (validation.CHAMPS_PRODUIT)
+        return cls(data["nom_produit"], data["quantite"], data["prix_unitaire"], data["prix_total"])
+
+    def vers_dict(self):
+        return {"nom_produit": self.nom_produit, "quantite": self.quantite,
+                "prix_unitaire": self.prix_unitaire, "prix_total": self.prix_total}
+
+
+@dataclass(slots=True)
+class AdresseLivraison(Modele):
+    rue: str = None
+    ville: str = None
+    code_postal: str = None
+    pays: str = None
+
+    @classmethod
+    def depuis_dict(cls, data):
+        get = data.get
+        return cls(get("rue"), get("ville"), get("code_postal"), get("pays"))
+
+    def vers_dict(self):
+        return {"rue": self.rue, "ville": self.ville, "code_postal": self.code_postal, "pays": self.pays}
+
+
+@dataclass(slots=True)
+class Appareil(Modele):
+    type: str = None
+    version_app: str = None
+    os_version: str = None
+
+    @classmethod
+    def depuis_dict(cls, data):
+        get = data.get
+        return cls(get("type"), get("version_app"), get("os_version"))
+
+    def vers_dict(self):
+        return {"type": self.type, "version_app": self.version_app, "os_version": self.os_version}
+
+
+def optionnel(classe, data):
+    """Objet imbriqué facultatif : None si le champ est absent ou n'est pas un objet JSON"""
+    return classe.depuis_dict(data) if data.__class__ is dict else None
+
+
+@dataclass(slots=True)
+class Commande(Modele):
+    """Commande d'un canal ; les champs propres aux autres canaux restent à None"""
+    id_commande: str
+    canal: str
+    date_commande: str
+    client: Client
+    produits: list
+    montant_total: float
+    statut: str
+    mode_paiement: str = None
+    # Renseignée par le collecteur à la standardisation
+    date_import: str = None
+    # Site web et application mobile
+    adresse_livraison: AdresseLivraison = None
+    # Application mobile
+    appareil: Appareil = None
+    boutique_collect: str = None
+    option_livraison: str = None
+    frais_livraison: float = None
+    notification_push: bool = None
+    promo_code: str = None
+    # Boutique physique
+    boutique: str = None
+    vendeur_id: str = None
+
+    @classmethod
+    def depuis_dict(cls, data, canal=None, date_import=None):
+        """Construire la commande standardisée (mêmes valeurs par défaut que le collecteur)"""
+        get = data.get
+        canal = canal or get("canal")
+        client = get("client")
+        commande = cls(
+            get("id_commande", ""),
+            canal,
+            data["date_commande"] if "date_commande" in data else datetime.now().isoformat(),
+            Client.depuis_dict(client) if client.__class__ is dict else Client(),
+            [Produit.depuis_dict(produit) for produit in get("produits", ())],
+            get("montant_total", 0.0),
+            get("statut", "inconnu"),
+            get("mode_paiement", "inconnu"),
+            date_import,
+        )
+
+        if canal == "site_web":
+            commande.adresse_livraison = optionnel(AdresseLivraison, get("adresse_livraison"))
+
+        elif canal == "application_mobile":
+            commande.appareil = optionnel(Appareil, get("appareil"))
+            commande.adresse_livraison = optionnel(AdresseLivraison, get("adresse_livraison"))
+            commande.boutique_collect = get("boutique_collect")
+            commande.option_livraison = get("option_livraison", "standard")
+            commande.frais_livraison = get("frais_livraison", 0.0)
+            commande.notification_push = get("notification_push", False)
+            commande.promo_code = get("promo_code")
+
+        elif canal == "boutique_physique":
+            commande.boutique = get("boutique", "inconnue")
+            commande.vendeur_id = get("vendeur_id", "inconnu")
+
+        return commande
+
+    def vers_dict(self):
+        """Document de la commande : champs communs puis champs du canal"""
+        data = {
+            "id_commande": self.id_commande,
+            "canal": self.canal,
+            "date_commande": self.date_commande,
+            "client": self.client.vers_dict(),
+            "produits": [produit.vers_dict() for produit in self.produits],
+            "montant_total": self.montant_total,
+            "statut": self.statut,
+        }
+        if self.date_import is not None:
+            data["date_import"] = self.date_import
+
+        if self.canal == "site_web":
+            data["adresse_livraison"] = self.adresse_livraison.vers_dict() if self.adresse_livraison else {}
+            data["mode_paiement"] = self.mode_paiement
+
+        elif self.canal == "application_mobile":
+            data["appareil"] = self.appareil.vers_dict() if self.appareil else {}
+            data["adresse_livraison"] = self.adresse_livraison.vers_dict() if self.adresse_livraison else None
+            data["boutique_collect"] = self.boutique_collect
+            data["mode_paiement"] = self.mode_paiement
+            data["option_livraison"] = self.option_livraison
+            data["frais_livraison"] = self.frais_livraison
+            data["notification_push"] = self.notification_push
+            data["promo_code"] = self.promo_code
+
+        elif self.canal == "boutique_physique":
+            data["boutique"] = self.boutique
+            data["mode_paiement"] = self.mode_paiement
+            data["vendeur_id"] = self.vendeur_id
+
+        return data
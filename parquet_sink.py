@@ -0,0 +1,157 @@
+import os
+import time
+import uuid
+import threading
+from collections import defaultdict
+from datetime import datetime
+
+# pyarrow est optionnel : sans lui, la zone Parquet est simplement désactivée
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+PARQUET_DIR = "./data/parquet"
+
+# Écriture des commandes en attente au-delà de ce volume ou de cet âge (mode watch)
+FLUSH_MAX_COMMANDES = 5000
+FLUSH_MAX_SECONDES = 60
+
+# Compaction d'une partition dès qu'elle contient plus de fichiers que ce seuil
+COMPACTION_SEUIL = 24
+# Vérification des partitions tous les N flush
+COMPACTION_INTERVALLE = 10
+
+
+class ParquetSink:
+    """Zone d'atterrissage Parquet partitionnée par canal et par date
+
+    Les commandes standardisées sont accumulées pendant un cycle puis écrites
+    dans data/parquet/canal=<canal>/date=<YYYY-MM-DD>/part-*.parquet. Les
+    petits fichiers d'une même partition sont périodiquement fusionnés.
+    """
+
+    def __init__(self, base_dir=PARQUET_DIR, compression="zstd"):
+        if pa is None:
+            raise RuntimeError("pyarrow n'est pas installé (pip install pyarrow)")
+        self.base_dir = base_dir
+        self.compression = compression
+        self.tampon = defaultdict(list)
+        self.nb_en_attente = 0
+        self.premier_ajout = None
+        self.nb_flush = 0
+        # Alimenté par le thread d'écriture, vidé par la boucle principale
+        self._lock = threading.Lock()
+
+    def ajouter(self, commandes):
+        """Mettre en attente des commandes insérées avec succès"""
+        with self._lock:
+            for commande in commandes:
+                # _id (ObjectId ajouté par pymongo) n'a pas d'équivalent Arrow ;
+                # le canal est porté par le chemin de la partition
+                ligne = {k: v for k, v in commande.items() if k not in ("_id", "canal")}
+                partition = (commande["canal"], str(commande.get("date_commande", ""))[:10])
+                self.tampon[partition].append(ligne)
+            self.nb_en_attente += len(commandes)
+            if self.premier_ajout is None and commandes:
+                self.premier_ajout = time.monotonic()
+
+    def flush_si_necessaire(self):
+        """Écrire si le tampon est trop gros ou trop ancien"""
+        if self.premier_ajout is None:
+            return 0
+        if self.nb_en_attente >= FLUSH_MAX_COMMANDES or time.monotonic() - self.premier_ajout >= FLUSH_MAX_SECONDES:
+            return self.flush()
+        return 0
+
+    def flush(self):
+        """Écrire un fichier Parquet par partition touchée depuis le dernier flush"""
+        with self._lock:
+            tampon, self.tampon = self.tampon, defaultdict(list)
+            self.nb_en_attente = 0
+            self.premier_ajout = None
+
+        ecrites = 0
+        restantes = dict(tampon)
+        try:
+            for (canal, date), lignes in tampon.items():
+                dossier = self.partition_dir(canal, date)
+                os.makedirs(dossier, exist_ok=True)
+                nom = f"part-{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+                self.ecrire(pa.Table.from_pylist(lignes), dossier, nom)
+                ecrites += len(lignes)
+                del restantes[(canal, date)]
+        except Exception:
+            # Disque plein, droits... : les partitions non écrites retournent dans
+            # le tampon (avant les commandes ajoutées entre-temps) pour le prochain flush
+            self.remettre(restantes)
+            raise
+
+        if tampon:
+            self.nb_flush += 1
+            if self.nb_flush % COMPACTION_INTERVALLE == 0:
+                self.compacter()
+        return ecrites
+
+    def remettre(self, partitions):
+        """Remettre en attente des partitions dont l'écriture a échoué"""
+        with self._lock:
+            for partition, lignes in partitions.items():
+                self.tampon[partition] = lignes + self.tampon[partition]
+                self.nb_en_attente += len(lignes)
+            if self.premier_ajout is None and partitions:
+                self.premier_ajout = time.monotonic()
+
+    def partition_dir(self, canal, date):
+        return os.path.join(self.base_dir, f"canal={canal}", f"date={date}")
+
+    def ecrire(self, table, dossier, nom):
+        """Écriture atomique : fichier caché puis renommage"""
+        # Les lecteurs Arrow ignorent les fichiers commençant par "."
+        tmp = os.path.join(dossier, f".{nom}.tmp")
+        try:
+            pq.write_table(table, tmp, compression=self.compression)
+            os.replace(tmp, os.path.join(dossier, nom))
+        except Exception:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    def compacter(self, seuil=COMPACTION_SEUIL):
+        """Fusionner les partitions qui contiennent trop de petits fichiers"""
+        fusionnees = 0
+        if not os.path.isdir(self.base_dir):
+            return fusionnees
+
+        for canal_dir in os.scandir(self.base_dir):
+            if not canal_dir.is_dir():
+                continue
+            for date_dir in os.scandir(canal_dir.path):
+                if not date_dir.is_dir():
+                    continue
+                fichiers = sorted(entry.path for entry in os.scandir(date_dir.path)
+                                  if entry.name.endswith(".parquet") and not entry.name.startswith("."))
+                if len(fichiers) <= seuil:
+                    continue
+
+                # Les schémas peuvent différer (champ toujours nul dans un lot) : promotion
+                table = pa.concat_tables([pq.read_table(path) for path in fichiers], promote_options="permissive")
+                nom = f"compact-{datetime.now().strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+                self.ecrire(table, date_dir.path, nom)
+                for path in fichiers:
+                    os.remove(path)
+                fusionnees += 1
+        return fusionnees
+
+
+def read_dataset(base_dir=PARQUET_DIR, columns=None, filter=None):
+    """Lire la zone Parquet (partitions canal/date reconstituées en colonnes)"""
+    import pyarrow.dataset as ds
+    dataset = ds.dataset(base_dir, format="parquet", partitioning="hive")
+    # Un champ nul dans tout un lot est typé "null" : unifier les schémas des fichiers
+    schema = pa.unify_schemas([fragment.physical_schema for fragment in dataset.get_fragments()] +
+                              [dataset.partitioning.schema], promote_options="permissive")
+    dataset = ds.dataset(base_dir, format="parquet", partitioning="hive", schema=schema)
+    return dataset.to_table(columns=columns, filter=filter).to_pandas()
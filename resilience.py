@@ -0,0 +1,150 @@
+import time
+import random
+import threading
+
+from pymongo.errors import BulkWriteError, ConnectionFailure, PyMongoError, WTimeoutError
+
+# Reprises d'une écriture sur erreur transitoire : délai initial, plafond, nombre de tentatives
+REPRISE_DELAI_INITIAL = 0.2
+REPRISE_DELAI_MAX = 5.0
+REPRISE_TENTATIVES = 5
+
+# Disjoncteur : ouverture après N échecs consécutifs, pendant un délai qui double
+# à chaque nouvel échec (jusqu'au plafond)
+DISJONCTEUR_SEUIL = 3
+DISJONCTEUR_DELAI = 5.0
+DISJONCTEUR_DELAI_MAX = 120.0
+
+
+class DisjoncteurOuvert(Exception):
+    """Écriture refusée sans appel réseau : la base est considérée indisponible"""
+
+
+def est_transitoire(erreur):
+    """Erreur de connexion, d'élection ou de délai : l'écriture peut être retentée"""
+    if isinstance(erreur, BulkWriteError):
+        # Erreurs par document (doublons...) : définitives. Seule une attente
+        # de write concern dépassée sans erreur de document est transitoire
+        return not erreur.details.get("writeErrors") and bool(erreur.details.get("writeConcernErrors"))
+    if isinstance(erreur, (ConnectionFailure, WTimeoutError)):
+        return True
+    return isinstance(erreur, PyMongoError) and erreur.has_error_label("RetryableWriteError")
+
+
+class Disjoncteur:
+    """Disjoncteur des écritures MongoDB (fermé, ouvert, semi-ouvert)
+
+    Fermé : les écritures passent. Après DISJONCTEUR_SEUIL échecs consécutifs
+    il s'ouvre : les écritures sont refusées localement et le collecteur
+    suspend ses scans. Une fois le délai écoulé, une seule écriture d'essai
+    est autorisée (semi-ouvert) : son succès referme le disjoncteur, son
+    échec le rouvre pour un délai doublé.
+    """
+
+    def __init__(self, seuil=DISJONCTEUR_SEUIL, delai=DISJONCTEUR_DELAI, delai_max=DISJONCTEUR_DELAI_MAX):
+        self.seuil = seuil
+        self.delai_initial = delai
+        self.delai_max = delai_max
+        self.delai = delai
+        self.echecs = 0
+        self.ouverture = None
+        self.essai_en_cours = False
+        # Thread qui mène l'écriture d'essai (seul habilité à l'abandonner)
+        self.essai_par = None
+        self._lock = threading.Lock()
+
+    @property
+    def ouvert(self):
+        return self.ouverture is not None
+
+    def attente_restante(self):
+        """Secondes avant la prochaine écriture d'essai (0 si fermé ou essai possible)"""
+        with self._lock:
+            if self.ouverture is None:
+                return 0.0
+            return max(0.0, self.ouverture + self.delai - time.monotonic())
+
+    def autoriser(self):
+        with self._lock:
+            if self.ouverture is None:
+                return True
+            if self.essai_en_cours or time.monotonic() - self.ouverture < self.delai:
+                return False
+            self.essai_en_cours = True
+            self.essai_par = threading.get_ident()
+            return True
+
+    def abandonner_essai(self):
+        """Fin de l'écriture d'essai de ce thread sans verdict : un nouvel essai reste possible
+
+        Sans cela, une sortie imprévue pendant l'essai laisserait essai_en_cours
+        à True et le disjoncteur ouvert pour toujours.
+        """
+        with self._lock:
+            if self.essai_en_cours and self.essai_par == threading.get_ident():
+                self.essai_en_cours = False
+                self.essai_par = None
+
+    def succes(self):
+        with self._lock:
+            self.echecs = 0
+            self.ouverture = None
+            self.essai_en_cours = False
+            self.essai_par = None
+            self.delai = self.delai_initial
+
+    def echec(self):
+        """Enregistrer un échec transitoire ; retourne True si le disjoncteur vient de s'ouvrir"""
+        with self._lock:
+            self.echecs += 1
+            if self.essai_en_cours:
+                # L'essai a échoué : rouvrir pour plus longtemps
+                self.essai_en_cours = False
+                self.essai_par = None
+                self.delai = min(self.delai * 2, self.delai_max)
+                self.ouverture = time.monotonic()
+                return False
+            if self.ouverture is None and self.echecs >= self.seuil:
+                self.ouverture = time.monotonic()
+                return True
+            return False
+
+
+def avec_reprises(ecriture, disjoncteur=None, tentatives=REPRISE_TENTATIVES,
+                  delai_initial=REPRISE_DELAI_INITIAL, delai_max=REPRISE_DELAI_MAX, sur_reprise=None):
+    """Exécuter ecriture() en retentant les erreurs transitoires (backoff exponentiel avec gigue)
+
+    sur_reprise(erreur) est appelée avant chaque nouvelle tentative : après
+    une reprise, un doublon peut venir d'une tentative précédente qui avait
+    abouti sans acquittement. Les erreurs définitives sont propagées
+    immédiatement ; une erreur transitoire l'est après la dernière tentative.
+    """
+    for tentative in range(tentatives):
+        if disjoncteur is not None and not disjoncteur.autoriser():
+            raise DisjoncteurOuvert("MongoDB indisponible (disjoncteur ouvert)")
+        try:
+            resultat = ecriture()
+        except Exception as e:
+            if not est_transitoire(e):
+                if disjoncteur is not None:
+                    # Erreur définitive (doublon, document invalide, dépassement...) :
+                    # la base a répondu ou n'a pas été en cause, elle est disponible
+                    disjoncteur.succes()
+                raise
+            if disjoncteur is not None:
+                disjoncteur.echec()
+            if tentative == tentatives - 1:
+                raise
+            if sur_reprise is not None:
+                sur_reprise(e)
+            # Gigue complète : évite que toutes les écritures reviennent en même temps
+            time.sleep(random.uniform(0, min(delai_max, delai_initial * 2 ** tentative)))
+            continue
+        else:
+            if disjoncteur is not None:
+                disjoncteur.succes()
+        finally:
+            if disjoncteur is not None:
+                # Toute autre sortie (KeyboardInterrupt...) libère l'essai en cours
+                disjoncteur.abandonner_essai()
+        return resultat
@@ -0,0 +1,205 @@
+import pandas as pd
+
+import mongo_source
+from analyses import pivot_annulation, top_produits_cross
+from rollups import HEURE_JOUR, ROLLUPS_CANAL, ROLLUPS_PRODUITS, ROLLUPS_VILLES
+
+
+# Colonnes des pré-agrégats lues par les analyses
+COLONNES = {
+    ROLLUPS_CANAL: ['periode', 'canal', 'nb_commandes', 'ca_brut', 'nb_annulees', 'nb_valides', 'ca_valide',
+                    'nb_lignes_valides', 'montant_min', 'montant_max', 'panier_min', 'panier_max'],
+    ROLLUPS_PRODUITS: ['periode', 'canal', 'produit', 'quantite', 'ca'],
+    ROLLUPS_VILLES: ['periode', 'canal', 'ville', 'ca', 'nb_commandes'],
+}
+
+
+def requete_rollups(granularite, filtre=None):
+    """Pré-agrégats d'une granularité, bornés aux périodes et canaux du filtre (index granularité, période)"""
+    requete = {"granularite": granularite}
+    if filtre is None:
+        return requete
+    # Les périodes sont des préfixes de la date ISO : mêmes bornes que date_commande
+    debut, fin = filtre.bornes
+    if debut is not None or fin is not None:
+        requete["periode"] = {}
+        if debut is not None:
+            requete["periode"]["$gte"] = debut
+        if fin is not None:
+            requete["periode"]["$lt"] = fin
+    if filtre.canaux:
+        requete["canal"] = {"$in": list(filtre.canaux)}
+    return requete
+
+
+def lire_rollups(db, nom_collection, granularite, filtre=None):
+    """Lire les pré-agrégats d'une granularité (quelques centaines de lignes au plus)
+
+    Les colonnes lues par les analyses sont toujours présentes : un champ
+    jamais incrémenté (aucune commande non annulée retenue par le filtre...)
+    donne une colonne vide plutôt qu'une KeyError.
+    """
+    df = pd.json_normalize(list(db[nom_collection].find(requete_rollups(granularite, filtre), {"_id": 0})))
+    manquantes = [colonne for colonne in COLONNES[nom_collection] if colonne not in df.columns]
+    return df.assign(**{colonne: float('nan') for colonne in manquantes}) if manquantes else df
+
+
+def somme_prefixe(df, prefixe, par):
+    """Sommer les colonnes issues d'un sous-document ($inc "prefixe.<clé>")"""
+    colonnes = [c for c in df.columns if c.startswith(prefixe + '.')]
+    totaux = df.groupby(par)[colonnes].sum()
+    totaux.columns = [c[len(prefixe) + 1:] for c in colonnes]
+    return totaux
+
+
+# ===================== MÉTRIQUES GLOBALES =====================
+def metriques_globales(rollups):
+    canal = rollups['canal_mois']
+    total_commandes = int(canal['nb_commandes'].sum())
+    commandes_annulees = int(canal['nb_annulees'].sum()) if 'nb_annulees' in canal.columns else 0
+    ca_total = canal['ca_brut'].sum()
+    return {
+        'total_commandes': total_commandes,
+        'ca_total': ca_total,
+        'ca_moyen': ca_total / total_commandes if total_commandes > 0 else 0,
+        'commandes_annulees': commandes_annulees,
+        'taux_annulation': (commandes_annulees / total_commandes * 100) if total_commandes > 0 else 0
+    }
+
+
+def valides(df):
+    """Lignes de rollup ayant au moins une commande non annulée"""
+    return df[df['nb_valides'].fillna(0) > 0]
+
+
+# ===================== ANALYSE 1: CA PAR MOIS ET CANAL =====================
+def ca_par_mois_canal(rollups):
+    ca = valides(rollups['canal_mois'])
+    # Rollups journaliers quand la période est filtrée : regroupés par mois
+    ca = ca.groupby([ca['periode'].str[:7], 'canal'])['ca_valide'].sum().reset_index()
+    ca.columns = ['mois', 'canal', 'montant_total']
+    return ca.sort_values(['mois', 'canal']).reset_index(drop=True)
+
+
+# ===================== ANALYSE 2: TOP 10 PRODUITS =====================
+def top_produits(rollups):
+    produits = rollups['produits_mois'].groupby('produit')[['quantite', 'ca']].sum().reset_index()
+    produits.columns = ['nom', 'quantite', 'prix_total']
+    return produits.nlargest(10, 'quantite')
+
+
+# ===================== ANALYSE 3: TAUX D'ANNULATION =====================
+def taux_annulation(rollups):
+    statuts = somme_prefixe(rollups['canal_mois'], 'statuts', 'canal')
+    annulation_data = statuts.reset_index().melt(id_vars='canal', var_name='statut', value_name='count')
+    return pivot_annulation(annulation_data[annulation_data['count'] > 0])
+
+
+# ===================== ANALYSE 4: CA MOYEN PAR COMMANDE =====================
+def ca_moyen_par_canal(rollups):
+    ca_moyen_canal = valides(rollups['canal_mois']).groupby('canal').agg({
+        'ca_valide': 'sum',
+        'montant_min': 'min',
+        'montant_max': 'max',
+        'nb_valides': 'sum'
+    }).reset_index()
+    ca_moyen_canal['ca_valide'] = ca_moyen_canal['ca_valide'] / ca_moyen_canal['nb_valides']
+    ca_moyen_canal.columns = ['Canal', 'CA Moyen', 'CA Min', 'CA Max', 'Nb Commandes']
+    return ca_moyen_canal
+
+
+# ===================== ANALYSE 5: SAISONNALITÉ =====================
+def saisonnalite(rollups):
+    heures = valides(rollups['canal_heure']).copy()
+    # Période "HH" (heure_jour) ou "YYYY-MM-DDTHH" (heure) : l'heure est en fin de chaîne
+    heures['Heure'] = heures['periode'].str[-2:].astype(int)
+    saison_data = heures.groupby(['Heure', 'canal']).agg({
+        'nb_valides': 'sum',
+        'ca_valide': 'sum'
+    }).reset_index()
+    saison_data.columns = ['Heure', 'Canal', 'Nb Commandes', 'CA Total']
+    return saison_data
+
+
+# ===================== ANALYSE 6: PANIER MOYEN =====================
+def panier_moyen(rollups):
+    canal = valides(rollups['canal_mois'])
+    panier_stats = canal.groupby('canal').agg({
+        'nb_lignes_valides': 'sum',
+        'panier_min': 'min',
+        'panier_max': 'max',
+        'ca_valide': 'sum',
+        'montant_min': 'min',
+        'montant_max': 'max',
+        'nb_valides': 'sum'
+    }).reset_index()
+    panier_stats['nb_lignes_valides'] = panier_stats['nb_lignes_valides'] / panier_stats['nb_valides']
+    panier_stats['ca_valide'] = panier_stats['ca_valide'] / panier_stats['nb_valides']
+    panier_stats = panier_stats[['canal', 'nb_lignes_valides', 'panier_min', 'panier_max',
+                                 'ca_valide', 'montant_min', 'montant_max']]
+    panier_stats.columns = ['Canal', 'Panier Moyen', 'Panier Min', 'Panier Max', 'Montant Moyen', 'Montant Min',
+                            'Montant Max']
+
+    paniers = somme_prefixe(canal, 'paniers', 'canal').reset_index()
+    dist_panier = paniers.melt(id_vars='canal', var_name='nb_produits', value_name='count')
+    dist_panier['nb_produits'] = dist_panier['nb_produits'].astype(int)
+    dist_panier = dist_panier[dist_panier['count'] > 0].sort_values(['canal', 'nb_produits']).reset_index(drop=True)
+    return {'stats': panier_stats, 'distribution': dist_panier}
+
+
+# ===================== ANALYSE 8: GÉOGRAPHIQUE =====================
+def geographique(rollups):
+    villes = rollups['villes_mois']
+    if villes.empty:
+        return pd.DataFrame(columns=['Ville', 'CA Total', 'Nb Commandes'])
+
+    ville_stats = villes.groupby('ville')[['ca', 'nb_commandes']].sum().reset_index().nlargest(15, 'ca')
+    ville_stats.columns = ['Ville', 'CA Total', 'Nb Commandes']
+    return ville_stats
+
+
+# ===================== ANALYSE 9: CROSS-CANAL =====================
+def cross_canal(rollups):
+    cross_stats = rollups['produits_mois'].groupby(['produit', 'canal'])[['quantite', 'ca']].sum().reset_index()
+    return top_produits_cross(cross_stats)
+
+
+def compute_all(collection, filtre=None):
+    """Calculer les sections à partir des rollups maintenus par le collecteur
+
+    La fidélisation dépend des clients individuels et ne peut pas être
+    pré-agrégée : elle reste calculée par pipeline sur les commandes. Les
+    rollups n'ont ni boutique ni statut par commande : un filtre sur ces
+    champs est calculé par pipelines sur les commandes (mongo_source).
+    """
+    if filtre is not None and (filtre.boutiques or filtre.statuts):
+        return mongo_source.compute_all(collection, filtre)
+
+    db = collection.database
+    periode_filtree = filtre is not None and (filtre.debut or filtre.fin)
+    # Une période filtrée est bornée au jour : rollups journaliers au lieu des mensuels.
+    # Sans période, la saisonnalité lit les rollups par heure de la journée ; avec
+    # une période, les rollups horaires bornés à celle-ci
+    mois = 'jour' if periode_filtree else 'mois'
+    rollups = {
+        'canal_mois': lire_rollups(db, ROLLUPS_CANAL, mois, filtre),
+        'canal_heure': lire_rollups(db, ROLLUPS_CANAL, 'heure' if periode_filtree else HEURE_JOUR, filtre),
+        'produits_mois': lire_rollups(db, ROLLUPS_PRODUITS, mois, filtre),
+        'villes_mois': lire_rollups(db, ROLLUPS_VILLES, mois, filtre),
+    }
+    if rollups['canal_mois'].empty:
+        # Aucun rollup : le dashboard affiche l'écran "aucune donnée"
+        return {'metriques': {'total_commandes': 0}}
+
+    return {
+        'metriques': metriques_globales(rollups),
+        'ca_mois_canal': ca_par_mois_canal(rollups),
+        'top_produits': top_produits(rollups),
+        'annulation': taux_annulation(rollups),
+        'ca_moyen': ca_moyen_par_canal(rollups),
+        'saisonnalite': saisonnalite(rollups),
+        'panier': panier_moyen(rollups),
+        'fidelisation': mongo_source.fidelisation(collection, filtre),
+        'geographique': geographique(rollups),
+        'cross_canal': cross_canal(rollups),
+    }
@@ -0,0 +1,157 @@
+from collections import defaultdict
+
+from pymongo import UpdateOne
+
+# Collections de pré-agrégats maintenues par le collecteur
+ROLLUPS_CANAL = "rollups_canal"
+ROLLUPS_PRODUITS = "rollups_produits"
+ROLLUPS_VILLES = "rollups_villes"
+
+# Séquence incrémentée par le collecteur après chaque lot écrit (commandes et
+# rollups à jour) : version des données pour le cache des dashboards
+VERSIONS = "versions"
+
+# Granularités : longueur du préfixe de la date ISO "YYYY-MM-DDTHH:MM:SS"
+GRANULARITES = {
+    "heure": 13,
+    "jour": 10,
+    "mois": 7
+}
+
+# Heure de la journée "HH", toutes dates confondues (rollups_canal seulement) :
+# la saisonnalité lit 24 lignes par canal au lieu de tout l'historique horaire
+HEURE_JOUR = "heure_jour"
+
+
+def cle_champ(valeur):
+    """Rendre une valeur utilisable comme nom de champ MongoDB"""
+    return str(valeur).replace(".", "_").replace("$", "_")
+
+
+def periodes(date_commande):
+    """Périodes (granularité, période) couvertes par une date ISO"""
+    return [(granularite, date_commande[:longueur]) for granularite, longueur in GRANULARITES.items()] \
+        + [(HEURE_JOUR, date_commande[11:13])]
+
+
+def build_updates(commandes):
+    """Agréger un lot de commandes en opérations $inc/$min/$max par collection
+
+    Les incréments sont cumulés en mémoire avant l'écriture : un lot de
+    1000 commandes produit une seule opération par (période, canal, clé).
+    """
+    canal_inc = defaultdict(lambda: defaultdict(int))
+    canal_min = defaultdict(dict)
+    canal_max = defaultdict(dict)
+    produits_inc = defaultdict(lambda: defaultdict(int))
+    villes_inc = defaultdict(lambda: defaultdict(int))
+
+    for commande in commandes:
+        canal = commande["canal"]
+        statut = commande.get("statut", "inconnu")
+        montant = commande.get("montant_total", 0.0) or 0.0
+        produits = commande.get("produits") or []
+        adresse = commande.get("adresse_livraison")
+        ville = adresse.get("ville") if isinstance(adresse, dict) else None
+        valide = statut != "annulée"
+
+        for granularite, periode in periodes(str(commande.get("date_commande", ""))):
+            cle = (granularite, periode, canal)
+            inc = canal_inc[cle]
+            inc["nb_commandes"] += 1
+            inc["ca_brut"] += montant
+            inc[f"statuts.{cle_champ(statut)}"] += 1
+
+            if not valide:
+                inc["nb_annulees"] += 1
+                continue
+
+            # Agrégats du chiffre d'affaires (commandes non annulées)
+            inc["nb_valides"] += 1
+            inc["ca_valide"] += montant
+            inc["nb_lignes_valides"] += len(produits)
+            inc[f"paniers.{len(produits)}"] += 1
+            for champ, valeur in (("montant_min", montant), ("panier_min", len(produits))):
+                canal_min[cle][champ] = min(canal_min[cle].get(champ, valeur), valeur)
+            for champ, valeur in (("montant_max", montant), ("panier_max", len(produits))):
+                canal_max[cle][champ] = max(canal_max[cle].get(champ, valeur), valeur)
+
+            if granularite == HEURE_JOUR:
+                continue
+
+            for produit in produits:
+                inc_produit = produits_inc[cle + (produit.get("nom_produit", "N/A"),)]
+                inc_produit["quantite"] += produit.get("quantite", 0)
+                inc_produit["ca"] += produit.get("prix_total", 0)
+
+            if ville and canal in ("site_web", "application_mobile"):
+                inc_ville = villes_inc[cle + (ville,)]
+                inc_ville["ca"] += montant
+                inc_ville["nb_commandes"] += 1
+
+    updates = {ROLLUPS_CANAL: [], ROLLUPS_PRODUITS: [], ROLLUPS_VILLES: []}
+
+    for (granularite, periode, canal), inc in canal_inc.items():
+        cle = (granularite, periode, canal)
+        update = {
+            "$setOnInsert": {"granularite": granularite, "periode": periode, "canal": canal},
+            "$inc": dict(inc)
+        }
+        if canal_min[cle]:
+            update["$min"] = canal_min[cle]
+            update["$max"] = canal_max[cle]
+        updates[ROLLUPS_CANAL].append(UpdateOne({"_id": "|".join(cle)}, update, upsert=True))
+
+    for nom_collection, incs, champ in ((ROLLUPS_PRODUITS, produits_inc, "produit"),
+                                        (ROLLUPS_VILLES, villes_inc, "ville")):
+        for (granularite, periode, canal, valeur), inc in incs.items():
+            updates[nom_collection].append(UpdateOne(
+                {"_id": "|".join((granularite, periode, canal, valeur))},
+                {
+                    "$setOnInsert": {"granularite": granularite, "periode": periode, "canal": canal, champ: valeur},
+                    "$inc": dict(inc)
+                },
+                upsert=True
+            ))
+
+    return updates
+
+
+def update_rollups(db, commandes):
+    """Appliquer les incréments d'un lot de commandes fraîchement insérées"""
+    for nom_collection, operations in build_updates(commandes).items():
+        if operations:
+            db[nom_collection].bulk_write(operations, ordered=False)
+
+
+def incrementer_version(db, nom_collection):
+    """Signaler aux dashboards que les données d'une collection ont changé"""
+    db[VERSIONS].update_one({"_id": nom_collection}, {"$inc": {"sequence": 1}}, upsert=True)
+
+
+def ensure_indexes(db):
+    """Index de lecture des dashboards (granularité puis période)"""
+    for nom_collection in (ROLLUPS_CANAL, ROLLUPS_PRODUITS, ROLLUPS_VILLES):
+        db[nom_collection].create_index([("granularite", 1), ("periode", 1)])
+
+
+def rebuild_rollups(collection, taille_lot=1000):
+    """Recalculer tous les pré-agrégats à partir de la collection des commandes"""
+    db = collection.database
+    for nom_collection in (ROLLUPS_CANAL, ROLLUPS_PRODUITS, ROLLUPS_VILLES):
+        db[nom_collection].drop()
+    ensure_indexes(db)
+
+    lot = []
+    total = 0
+    for commande in collection.find({}, {"_id": 0}):
+        lot.append(commande)
+        if len(lot) >= taille_lot:
+            update_rollups(db, lot)
+            total += len(lot)
+            lot = []
+    if lot:
+        update_rollups(db, lot)
+        total += len(lot)
+    incrementer_version(db, collection.name)
+    return total
@@ -0,0 +1,92 @@
+import os
+import time
+import uuid
+from datetime import datetime
+
+from json_codec import dumps_compact
+
+# Rotation d'un segment dès qu'il dépasse cette taille ou cet âge
+SEGMENT_MAX_OCTETS = 4 * 1024 * 1024
+SEGMENT_MAX_SECONDES = 30
+
+
+def horodatage(date_iso):
+    """'YYYY-MM-DDTHH:MM:SS...' -> 'YYYYmmddHHMMSS' (None si la date n'est pas au format ISO)"""
+    chiffres = date_iso[:19].replace("-", "").replace("T", "").replace(":", "")
+    return chiffres if len(chiffres) == 14 and chiffres.isdigit() else None
+
+
+class SegmentWriter:
+    """Écrire les commandes en JSON compact dans des segments .jsonl tournants
+
+    Le segment courant est un fichier caché (ignoré par le collecteur). À la
+    rotation il est renommé en commande_<PREFIXE>-<première>-<dernière>-<n>.jsonl,
+    horodatages des dates extrêmes de ses commandes : les dashboards filtrés
+    sur une période écartent un segment sans l'ouvrir. Le renommage est
+    atomique, le collecteur ne voit que des segments complets.
+    """
+
+    def __init__(self, output_dir, prefixe, max_octets=SEGMENT_MAX_OCTETS, max_secondes=SEGMENT_MAX_SECONDES):
+        self.output_dir = output_dir
+        self.prefixe = prefixe
+        self.max_octets = max_octets
+        self.max_secondes = max_secondes
+        self.fichier = None
+        self.tmp_path = None
+        self.ouverture = None
+        self.nb_lignes = 0
+        self.nb_segments = 0
+        # Dates ISO extrêmes des commandes du segment courant (ordre lexical = ordre chronologique)
+        self.premiere = None
+        self.derniere = None
+
+    def ecrire(self, commande):
+        """Ajouter une commande au segment courant (une ligne JSON)"""
+        if self.fichier is None:
+            self.ouvrir()
+
+        self.fichier.write(dumps_compact(commande) + "\n")
+        self.nb_lignes += 1
+        date_commande = str(commande.get("date_commande", ""))
+        if self.premiere is None or date_commande < self.premiere:
+            self.premiere = date_commande
+        if self.derniere is None or date_commande > self.derniere:
+            self.derniere = date_commande
+
+        if self.fichier.tell() >= self.max_octets or time.monotonic() - self.ouverture >= self.max_secondes:
+            self.publier()
+
+    def ouvrir(self):
+        self.tmp_path = os.path.join(self.output_dir, f".segment-{uuid.uuid4().hex}.jsonl.tmp")
+        self.fichier = open(self.tmp_path, 'w', encoding='utf-8')
+        self.ouverture = time.monotonic()
+        self.nb_lignes = 0
+        self.premiere = None
+        self.derniere = None
+
+    def publier(self):
+        """Fermer le segment courant et le rendre visible au collecteur"""
+        if self.fichier is None:
+            return None
+
+        self.fichier.close()
+        self.fichier = None
+        if self.nb_lignes == 0:
+            os.remove(self.tmp_path)
+            return None
+
+        self.nb_segments += 1
+        # pid + compteur : plusieurs processus peuvent publier dans la même seconde
+        numero = f"{os.getpid()}{self.nb_segments:04d}"
+        premiere, derniere = horodatage(self.premiere), horodatage(self.derniere)
+        if premiere and derniere:
+            nom = f"commande_{self.prefixe}-{premiere}-{derniere}-{numero}.jsonl"
+        else:
+            # Date absente ou non ISO : horodatage de la rotation, segment jamais écarté
+            nom = f"commande_{self.prefixe}-{datetime.now().strftime('%Y%m%d%H%M%S')}-{numero}.jsonl"
+        chemin = os.path.join(self.output_dir, nom)
+        os.replace(self.tmp_path, chemin)
+        return chemin
+
+    def close(self):
+        return self.publier()
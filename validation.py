@@ -0,0 +1,167 @@
+NOMBRE = (int, float)
+
+# Écart toléré entre montants calculés et montants arrondis au centime
+TOLERANCE = 0.01
+
+# Champs obligatoires pour tous les canaux : nom -> types acceptés
+# (produits est contrôlé à part : liste non vide de produits)
+CHAMPS_COMMUNS = {
+    "id_commande": (str,),
+    "client": (dict,),
+    "produits": None,
+    "montant_total": NOMBRE,
+    "statut": (str,),
+}
+
+# Champs obligatoires d'une ligne produit
+CHAMPS_PRODUIT = {
+    "nom_produit": (str,),
+    "quantite": (int,),
+    "prix_unitaire": NOMBRE,
+    "prix_total": NOMBRE,
+}
+
+# Champs obligatoires par canal (libellé utilisé dans les messages)
+SCHEMAS = {
+    "site_web": ("site web", {
+        "mode_paiement": (str,),
+        "adresse_livraison": (dict,),
+    }),
+    "application_mobile": ("application mobile", {
+        "mode_paiement": (str,),
+        "option_livraison": (str,),
+    }),
+    "boutique_physique": ("boutique physique", {
+        "boutique": (str,),
+        "mode_paiement": (str,),
+    }),
+}
+
+# Précalculé par canal : (libellé, champs du canal, ensemble des champs requis,
+# tuple des (champ, types) à contrôler). L'ensemble sert au contrôle rapide
+# data.keys() >= requis
+VALIDATEURS = {
+    canal: (libelle, champs, frozenset(CHAMPS_COMMUNS) | frozenset(champs),
+            tuple((champ, types) for champ, types in {**CHAMPS_COMMUNS, **champs}.items() if types))
+    for canal, (libelle, champs) in SCHEMAS.items()
+}
+REQUIS_PRODUIT = frozenset(CHAMPS_PRODUIT)
+
+
+def nom_types(types):
+    return " ou ".join(t.__name__ for t in types)
+
+
+def regles_respectees(data, produits, champs_types):
+    """Types et règles numériques d'une commande dont la structure est valide (sans message)"""
+    for champ, types in champs_types:
+        if data[champ].__class__ not in types:
+            return False
+    somme = 0
+    for produit in produits:
+        quantite, prix_unitaire, prix_total = produit["quantite"], produit["prix_unitaire"], produit["prix_total"]
+        if produit["nom_produit"].__class__ is not str or quantite.__class__ is not int \
+                or prix_unitaire.__class__ not in NOMBRE or prix_total.__class__ not in NOMBRE:
+            return False
+        if quantite <= 0 or prix_unitaire < 0 or abs(prix_total - quantite * prix_unitaire) > TOLERANCE:
+            return False
+        somme += prix_total
+    return abs(data["montant_total"] - somme) <= TOLERANCE * len(produits)
+
+
+def diagnostiquer(data, libelle, champs_canal, complet=False):
+    """Lister toutes les erreurs d'une commande
+
+    Sans complet, seule la structure est contrôlée (champs présents, liste de
+    produits non vide), comme l'ancien validate_json. Avec complet, les types
+    et les règles numériques (quantités, prix, montant total) le sont aussi.
+    """
+    if not isinstance(data, dict):
+        return ["Commande: objet JSON attendu"]
+
+    # Présence : mêmes messages (et même ordre) que l'ancien validate_json
+    erreurs = [f"Champ commun manquant: {champ}" for champ in CHAMPS_COMMUNS if champ not in data]
+    erreurs += [f"Champ '{champ}' manquant pour {libelle}" for champ in champs_canal if champ not in data]
+
+    if complet:
+        for champ, types in {**CHAMPS_COMMUNS, **champs_canal}.items():
+            if types and champ in data and data[champ].__class__ not in types:
+                erreurs.append(f"Champ '{champ}' invalide ({nom_types(types)} attendu)")
+
+    produits = data.get("produits")
+    if not isinstance(produits, list) or len(produits) == 0:
+        erreurs.append("Liste de produits invalide ou vide")
+        return erreurs
+
+    somme = 0
+    produits_ok = True
+    for i, produit in enumerate(produits, 1):
+        if not isinstance(produit, dict):
+            erreurs.append(f"Produit {i}: objet attendu")
+            produits_ok = False
+            continue
+        manquants = [champ for champ in CHAMPS_PRODUIT if champ not in produit]
+        erreurs += [f"Produit {i}: champ '{champ}' manquant" for champ in manquants]
+        if not complet:
+            continue
+        invalides = [f"Produit {i}: champ '{champ}' invalide ({nom_types(types)} attendu)"
+                     for champ, types in CHAMPS_PRODUIT.items()
+                     if champ in produit and produit[champ].__class__ not in types]
+        erreurs += invalides
+        if manquants or invalides:
+            produits_ok = False
+            continue
+
+        quantite, prix_unitaire, prix_total = produit["quantite"], produit["prix_unitaire"], produit["prix_total"]
+        if quantite <= 0:
+            erreurs.append(f"Produit {i}: quantite doit être positive")
+        if prix_unitaire < 0:
+            erreurs.append(f"Produit {i}: prix_unitaire négatif")
+        if abs(prix_total - quantite * prix_unitaire) > TOLERANCE:
+            erreurs.append(f"Produit {i}: prix_total différent de quantite × prix_unitaire")
+        somme += prix_total
+
+    montant_total = data.get("montant_total")
+    # Chaque prix_total est arrondi au centime : l'écart peut se cumuler
+    if complet and produits_ok and montant_total.__class__ in NOMBRE \
+            and abs(montant_total - somme) > TOLERANCE * len(produits):
+        erreurs.append("montant_total différent de la somme des prix_total")
+    return erreurs
+
+
+def valider(data, canal, complet=False):
+    """Toutes les erreurs d'une commande (liste vide si elle est valide)
+
+    Par défaut, contrôle de structure seul (chemin de chaque fichier du
+    collecteur) : une commande conforme ne coûte que des tests d'inclusion
+    d'ensembles. complet=True ajoute les types et les règles numériques.
+    Les messages ne sont construits (diagnostiquer) qu'en cas d'échec.
+    Un canal hors de SCHEMAS ("inconnu", "autre"...) rend la commande invalide.
+    """
+    validateur = VALIDATEURS.get(canal)
+    if validateur is None:
+        if data.__class__ is not dict:
+            return ["Commande: objet JSON attendu"]
+        return [f"Canal inconnu: {canal}"]
+    libelle, champs_canal, requis, champs_types = validateur
+    if data.__class__ is dict and data.keys() >= requis:
+        produits = data["produits"]
+        if produits.__class__ is list and produits:
+            for produit in produits:
+                if produit.__class__ is not dict or not produit.keys() >= REQUIS_PRODUIT:
+                    break
+            else:
+                if not complet or regles_respectees(data, produits, champs_types):
+                    return []
+    # Message générique par sécurité si le diagnostic ne trouve rien à redire
+    return diagnostiquer(data, libelle, champs_canal, complet) or ["Commande non conforme au schéma"]
+
+
+def valider_lot(commandes, canal=None, complet=False):
+    """Valider une liste de commandes ; retourne la liste des erreurs de chacune
+
+    Sans canal explicite, celui de chaque commande (champ "canal") est utilisé.
+    """
+    if canal is not None:
+        return [valider(data, canal, complet) for data in commandes]
+    return [valider(data, data.get("canal") if data.__class__ is dict else None, complet) for data in commandes]